@@ -30,7 +30,21 @@ create_config() {
 # Auto-generated configuration from Docker environment variables
 
 # TAK Server Configuration
-COT_URL = "tcp://${TAK_SERVER:-localhost}:${TAK_PORT}"
+COT_URL = "${TAK_SCHEME:-tcp}://${TAK_SERVER:-localhost}:${TAK_PORT}"
+TAK_TRANSPORT = "${TAK_TRANSPORT:-thread}"
+TAK_FLUSH_WINDOW_MS = ${TAK_FLUSH_WINDOW_MS:-0}
+TAK_PROTOCOL = ${TAK_PROTOCOL:-0}
+TAK_SPOOL_DIR = "${TAK_SPOOL_DIR:-}"
+TAK_SPOOL_MAX_MB = ${TAK_SPOOL_MAX_MB:-64}
+TAK_SPOOL_REPLAY_RATE = ${TAK_SPOOL_REPLAY_RATE:-20}
+TAK_KEEPALIVE_SECONDS = ${TAK_KEEPALIVE_SECONDS:-5}
+TAK_PING_INTERVAL_SECONDS = ${TAK_PING_INTERVAL_SECONDS:-10}
+TAK_FAILBACK_SECONDS = ${TAK_FAILBACK_SECONDS:-30}
+TAK_DNS_TTL_SECONDS = ${TAK_DNS_TTL_SECONDS:-60}
+TAK_RATE_LIMIT_BYTES_PER_SEC = ${TAK_RATE_LIMIT_BYTES_PER_SEC:-0}
+TAK_RATE_LIMIT_EVENTS_PER_SEC = ${TAK_RATE_LIMIT_EVENTS_PER_SEC:-0}
+COT_PROFILE = "${COT_PROFILE:-full}"
+COT_HEARTBEAT_FRACTION = ${COT_HEARTBEAT_FRACTION:-0.5}
 
 # Tesla Account
 TESLA_USERNAME = "${TESLA_USERNAME}"
@@ -39,6 +53,13 @@ TESLA_USERNAME = "${TESLA_USERNAME}"
 API_LOOP_DELAY = ${API_LOOP_DELAY}
 DEAD_RECKONING_ENABLED = ${DEAD_RECKONING_ENABLED}
 DEAD_RECKONING_DELAY = ${DEAD_RECKONING_DELAY}
+DEAD_RECKONING_DEADBAND_METERS = ${DEAD_RECKONING_DEADBAND_METERS:-0}
+DEAD_RECKONING_MAX_INTERVAL = ${DEAD_RECKONING_MAX_INTERVAL:-5}
+# "constant" (straight line) or "ctrv" (opt-in: follows curves and speed changes)
+DEAD_RECKONING_MODEL = "${DEAD_RECKONING_MODEL:-constant}"
+DEAD_RECKONING_ADAPTIVE = ${DEAD_RECKONING_ADAPTIVE:-False}
+DEAD_RECKONING_MIN_DELAY = ${DEAD_RECKONING_MIN_DELAY:-0.25}
+DEAD_RECKONING_MAX_DELAY = ${DEAD_RECKONING_MAX_DELAY:-5}
 
 # File Paths (Docker paths)
 LAST_POSITION_FILE = "/data/last_known_position.json"
@@ -58,6 +79,23 @@ EOF
     else
         echo "VEHICLE_FILTER = []" >> /app/config.py
     fi
+
+    # Handle TAK_STANDBY_URLS: failover endpoints behind TAK_SERVER, in priority order
+    # e.g., "tcp://standby:8085" -> [COT_URL, "tcp://standby:8085"] as one destination
+    PRIMARY="COT_URL"
+    if [ -n "$TAK_STANDBY_URLS" ]; then
+        STANDBY_LIST=$(echo "$TAK_STANDBY_URLS" | sed 's/,/", "/g' | sed 's/^/"/' | sed 's/$/"/')
+        PRIMARY="[COT_URL, $STANDBY_LIST]"
+    fi
+
+    # Handle TAK_EXTRA_URLS: more destinations fed alongside TAK_SERVER
+    # e.g., "tcp://backup:8085,tcp://training:8085" -> COT_URL = [COT_URL, "tcp://backup:8085", ...]
+    if [ -n "$TAK_EXTRA_URLS" ]; then
+        EXTRA_LIST=$(echo "$TAK_EXTRA_URLS" | sed 's/,/", "/g' | sed 's/^/"/' | sed 's/$/"/')
+        echo "COT_URL = [$PRIMARY, $EXTRA_LIST]" >> /app/config.py
+    elif [ -n "$TAK_STANDBY_URLS" ]; then
+        echo "COT_URL = [$PRIMARY]" >> /app/config.py
+    fi
     
     cat >> /app/config.py << EOF
 
@@ -5,15 +5,20 @@ __author__ = "TeslaOnTarget Contributors"
 
 from .tesla_api import TeslaCoT
 from .tak_client import TAKClient
-from .cot import generate_cot_packet, format_cot_for_tak
+from .async_tak_client import AsyncTAKClient
+from .udp_tak_client import UDPTAKClient
+from .cot import CotMessage, generate_cot_packet, format_cot_for_tak
 from .utils import calculate_distance, load_json_file, save_json_file
 from .config_handler import AppConfig, load_config
 
 __all__ = [
     'TeslaCoT',
     'TAKClient',
+    'AsyncTAKClient',
+    'UDPTAKClient',
     'AppConfig',
     'load_config',
+    'CotMessage',
     'generate_cot_packet',
     'format_cot_for_tak',
     'calculate_distance',
@@ -0,0 +1,266 @@
+"""asyncio-native TAK server transport.
+
+:class:`AsyncTAKClient` mirrors :class:`~teslaontarget.tak_client.TAKClient`'s
+``send_cot``/``health_snapshot`` surface, but connecting, reconnecting and
+writing are coroutines on one event loop: a stalled server parks a coroutine,
+not a thread. The writer task takes everything pending at once and writes it
+with one ``writelines`` and one deadline-bound ``StreamWriter.drain()``, the
+backpressure point; meanwhile the shared coalescing queue keeps only the
+newest event per vehicle.
+"""
+
+import asyncio
+import logging
+import socket
+import threading
+import time
+from urllib.parse import urlparse
+
+from .outbound import DEFAULT_MAX_QUEUE, CoalescingQueue
+from .tak_client import MAX_BATCH
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncTAKClient:
+    """Handle the TAK server connection from an asyncio event loop."""
+
+    def __init__(self, cot_url, max_queue=DEFAULT_MAX_QUEUE, connect_timeout=10,
+                 write_timeout=5, reconnect_interval=5, max_batch=MAX_BATCH):
+        """Initialize the asyncio TAK client.
+
+        Args:
+            cot_url: TAK server URL (e.g., 'tcp://192.168.1.100:8085'), or
+                'unix:///path/to/socket' for a server or relay on this host
+            max_queue: Bound on distinct pending events in the outbound queue
+            connect_timeout: Seconds allowed for one connection attempt
+            write_timeout: Seconds allowed for one write to drain
+            reconnect_interval: Seconds between reconnection attempts
+            max_batch: Most queued messages written with one drain
+        """
+        parsed = urlparse(cot_url)
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.path = parsed.path if parsed.scheme == "unix" else None
+        self.connect_timeout = connect_timeout
+        self.write_timeout = write_timeout
+        self.reconnect_interval = reconnect_interval
+        self.max_batch = max_batch
+        self.outbound = CoalescingQueue(max_queue)
+        self.connected = False
+        self.loop = None
+        self._wakeup = None
+        self._task = None
+        self._reader = None
+        self._writer = None
+        # Health / telemetry
+        self.last_connect_ok = None
+        self.last_send_ok = None
+        self.last_send_attempt = None
+        self.last_error = None
+        self.last_error_time = None
+        self.write_timeouts = 0
+
+    @property
+    def endpoint(self):
+        """The server as ``host:port``, or ``unix:<path>`` for a local socket."""
+        return f"unix:{self.path}" if self.path else f"{self.host}:{self.port}"
+
+    @property
+    def wire_format(self):
+        """``(protocol_version, mesh)`` that queued ``CotMessage`` events are encoded with."""
+        return 0, False
+
+    async def start(self):
+        """Start the writer task on the running event loop."""
+        if self._task and not self._task.done():
+            return
+        self.loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        """Cancel the writer task and close the connection."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close_stream()
+
+    def start_in_thread(self):
+        """Run the client on a private event loop in a daemon thread; return self.
+
+        Lets the blocking, thread-per-vehicle pollers share one asyncio transport.
+        """
+        ready = threading.Event()
+
+        def _runner():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=_runner, name="TAKAsyncLoop", daemon=True).start()
+        ready.wait(5)
+        return self
+
+    def send_cot(self, cot_message, uid=None):
+        """Queue a CoT message and return immediately (safe from any thread).
+
+        Args:
+            cot_message: Formatted CoT message bytes
+            uid: CoT UID used as the coalescing key (None = never coalesced)
+
+        Returns:
+            bool: True once the message is queued.
+        """
+        self.outbound.put(cot_message, uid)
+        self._notify()
+        return True
+
+    def send_batch(self, cot_messages, uids=None):
+        """Queue several CoT messages at once; see :meth:`send_cot`.
+
+        Args:
+            cot_messages: Iterable of formatted CoT message bytes
+            uids: Matching iterable of coalescing keys (None = never coalesced)
+
+        Returns:
+            bool: True once the messages are queued.
+        """
+        cot_messages = list(cot_messages)
+        uids = list(uids) if uids is not None else [None] * len(cot_messages)
+        for message, uid in zip(cot_messages, uids):
+            self.outbound.put(message, uid)
+        self._notify()
+        return True
+
+    def _notify(self):
+        """Wake the writer task, hopping onto its loop if called from another thread."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._wakeup.set()
+        else:
+            self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def connect(self):
+        """Open the stream to the TAK server; True on success."""
+        await self._close_stream()
+        try:
+            if self.path:
+                opening = asyncio.open_unix_connection(self.path)
+            else:
+                opening = asyncio.open_connection(self.host, self.port)
+            self._reader, self._writer = await asyncio.wait_for(opening, self.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to connect to TAK server: {e!r}")
+            self.last_error = f"connect failed: {e!r}"
+            self.last_error_time = time.time()
+            return False
+        sock = self._writer.get_extra_info("socket")
+        if sock is not None and not self.path:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.connected = True
+        self.last_connect_ok = time.time()
+        logger.info(f"Connected to TAK server at {self.endpoint}")
+        return True
+
+    async def _close_stream(self):
+        """Close the current stream, if any (best-effort)."""
+        writer, self._writer, self._reader = self._writer, None, None
+        self.connected = False
+        if writer is None:
+            return
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+    async def _write(self, *cot_messages):
+        """Write messages with one drain within the write deadline; False marks the link down."""
+        # CotMessage: this transport speaks XML
+        payloads = [m if isinstance(m, (bytes, bytearray, memoryview)) else m.encode(0) for m in cot_messages]
+        try:
+            self.last_send_attempt = time.time()
+            self._writer.writelines(payloads)
+            await asyncio.wait_for(self._writer.drain(), self.write_timeout)
+            self.last_send_ok = time.time()
+            logger.debug(f"Sent {len(payloads)} CoT message(s) to TAK server ({sum(map(len, payloads))} bytes)")
+            return True
+        except asyncio.TimeoutError:
+            self.write_timeouts += 1
+            error = f"write did not drain within {self.write_timeout}s"
+        except (OSError, AttributeError) as e:
+            error = str(e) or repr(e)
+        logger.error(f"Failed to send CoT message: {error}")
+        self.last_error = error
+        self.last_error_time = time.time()
+        await self._close_stream()
+        return False
+
+    async def _wait_for_work(self):
+        """Return the queued ``(key, message)`` pairs, up to ``max_batch``, sleeping until one arrives."""
+        # A cross-thread put schedules _wakeup.set() after this clear(), so no wakeup is lost.
+        while not (items := self.outbound.get_many(self.max_batch)):
+            self._wakeup.clear()
+            await self._wakeup.wait()
+        return items
+
+    async def _run(self):
+        """Writer task: connect lazily, drain the queue a batch at a time, reconnect without blocking."""
+        while True:
+            items = await self._wait_for_work()
+            if not self.connected and not await self.connect():
+                self._requeue(items)
+                await asyncio.sleep(self.reconnect_interval)
+                continue
+            if not await self._write(*(message for _, message in items)):
+                self._requeue(items)
+
+    def _requeue(self, items):
+        """Put a batch that was not written back at the head of the queue, in order."""
+        for key, message in reversed(items):
+            self.outbound.requeue(key, message)
+
+    def disconnect(self):
+        """Drop the connection (safe from any thread); the writer task reconnects."""
+        self.connected = False
+        if self.loop is not None and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self._close_stream(), self.loop)
+        logger.info("Disconnected from TAK server")
+
+    def close(self):
+        """Stop the writer task and close the connection (safe from any thread)."""
+        if self.loop is not None and not self.loop.is_closed():
+            asyncio.run_coroutine_threadsafe(self.stop(), self.loop)
+
+    def start_background_reconnect(self):
+        """Nudge the writer task; reconnection is already non-blocking on the loop."""
+        self._notify()
+
+    def health_snapshot(self):
+        """Return a snapshot dict of connection health suitable for JSON export."""
+        snapshot = {
+            "host": self.host,
+            "port": self.port,
+            "path": self.path,
+            "connected": self.connected,
+            "last_connect_ok": self.last_connect_ok,
+            "last_send_ok": self.last_send_ok,
+            "last_send_attempt": self.last_send_attempt,
+            "last_error": self.last_error,
+            "last_error_time": self.last_error_time,
+            "write_timeouts": self.write_timeouts,
+        }
+        snapshot.update(self.outbound.stats())
+        return snapshot
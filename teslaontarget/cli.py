@@ -1,17 +1,25 @@
 """Command line interface for TeslaOnTarget."""
 
 import os
+import re
 import sys
 import time
 import signal
 import logging
 import argparse
 import threading
+from urllib.parse import urlparse
 
 from teslapy import Tesla
 
 from .tesla_api import TeslaCoT
 from .tak_client import TAKClient
+from .async_tak_client import AsyncTAKClient
+from .failover import FailoverClient
+from .fanout import FanOutClient
+from .spool import Spool
+from .udp_tak_client import DATAGRAM_SCHEMES, UDPTAKClient
+from .ratelimit import RateLimitedClient
 from .config_handler import load_config
 from .health import HealthMonitor
 
@@ -98,15 +106,67 @@ def _select_vehicles(tesla, config):
     return filtered
 
 
+def _build_destination(config, cot_url):
+    """Construct the TAK transport for one URL, selected by its scheme and TAK_TRANSPORT."""
+    if urlparse(cot_url).scheme in DATAGRAM_SCHEMES:
+        logger.info("Using UDP datagram TAK transport")
+        return UDPTAKClient(cot_url, protocol=config.tak_protocol)
+    if config.tak_transport == "asyncio":
+        logger.info("Using asyncio TAK transport")
+        return AsyncTAKClient(cot_url).start_in_thread()
+    return _build_stream_client(config, cot_url)
+
+
+def _build_stream_client(config, cot_url):
+    """Construct the threaded stream transport for one ``tcp://`` or ``unix://`` URL."""
+    return TAKClient(cot_url, flush_window=(config.tak_flush_window_ms or 0) / 1000,
+                     protocol=config.tak_protocol, spool=_build_spool(config, cot_url),
+                     replay_rate=config.tak_spool_replay_rate, keepalive=config.tak_keepalive_seconds,
+                     ping_interval=config.tak_ping_interval_seconds, dns_ttl=config.tak_dns_ttl_seconds)
+
+
+def _build_spool(config, cot_url):
+    """Open the outage spool for one destination, or None when TAK_SPOOL_DIR is unset."""
+    if not config.tak_spool_dir:
+        return None
+    directory = os.path.join(config.tak_spool_dir, re.sub(r"[^A-Za-z0-9.-]+", "_", cot_url))
+    return Spool(directory, max_bytes=int(config.tak_spool_max_mb * (1 << 20)))
+
+
+def _build_failover(config, cot_urls):
+    """Construct a failover group: one threaded ``TAKClient`` per URL, primary first."""
+    logger.info(f"Using TAK failover across {len(cot_urls)} endpoints (primary {cot_urls[0]})")
+    clients = [_build_stream_client(config, url) for url in cot_urls]
+    return FailoverClient(clients, failback_after=config.tak_failback_seconds)
+
+
+def _build_tak_client(config):
+    """Construct the shared TAK client; several COT_URLs fan out to one transport each.
+
+    With a TAK_RATE_LIMIT_* cap set, the whole client sits behind one egress limiter.
+    """
+    urls = config.cot_urls
+    build = [_build_destination if isinstance(url, str) else _build_failover for url in urls]
+    if len(urls) == 1:
+        client = build[0](config, urls[0])
+    else:
+        logger.info(f"Fanning out to {len(urls)} TAK destinations")
+        client = FanOutClient([b(config, url) for b, url in zip(build, urls)])
+    if config.tak_rate_limit_bytes_per_sec or config.tak_rate_limit_events_per_sec:
+        logger.info(f"Limiting TAK egress to {config.tak_rate_limit_bytes_per_sec or 'unlimited'} bytes/s, "
+                    f"{config.tak_rate_limit_events_per_sec or 'unlimited'} events/s")
+        client = RateLimitedClient(client, bytes_per_sec=config.tak_rate_limit_bytes_per_sec,
+                                   events_per_sec=config.tak_rate_limit_events_per_sec)
+    return client
+
+
 def _build_health_monitor(tak_client, config):
     """Construct a HealthMonitor from config, treating <=0 thresholds as unset."""
-    configured_no_send = config.health_no_send_seconds or 0
     configured_check = config.health_check_interval or 0
     configured_hard = config.health_hard_restart_seconds or 0
     health_file = config.health_file
 
-    default_no_send = max(120, config.api_loop_delay * 8)
-    max_no_send = configured_no_send if configured_no_send > 0 else default_no_send
+    max_no_send = config.health_no_send_limit
     check_interval = configured_check if configured_check > 0 else 15
     hard_restart = configured_hard if configured_hard > 0 else (max_no_send * 5)
 
@@ -186,7 +246,7 @@ def main():
         tesla = Tesla(config.tesla_username)
         vehicles = _select_vehicles(tesla, config)
 
-        shared_tak_client = TAKClient(config.cot_url)
+        shared_tak_client = _build_tak_client(config)
 
         health = _build_health_monitor(shared_tak_client, config)
         health.start()
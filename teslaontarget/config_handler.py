@@ -9,20 +9,44 @@ import importlib.util
 import logging
 import os
 from dataclasses import dataclass, fields, replace
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Union
+
+from .cot import COT_PROFILES
+from .dead_reckoning import DEAD_RECKONING_MODELS
 
 logger = logging.getLogger(__name__)
 
+TAK_TRANSPORTS = ("thread", "asyncio")
+#: URL prefixes a failover group may use (connection-oriented transports).
+STREAM_SCHEMES = ("tcp://", "unix://")
+
 
 @dataclass(frozen=True)
 class AppConfig:
     """Immutable runtime configuration."""
 
-    cot_url: str = "tcp://YOUR-TAK-SERVER:8085"
+    # One TAK destination URL, or a tuple of them to fan out to every one. A
+    # nested tuple of tcp:// or unix:// URLs is one destination with failover
+    # (primary first).
+    cot_url: Union[str, Tuple[Union[str, Tuple[str, ...]], ...]] = "tcp://YOUR-TAK-SERVER:8085"
     tesla_username: Optional[str] = None
     api_loop_delay: int = 10
     dead_reckoning_delay: int = 1
     dead_reckoning_enabled: bool = False
+    # Dead-band: skip a dead-reckoned update while TAK clients extrapolating the
+    # last sent course/speed stay within this many metres (0 = send every update),
+    # but send at least every DEAD_RECKONING_MAX_INTERVAL seconds.
+    dead_reckoning_deadband_meters: float = 0
+    dead_reckoning_max_interval: float = 5
+    # "constant" extrapolates each fix's course and speed in a straight line;
+    # "ctrv" (opt-in) follows the yaw rate and acceleration estimated from
+    # successive fixes.
+    dead_reckoning_model: str = "constant"
+    # Per-vehicle update interval from speed and turn rate, between these bounds
+    # in seconds (DEAD_RECKONING_DELAY is then unused); no updates while stopped.
+    dead_reckoning_adaptive: bool = False
+    dead_reckoning_min_delay: float = 0.25
+    dead_reckoning_max_delay: float = 5
     last_position_file: str = "last_known_position.json"
     debug_mode: bool = False
     vehicle_filter: Tuple[str, ...] = ()
@@ -33,15 +57,83 @@ class AppConfig:
     # Optional push-notification endpoint (ntfy topic / generic webhook). Empty
     # disables alerting -- so silent failures stay silent unless one is supplied.
     alert_webhook_url: str = ""
+    # TAK transport: "thread" (blocking socket + writer thread) or "asyncio"
+    # (one event loop shared by every vehicle; suits large fleets).
+    tak_transport: str = "thread"
+    # Milliseconds the TAK writer lingers so concurrent updates share one write
+    # (0 = write as soon as an event is queued).
+    tak_flush_window_ms: int = 0
+    # Highest TAK protocol version to negotiate: 0 = XML only, 1 = switch to
+    # protobuf (TAK Protocol v1) when the server offers it.
+    tak_protocol: int = 0
+    # Directory for the outage spool (one subdirectory per TCP destination);
+    # empty disables spooling. Replay is capped at TAK_SPOOL_REPLAY_RATE events/s.
+    tak_spool_dir: str = ""
+    tak_spool_max_mb: int = 64
+    tak_spool_replay_rate: float = 20
+    # Dead-peer detection on TCP links: idle seconds before keepalive probes
+    # (0 = kernel defaults) and seconds between CoT pings (0 = no pings).
+    tak_keepalive_seconds: int = 5
+    tak_ping_interval_seconds: float = 10
+    # Seconds a higher-priority failover endpoint must stay connected before
+    # traffic moves back to it.
+    tak_failback_seconds: int = 30
+    # Seconds a TCP destination's resolved addresses are reused across reconnects
+    # (refreshed in the background once expired; 0 = resolve on every connect).
+    tak_dns_ttl_seconds: float = 60
+    # Egress caps for low-bandwidth uplinks (0 = no cap). Under pressure cached
+    # resends are shed first, then dead-reckoned updates, then real fixes.
+    tak_rate_limit_bytes_per_sec: float = 0
+    tak_rate_limit_events_per_sec: float = 0
+    # CoT bandwidth profile: "full", "lean" (rounded values; constant detail
+    # and unchanged remarks left out between periodic refreshes) or "minimal".
+    cot_profile: str = "full"
+    # Unchanged events (same position, status and remarks) are held back and
+    # re-sent as a heartbeat once this share of their stale time has passed
+    # (0 = send every event).
+    cot_heartbeat_fraction: float = 0.5
+
+    @property
+    def cot_urls(self) -> Tuple[Union[str, Tuple[str, ...]], ...]:
+        """Every configured TAK destination: a URL, or a failover group of URLs."""
+        if isinstance(self.cot_url, str):
+            return (self.cot_url,)
+        return tuple(self.cot_url)
+
+    @property
+    def health_no_send_limit(self) -> int:
+        """Seconds without a TAK send before the health monitor steps in.
+
+        ``HEALTH_NO_SEND_SECONDS``, or by default 120 (at least eight API polls).
+        """
+        if self.health_no_send_seconds and self.health_no_send_seconds > 0:
+            return self.health_no_send_seconds
+        return max(120, self.api_loop_delay * 8)
 
     def validate(self) -> bool:
         """True when the required fields are present."""
         if not self.tesla_username:
             logger.error("TESLA_USERNAME not configured")
             return False
-        if not self.cot_url:
+        if not self.cot_urls or not all(self.cot_urls):
             logger.error("COT_URL not configured")
             return False
+        for group in self.cot_urls:
+            if not isinstance(group, str) and not all(url.startswith(STREAM_SCHEMES) for url in group):
+                logger.error("COT_URL failover groups must list tcp:// or unix:// URLs")
+                return False
+        if self.tak_transport not in TAK_TRANSPORTS:
+            logger.error(f"TAK_TRANSPORT must be one of {', '.join(TAK_TRANSPORTS)}")
+            return False
+        if self.cot_profile not in COT_PROFILES:
+            logger.error(f"COT_PROFILE must be one of {', '.join(COT_PROFILES)}")
+            return False
+        if self.dead_reckoning_model not in DEAD_RECKONING_MODELS:
+            logger.error(f"DEAD_RECKONING_MODEL must be one of {', '.join(DEAD_RECKONING_MODELS)}")
+            return False
+        if self.dead_reckoning_adaptive and not 0 < self.dead_reckoning_min_delay <= self.dead_reckoning_max_delay:
+            logger.error("DEAD_RECKONING_MIN_DELAY must be above 0 and at most DEAD_RECKONING_MAX_DELAY")
+            return False
         return True
 
 
@@ -107,6 +199,8 @@ def load_config(config_path: Optional[str] = None) -> AppConfig:
                 value = getattr(module, key)
                 if field.name == "vehicle_filter":
                     value = _coerce_vehicle_filter(value)
+                elif field.name == "cot_url" and isinstance(value, list):
+                    value = tuple(tuple(v) if isinstance(v, list) else v for v in value)
                 overrides[field.name] = value
         logger.info(f"Configuration loaded from {config_path}")
         return replace(AppConfig(), **overrides)
@@ -1,13 +1,38 @@
 """Cursor on Target (CoT) message generation and handling."""
 
+import functools
+import json
 import logging
-import xml.etree.ElementTree as ET
+import threading
+import time
+import weakref
 from datetime import datetime, timedelta, timezone
 
+from . import takproto
 from .constants import MPH_TO_MS
 
 logger = logging.getLogger(__name__)
 
+# Use single quotes to match ATAK format
+_XML_DECLARATION = b"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>"
+
+#: Event priority classes, most important first (lower sheds last under a rate limit).
+PRIORITY_FIX = 0  # fresh position from the Tesla API
+PRIORITY_DEAD_RECKONED = 1  # interpolated between API fixes
+PRIORITY_CACHED = 2  # last known position re-sent while the API has none
+PRIORITY_NAMES = ("fix", "dead_reckoned", "cached")
+
+#: Bandwidth profiles for CoT output (``COT_PROFILE``); see :class:`CotProfile`.
+COT_PROFILES = ("full", "lean", "minimal")
+#: Seconds between a vehicle's full-detail events under a lean or minimal profile.
+PROFILE_REFRESH_SECONDS = 60
+# Decimal places kept per profile for (lat/lon, hae, course, speed). Five places
+# of latitude are ~1 m and six ~0.1 m, already finer than a consumer GPS fix.
+_PROFILE_DIGITS = {"lean": (6, 1, 1, 2), "minimal": (5, 0, 0, 1)}
+# Event fields behind the takv, contact, uid, precisionlocation and __group elements.
+_STATIC_KEYS = ("os", "version", "device", "platform", "endpoint", "callsign", "altsrc", "geopointsrc",
+                "group_role", "group_name")
+
 
 def celsius_to_fahrenheit(celsius):
     """Convert Celsius to Fahrenheit."""
@@ -95,43 +120,99 @@ def _build_remarks(data):
     return remarks_text
 
 
-def generate_cot_packet(data):
-    """Generate a Cursor on Target (CoT) XML packet from vehicle data.
-    
+# Vehicle data fields _build_remarks reads. Remarks are cached per UID on their
+# values, so the 1 Hz dead-reckoned copies of one API poll reuse one string.
+_REMARKS_KEYS = ("vehicle_model", "shift_state", "battery_range", "charging_state", "charge_limit_soc",
+                 "minutes_to_full_charge", "time_to_full_charge", "charge_port_door_open", "autopilot_state",
+                 "is_climate_on", "sentry_mode", "locked", "fd_window", "fp_window", "rd_window", "rp_window",
+                 "ft", "rt")
+_MISSING = object()  # an absent field and a None field can render differently
+_MISSING_ALL = (_MISSING,) * len(_REMARKS_KEYS)
+
+
+class _RemarksCache:
+    """Each UID's last remarks string, keyed on the fields it was built from."""
+
+    def __init__(self):
+        self._entries = {}  # uid -> (field values, remarks)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, data):
+        """Return ``_build_remarks(data)``, rebuilding it only when its inputs changed."""
+        uid = data.get("UID", "Tesla-Unknown")
+        key = tuple(map(data.get, _REMARKS_KEYS, _MISSING_ALL))
+        with self._lock:
+            entry = self._entries.get(uid)
+            if entry is not None and entry[0] == key:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        remarks = _build_remarks(data)
+        with self._lock:
+            self._entries[uid] = (key, remarks)
+        return remarks
+
+    def stats(self):
+        """Hit and miss counts, and the hit rate (None before the first lookup)."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "remarks_cache_hits": hits,
+            "remarks_cache_misses": misses,
+            "remarks_cache_hit_rate": round(hits / total, 4) if total else None,
+        }
+
+
+_remarks_cache = _RemarksCache()
+_duplicate_filters = weakref.WeakSet()  # every live DuplicateFilter, for cot_stats()
+
+
+def cot_stats():
+    """Process-wide CoT generation counters, for the health snapshot."""
+    stats = _remarks_cache.stats()
+    filters = list(_duplicate_filters)
+    stats["duplicates_suppressed"] = sum(f.suppressed for f in filters)
+    stats["heartbeats_sent"] = sum(f.heartbeats for f in filters)
+    return stats
+
+
+def _cot_time(dt):
+    """Format a datetime the way TAK expects, e.g. ``2025-07-27T00:05:00.215Z``."""
+    # Milliseconds, truncated; same output as strftime("...%fZ") minus the last 3 digits, but faster.
+    return (f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T{dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+            f".{dt.microsecond // 1000:03d}Z")
+
+
+def build_cot_event(data, now=None, stale_seconds=None):
+    """Compute the fields of a CoT event from vehicle data.
+
+    The result is shared by the TAK Protocol v0 (XML) and v1 (protobuf)
+    encoders, so both carry identical values.
+
     Args:
         data: Dictionary containing vehicle information
-        
+        now: Event time (defaults to the current UTC time)
+        stale_seconds: Seconds until TAK clients treat the track as stale
+            (defaults to 5 minutes)
+
     Returns:
-        str: Formatted CoT XML message
+        dict: Event fields
     """
-    # Create the root event element
-    root = ET.Element("event")
-    root.set("version", "2.0")
-    root.set("uid", data.get("UID", "Tesla-Unknown"))
-    root.set("type", "a-f-G-E-V-C")  # Friendly ground equipment vehicle civilian
-    root.set("how", "m-g")  # Machine-generated
-    root.set("access", "Undefined")
-    
-    # Set timestamps - TAK expects specific format
-    now = datetime.now(timezone.utc)
-    # Format: 2025-07-27T00:05:00.215Z
-    time_format = "%Y-%m-%dT%H:%M:%S.%fZ"
-    root.set("time", now.strftime(time_format)[:-4] + "Z")  # Remove extra microseconds
-    root.set("start", now.strftime(time_format)[:-4] + "Z")
-    stale = now + timedelta(minutes=5)
-    root.set("stale", stale.strftime(time_format)[:-4] + "Z")
-    
-    # Add point element (location)
-    point = ET.SubElement(root, "point")
-    point.set("lat", str(data.get("latitude", 0)))
-    point.set("lon", str(data.get("longitude", 0)))
-    
-    # Use actual elevation if available, convert meters to feet
+    if now is None:
+        now = datetime.now(timezone.utc)
+    if stale_seconds is None:
+        stale = now + timedelta(minutes=5)
+    else:
+        stale = now + timedelta(seconds=stale_seconds)
+
+    # Use actual elevation if available
     elevation_m = data.get("elevation", 0)
     if elevation_m is None:
         elevation_m = 0
-    point.set("hae", f"{elevation_m:.3f}")  # Height above ellipsoid in meters
-    
+
     # GPS accuracy - Tesla doesn't provide this, so use reasonable defaults
     # Use higher accuracy when moving, lower when stationary
     speed = data.get("speed", 0)
@@ -139,66 +220,168 @@ def generate_cot_packet(data):
         ce = "5.0"  # Better accuracy when GPS is active
     else:
         ce = "12.5"  # Typical stationary GPS accuracy
-    point.set("ce", ce)  # Circular error
-    point.set("le", "9999999.0")  # Linear error (vertical uncertainty)
-    
-    # Add detail element
-    detail = ET.SubElement(root, "detail")
-    
-    # Add takv element (ATAK version) - should be first in detail
-    takv = ET.SubElement(detail, "takv")
-    takv.set("os", "35")  # Android OS version (using 35 like ATAK)
-    takv.set("version", "1.0.0 (TeslaOnTarget)")
-    takv.set("device", "TESLA " + data.get("vehicle_model", "Model"))
-    takv.set("platform", "ATAK-CIV")  # Civilian ATAK compatible
-    
-    # Add contact element with callsign and endpoint
-    contact = ET.SubElement(detail, "contact")
-    callsign = data.get("display_name", "Tesla")
-    contact.set("endpoint", "*:-1:stcp")  # Standard TAK endpoint
-    contact.set("callsign", callsign)
-    
-    # Add uid element with Droid attribute (ATAK standard)
-    uid = ET.SubElement(detail, "uid")
-    uid.set("Droid", callsign)
-    
-    # Add precisionlocation
-    precisionlocation = ET.SubElement(detail, "precisionlocation")
-    precisionlocation.set("altsrc", "GPS")
-    precisionlocation.set("geopointsrc", "GPS")
-    
-    # Add group element (team assignment)
-    group = ET.SubElement(detail, "__group")
-    group.set("role", "Team Member")
-    group.set("name", "Cyan")  # Default team color
-    
-    # Add status element - ATAK standard with just battery
-    status = ET.SubElement(detail, "status")
-    battery_level = data.get("battery_level", 0)
-    status.set("battery", str(int(battery_level)))
-    
-    # Add track element for movement
-    track = ET.SubElement(detail, "track")
+
     heading = data.get("heading", 0)
     if heading is None:
         heading = 0
-    track.set("course", f"{heading:.8f}")
-    
+
     # Speed in m/s (CoT standard) - Tesla provides mph, convert to m/s
     speed_mph = data.get("speed", 0)
     if speed_mph is None:
         speed_mph = 0
     # Convert mph to m/s: 1 mph = 0.44704 m/s
     speed_ms = speed_mph * MPH_TO_MS
-    track.set("speed", f"{speed_ms:.8f}")
-    
-    # Add remarks with Tesla-specific info
-    remarks = ET.SubElement(detail, "remarks")
-    remarks.text = _build_remarks(data)
 
-    # Convert to string
-    cot_xml = ET.tostring(root, encoding='unicode')
+    return {
+        "uid": data.get("UID", "Tesla-Unknown"),
+        "type": "a-f-G-E-V-C",  # Friendly ground equipment vehicle civilian
+        "how": "m-g",  # Machine-generated
+        "access": "Undefined",
+        "time": now,
+        "stale": stale,
+        "lat": data.get("latitude", 0),
+        "lon": data.get("longitude", 0),
+        "hae": elevation_m,  # Height above ellipsoid in meters
+        "ce": ce,  # Circular error
+        "le": "9999999.0",  # Linear error (vertical uncertainty)
+        # takv: Android OS version (using 35 like ATAK), civilian ATAK compatible
+        "os": "35",
+        "version": "1.0.0 (TeslaOnTarget)",
+        "device": "TESLA " + data.get("vehicle_model", "Model"),
+        "platform": "ATAK-CIV",
+        "endpoint": "*:-1:stcp",  # Standard TAK endpoint
+        "callsign": data.get("display_name", "Tesla"),
+        "altsrc": "GPS",
+        "geopointsrc": "GPS",
+        "group_role": "Team Member",
+        "group_name": "Cyan",  # Default team color
+        "battery": data.get("battery_level", 0),
+        "course": heading,
+        "speed": speed_ms,
+        "remarks": _remarks_cache.get(data),
+    }
+
+
+def _escape_attrib(text):
+    """Escape an attribute value exactly as ``ElementTree`` serializes it."""
+    try:
+        if "&" in text:
+            text = text.replace("&", "&amp;")
+        if "<" in text:
+            text = text.replace("<", "&lt;")
+        if ">" in text:
+            text = text.replace(">", "&gt;")
+        if "\"" in text:
+            text = text.replace("\"", "&quot;")
+        if "\r" in text:
+            text = text.replace("\r", "&#13;")
+        if "\n" in text:
+            text = text.replace("\n", "&#10;")
+        if "\t" in text:
+            text = text.replace("\t", "&#09;")
+        return text
+    except (TypeError, AttributeError):
+        raise TypeError(f"cannot serialize {text!r} (type {type(text).__name__})") from None
+
+
+def _escape_text(text):
+    """Escape element text exactly as ``ElementTree`` serializes it."""
+    try:
+        if "&" in text:
+            text = text.replace("&", "&amp;")
+        if "<" in text:
+            text = text.replace("<", "&lt;")
+        if ">" in text:
+            text = text.replace(">", "&gt;")
+        return text
+    except (TypeError, AttributeError):
+        raise TypeError(f"cannot serialize {text!r} (type {type(text).__name__})") from None
+
+
+@functools.lru_cache(maxsize=1024)
+def _event_open(uid, event_type, how, access):
+    """The ``<event`` start tag up to its timestamps; rendered once per vehicle."""
+    return (f'<event version="2.0" uid="{_escape_attrib(uid)}" type="{_escape_attrib(event_type)}" '
+            f'how="{_escape_attrib(how)}" access="{_escape_attrib(access)}" ')
+
+
+@functools.lru_cache(maxsize=1024)
+def _detail_head(os_version, version, device, platform, endpoint, callsign, altsrc, geopointsrc,
+                 group_role, group_name):
+    """The ``takv``, ``contact``, ``uid``, ``precisionlocation`` and ``__group`` elements.
+
+    They only change with the vehicle's model or callsign, so each distinct
+    set is rendered and escaped once.
+    """
+    callsign = _escape_attrib(callsign)
+    return (
+        f'<detail><takv os="{_escape_attrib(os_version)}" version="{_escape_attrib(version)}" '
+        f'device="{_escape_attrib(device)}" platform="{_escape_attrib(platform)}" />'
+        f'<contact endpoint="{_escape_attrib(endpoint)}" callsign="{callsign}" />'
+        f'<uid Droid="{callsign}" />'
+        f'<precisionlocation altsrc="{_escape_attrib(altsrc)}" geopointsrc="{_escape_attrib(geopointsrc)}" />'
+        f'<__group role="{_escape_attrib(group_role)}" name="{_escape_attrib(group_name)}" />'
+    )
+
+
+def _times_attrib(now, stale):
+    """The ``time``/``start``/``stale`` attributes that close the ``<event`` start tag."""
+    time_str = _cot_time(now)
+    return f'time="{time_str}" start="{time_str}" stale="{_cot_time(stale)}">'
+
+
+def _render_xml(event):
+    """Render an event dict from :func:`build_cot_event` as CoT XML.
+
+    Output is byte-identical to building the same tree with ``ElementTree``,
+    but only the timestamps, point, status, track and remarks are formatted
+    per event; the rest comes pre-rendered from :func:`_event_open` and
+    :func:`_detail_head`. Elements whose fields a :class:`CotProfile`
+    removed are left out.
+    """
+    lat, lon = str(event["lat"]), str(event["lon"])
+    hae_digits, course_digits, speed_digits = event.get("digits", (3, 8, 8))
+    hae = f"{event['hae']:.{hae_digits}f}"
+    course = f"{event['course']:.{course_digits}f}"
+    speed = f"{event['speed']:.{speed_digits}f}"
+    if "callsign" in event:
+        head = _detail_head(event["os"], event["version"], event["device"], event["platform"], event["endpoint"],
+                            event["callsign"], event["altsrc"], event["geopointsrc"], event["group_role"],
+                            event["group_name"])
+    else:
+        head = "<detail>"
+    status = f'<status battery="{int(event["battery"])}" />' if "battery" in event else ""
+    remarks = event.get("remarks")
+    if remarks:
+        remarks = f"<remarks>{_escape_text(remarks)}</remarks>"
+    elif "remarks" in event:
+        remarks = "<remarks />"
+    else:
+        remarks = ""
+    return "".join((
+        _event_open(event["uid"], event["type"], event["how"], event["access"]),
+        _times_attrib(event["time"], event["stale"]),
+        f'<point lat="{_escape_attrib(lat)}" lon="{_escape_attrib(lon)}" hae="{hae}" '
+        f'ce="{_escape_attrib(event["ce"])}" le="{_escape_attrib(event["le"])}" />',
+        head,
+        status,
+        f'<track course="{course}" speed="{speed}" />',
+        remarks,
+        "</detail></event>",
+    ))
+
+
+def generate_cot_packet(data):
+    """Generate a Cursor on Target (CoT) XML packet from vehicle data.
     
+    Args:
+        data: Dictionary containing vehicle information
+
+    Returns:
+        str: Formatted CoT XML message
+    """
+    cot_xml = _render_xml(build_cot_event(data))
+
     # Debug log the generated CoT
     logger.debug(f"Generated CoT XML: {cot_xml[:200]}...")
     
@@ -214,8 +397,190 @@ def format_cot_for_tak(cot_xml):
     Returns:
         bytes: Properly formatted CoT message for TAK
     """
-    # TAK Protocol Version 0: XML declaration + newline + CoT + newline
-    # Use single quotes to match ATAK format
-    xml_declaration = "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>"
-    formatted = xml_declaration + cot_xml
-    return formatted.encode('utf-8')
\ No newline at end of file
+    # TAK Protocol Version 0: XML declaration + CoT. Encode only the event and
+    # prepend the pre-encoded declaration (no intermediate str concatenation).
+    return _XML_DECLARATION + cot_xml.encode('utf-8')
+
+
+class CotProfile:
+    """Trim events to a bandwidth profile, remembering what each vehicle was sent.
+
+    ``full`` leaves events untouched. ``lean`` rounds coordinates, altitude,
+    course and speed to meaningful precision, sends the constant detail
+    (``takv``, ``contact``, ``uid``, ``precisionlocation``, ``__group``) only
+    with a vehicle's first event, and remarks only when they change.
+    ``minimal`` rounds coarser still and sends status and remarks only along
+    with the constant detail. Whatever was left out is sent again every
+    ``refresh`` seconds, so clients that join late, or a first event that was
+    coalesced or shed on the way, catch up within that time.
+    """
+
+    def __init__(self, name="full", refresh=PROFILE_REFRESH_SECONDS):
+        """Initialize the profile.
+
+        Args:
+            name: One of :data:`COT_PROFILES`
+            refresh: Seconds of event time between a vehicle's full-detail events
+
+        Raises:
+            ValueError: Unknown profile name
+        """
+        if name not in COT_PROFILES:
+            raise ValueError(f"Unknown CoT profile {name!r}; expected one of {', '.join(COT_PROFILES)}")
+        self.name = name
+        self.refresh = refresh
+        self._sent = {}  # uid -> [constant detail values, event time sent, last remarks]
+        self._lock = threading.Lock()
+
+    def apply(self, event):
+        """Trim an event dict from :func:`build_cot_event` in place; returns it."""
+        digits = _PROFILE_DIGITS.get(self.name)
+        if digits is None:
+            return event
+        places = digits[0]
+        for key in ("lat", "lon"):
+            if event[key] is not None:
+                event[key] = round(event[key], places)
+        event["hae"] = round(event["hae"], digits[1])
+        event["course"] = round(event["course"], digits[2])
+        event["speed"] = round(event["speed"], digits[3])
+        event["digits"] = digits[1:]
+
+        static = tuple(event[key] for key in _STATIC_KEYS)
+        now = event["time"]
+        with self._lock:
+            sent = self._sent.get(event["uid"])
+            # A clock stepped backwards also forces a refresh.
+            if sent is None or sent[0] != static or not 0 <= (now - sent[1]).total_seconds() < self.refresh:
+                self._sent[event["uid"]] = [static, now, event["remarks"]]
+                return event
+            for key in _STATIC_KEYS:
+                del event[key]
+            if self.name == "minimal":
+                del event["battery"], event["remarks"]
+            elif event["remarks"] == sent[2]:
+                del event["remarks"]
+            else:
+                sent[2] = event["remarks"]
+        return event
+
+
+class DuplicateFilter:
+    """Suppress events identical to the last one sent for the same UID.
+
+    A stationary vehicle's 1 Hz dead-reckoned copies and the cached resends
+    after failed polls carry the same position, status and remarks as what
+    TAK clients already show. Only a heartbeat goes out, once
+    ``heartbeat_fraction`` of the last event's stale time has passed (or
+    ``max_interval`` seconds, if sooner), so the track never goes stale. A
+    fraction of 0 sends every event.
+    """
+
+    def __init__(self, heartbeat_fraction=0.5, max_interval=None):
+        """Initialize the filter.
+
+        Args:
+            heartbeat_fraction: Share of an event's stale time after which an
+                unchanged event is sent again (0 = no suppression)
+            max_interval: Most seconds between heartbeats (None = no cap)
+        """
+        self.heartbeat_fraction = heartbeat_fraction
+        self.max_interval = max_interval
+        self._last = {}  # uid -> (fingerprint, monotonic time the heartbeat is due)
+        self._lock = threading.Lock()
+        self.suppressed = 0
+        self.heartbeats = 0
+        _duplicate_filters.add(self)
+
+    def admit(self, message, stale_seconds):
+        """True if ``message`` should be sent; False for a duplicate within its heartbeat interval."""
+        if self.heartbeat_fraction <= 0:
+            return True
+        fingerprint = message.fingerprint()
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(message.uid)
+            if last is not None and last[0] == fingerprint:
+                if now < last[1]:
+                    self.suppressed += 1
+                    return False
+                self.heartbeats += 1
+            interval = stale_seconds * self.heartbeat_fraction
+            if self.max_interval is not None:
+                interval = min(interval, self.max_interval)
+            self._last[message.uid] = (fingerprint, now + interval)
+        return True
+
+    def forget(self, uid):
+        """Drop ``uid``'s fingerprint, e.g. after its event failed to queue."""
+        with self._lock:
+            self._last.pop(uid, None)
+
+
+class CotMessage:
+    """One CoT event, encoded lazily and at most once per TAK protocol version.
+
+    Event fields are computed up front (so bad data fails in the caller); the
+    transport picks the wire encoding it negotiated when it writes.
+    """
+
+    __slots__ = ("event", "uid", "priority", "_encoded")
+
+    def __init__(self, data, now=None, priority=None, profile=None, stale_seconds=None):
+        """Build the event from a vehicle data dict.
+
+        Args:
+            data: Flat vehicle data dict (see ``vehicle_mapper``)
+            now: Event time (defaults to the current UTC time)
+            priority: ``PRIORITY_*`` class; by default ``PRIORITY_DEAD_RECKONED``
+                for dead-reckoned data and ``PRIORITY_FIX`` otherwise
+            profile: :class:`CotProfile` to trim the event with (None = full)
+            stale_seconds: Seconds until the track goes stale (see :func:`build_cot_event`)
+        """
+        self.event = build_cot_event(data, now, stale_seconds)
+        if profile is not None:
+            profile.apply(self.event)
+        self.uid = self.event["uid"]
+        if priority is None:
+            priority = PRIORITY_DEAD_RECKONED if data.get("dead_reckoned") else PRIORITY_FIX
+        self.priority = priority
+        self._encoded = {}
+
+    def fingerprint(self):
+        """The event's content without its timestamps; equal for semantically identical events."""
+        return tuple(value for key, value in self.event.items() if key not in ("time", "stale"))
+
+    def encode(self, version=0, mesh=False):
+        """Return the framed wire bytes for TAK Protocol ``version`` (0 = XML, 1 = protobuf).
+
+        ``mesh`` selects v1 datagram (UDP/multicast) framing instead of stream
+        framing; XML is the same either way.
+        """
+        key = (version, mesh) if version == 1 else 0
+        encoded = self._encoded.get(key)
+        if encoded is None:
+            if version == 1:
+                payload = takproto.encode_event(self.event)
+                encoded = takproto.frame_mesh(payload) if mesh else takproto.frame_stream(payload)
+            else:
+                encoded = format_cot_for_tak(_render_xml(self.event))
+            self._encoded[key] = encoded
+        return encoded
+
+    def dumps(self):
+        """Serialize the event fields to bytes (for the disk spool); see :meth:`loads`."""
+        event = dict(self.event, time=self.event["time"].isoformat(), stale=self.event["stale"].isoformat())
+        return json.dumps(event, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data):
+        """Rebuild a message from :meth:`dumps` output; encodings are identical."""
+        event = json.loads(data)
+        event["time"] = datetime.fromisoformat(event["time"])
+        event["stale"] = datetime.fromisoformat(event["stale"])
+        message = cls.__new__(cls)
+        message.event = event
+        message.uid = event["uid"]
+        message.priority = PRIORITY_FIX
+        message._encoded = {}
+        return message
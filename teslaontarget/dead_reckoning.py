@@ -0,0 +1,640 @@
+"""Dead-reckoning geometry and the error-bounded (dead-band) emission filter.
+
+TAK clients such as ATAK extrapolate a track from the ``course`` and ``speed``
+of the last event they received. :class:`DeadBand` mirrors that extrapolation,
+so a dead-reckoned position is only worth sending when it differs from what
+the client already displays by more than a few metres, or when the client has
+gone too long without an update.
+
+:class:`DeadReckoningScheduler` runs the dead-reckoning ticks of every vehicle
+on one thread; each vehicle's :class:`Track` holds the fix it is
+extrapolating from. With the ``ctrv`` model, a :class:`MotionEstimator` per
+vehicle estimates yaw rate and acceleration from successive fixes, so the
+track follows a curve and a speed change instead of a straight line.
+:func:`emission_interval` spaces a vehicle's updates by how fast its
+position changes, rather than at a fixed rate.
+"""
+
+import bisect
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+import weakref
+from math import exp
+
+from .constants import EARTH_RADIUS_M, MPH_TO_MS
+from .utils import calculate_distance
+
+try:
+    import numpy
+except ImportError:  # optional: pip install teslaontarget[fleet]
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the tick-lag histogram buckets in DeadReckoningScheduler.stats()
+TICK_JITTER_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+# DEAD_RECKONING_MODEL values: constant course and speed, or constant turn rate
+# and velocity (with acceleration) estimated by MotionEstimator
+DEAD_RECKONING_MODELS = ("constant", "ctrv")
+
+# MotionEstimator: fixes further apart than this start a fresh estimate, and
+# estimated rates are capped at what a car can plausibly sustain
+MAX_FIX_GAP_SECONDS = 60
+MAX_YAW_RATE = 30.0  # degrees/s
+MAX_ACCELERATION = 4.0  # m/s^2
+# A turn or speed change rarely outlasts a few seconds, so a track's yaw rate
+# and acceleration fade with this time constant rather than run on to the next fix
+RATE_DECAY_SECONDS = 3.0
+# FleetTable: smaller batches are moved row by row, which is faster than NumPy's per-call overhead
+VECTOR_MIN_ROWS = 32
+# Shared scheduler: due times are rounded up to this grid, so vehicles tick
+# together and their tracks advance in one FleetTable batch
+TICK_QUANTUM_SECONDS = 0.25
+# Adaptive emission (DEAD_RECKONING_ADAPTIVE): an update every this many metres
+# travelled, and sooner when a straight-line extrapolation of the last update
+# would drift more than ADAPTIVE_ERROR_METERS through a turn or speed change
+ADAPTIVE_SPACING_METERS = 50.0
+ADAPTIVE_ERROR_METERS = 0.5
+
+
+def project(lat, lon, heading, speed_ms, seconds, lib=math):
+    """Advance a position along ``heading`` at ``speed_ms`` for ``seconds``.
+
+    Uses an equirectangular step, accurate over the few hundred metres
+    covered between API polls. With ``lib=numpy`` the arguments may be
+    arrays, projecting many positions at once.
+
+    Returns:
+        tuple: ``(lat, lon)`` in degrees
+    """
+    distance = speed_ms * seconds
+    heading_rad = lib.radians(heading)
+    lat_rad = lib.radians(lat)
+    new_lat_rad = lat_rad + (distance / EARTH_RADIUS_M) * lib.cos(heading_rad)
+    new_lon_rad = lib.radians(lon) + (distance / (EARTH_RADIUS_M * lib.cos(lat_rad))) * lib.sin(heading_rad)
+    return lib.degrees(new_lat_rad), lib.degrees(new_lon_rad)
+
+
+def emission_interval(speed_ms, yaw_rate, acceleration, min_delay, max_delay):
+    """Seconds until a vehicle moving like this is worth another update.
+
+    A straight-line extrapolation of the last update drifts by about
+    ``t^2 / 2 * (speed * yaw rate + acceleration)`` after ``t`` seconds, so a
+    vehicle in a curve or changing speed gets updates often enough to keep
+    that under ``ADAPTIVE_ERROR_METERS``; otherwise one every
+    ``ADAPTIVE_SPACING_METERS`` travelled.
+
+    Args:
+        speed_ms: Current speed, m/s
+        yaw_rate: Current turn rate, degrees/s
+        acceleration: Current speed change, m/s^2
+        min_delay: Shortest interval returned, seconds
+        max_delay: Longest interval returned, seconds
+
+    Returns:
+        float | None: The interval, or None for a stopped vehicle (nothing to send)
+    """
+    if speed_ms <= 0:
+        return None
+    interval = ADAPTIVE_SPACING_METERS / speed_ms
+    drift = speed_ms * math.radians(abs(yaw_rate)) + abs(acceleration)
+    if drift:
+        interval = min(interval, math.sqrt(2 * ADAPTIVE_ERROR_METERS / drift))
+    return max(min_delay, min(max_delay, interval))
+
+
+class DeadBand:
+    """Send a dead-reckoned position only when clients would be too far off.
+
+    Tracks the last event sent (position, course, speed and time) and
+    extrapolates it the way a TAK client does. A position is due when it
+    lies more than ``threshold_m`` from that extrapolation, or when
+    ``max_interval`` seconds have passed since the last send. A threshold of
+    0 sends every position.
+    """
+
+    def __init__(self, threshold_m=0.0, max_interval=5.0):
+        """Initialize the filter.
+
+        Args:
+            threshold_m: Largest tolerated client-side error in metres (0 = off)
+            max_interval: Most seconds between sends, however small the error
+        """
+        self.threshold_m = threshold_m
+        self.max_interval = max_interval
+        self._sent = None  # (lat, lon, heading, speed m/s, time)
+        self.sent = 0
+        self.suppressed = 0
+
+    def mark_sent(self, lat, lon, heading, speed_ms, at):
+        """Record the event clients now extrapolate from."""
+        self._sent = (lat, lon, heading, speed_ms, at)
+
+    def client_position(self, at):
+        """Where a client extrapolating the last sent event shows the vehicle at ``at``."""
+        lat, lon, heading, speed_ms, sent_at = self._sent
+        return project(lat, lon, heading, speed_ms, at - sent_at)
+
+    def error_m(self, lat, lon, at):
+        """Metres between ``(lat, lon)`` and the client's extrapolated position."""
+        return calculate_distance(lat, lon, *self.client_position(at))
+
+    def due(self, lat, lon, at):
+        """True if the position at time ``at`` should be sent; counts the outcome."""
+        if (self.threshold_m <= 0 or self._sent is None or at - self._sent[4] >= self.max_interval
+                or self.error_m(lat, lon, at) > self.threshold_m):
+            self.sent += 1
+            return True
+        self.suppressed += 1
+        return False
+
+
+class _Kalman2:
+    """Kalman filter over a value and its rate of change (constant-rate model)."""
+
+    def __init__(self, value, value_var, rate_var, q):
+        """Initialize at ``value``, with an unknown (zero-mean) rate.
+
+        Args:
+            value_var: Measurement variance of the value
+            rate_var: Prior variance of the rate
+            q: Process noise: spectral density of the rate's random walk
+        """
+        self.value, self.rate = value, 0.0
+        self.r, self.q = value_var, q
+        self.p00, self.p01, self.p11 = value_var, 0.0, rate_var
+
+    def predict(self, dt):
+        self.value += self.rate * dt
+        q = self.q
+        self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt ** 3 / 3
+        self.p01 += dt * self.p11 + q * dt ** 2 / 2
+        self.p11 += q * dt
+
+    def correct(self, innovation):
+        """Fold in a measurement, given as its difference from the predicted value."""
+        s = self.p00 + self.r
+        k0, k1 = self.p00 / s, self.p01 / s
+        self.value += k0 * innovation
+        self.rate += k1 * innovation
+        self.p11 -= k1 * self.p01
+        self.p00 *= 1 - k0
+        self.p01 *= 1 - k0
+
+
+class MotionEstimator:
+    """Estimate a vehicle's yaw rate and acceleration from successive API fixes.
+
+    A constant turn rate and velocity model with acceleration (CTRV), run as
+    two small Kalman filters: heading with yaw rate, and speed with
+    acceleration. Tesla reports whole degrees and whole mph, which the filters
+    smooth out. A stop, or a gap of over ``MAX_FIX_GAP_SECONDS``, restarts the
+    estimate (a standstill heading says nothing about the next turn).
+    """
+
+    def __init__(self):
+        self._heading = None  # _Kalman2 over (degrees, degrees/s)
+        self._speed = None  # _Kalman2 over (m/s, m/s^2)
+        self._at = None
+
+    def update(self, heading, speed_ms, at):
+        """Fold in a fix: ``heading`` in degrees and ``speed_ms`` at time ``at`` (seconds)."""
+        dt = None if self._at is None else at - self._at
+        if dt is not None and dt <= 0:
+            return  # the same fix again
+        if dt is None or dt > MAX_FIX_GAP_SECONDS or not speed_ms:
+            self._heading = _Kalman2(heading, 1.0, 25.0, 4.0)
+            self._speed = _Kalman2(speed_ms, 0.25, 1.0, 0.5)
+            self._at = at
+            return
+        self._heading.predict(dt)
+        self._heading.correct((heading - self._heading.value + 180) % 360 - 180)
+        self._speed.predict(dt)
+        self._speed.correct(speed_ms - self._speed.value)
+        self._at = at
+
+    @property
+    def yaw_rate(self):
+        """Estimated turn rate in degrees/s (positive clockwise), capped at ``MAX_YAW_RATE``."""
+        if self._heading is None:
+            return 0.0
+        return max(-MAX_YAW_RATE, min(MAX_YAW_RATE, self._heading.rate))
+
+    @property
+    def acceleration(self):
+        """Estimated acceleration in m/s^2, capped at ``MAX_ACCELERATION``."""
+        if self._speed is None:
+            return 0.0
+        return max(-MAX_ACCELERATION, min(MAX_ACCELERATION, self._speed.rate))
+
+
+class FleetTable:
+    """The motion state of every dead-reckoned vehicle, one row each, as a struct of arrays.
+
+    With NumPy installed (``pip install teslaontarget[fleet]``) the columns
+    are arrays and :meth:`advance` moves a whole batch of rows in one
+    vectorized step; otherwise they are lists and each row is moved in turn,
+    as it is for batches under ``VECTOR_MIN_ROWS`` either way. Both use the
+    same arithmetic.
+    """
+
+    COLUMNS = ("lat", "lon", "heading", "speed_ms", "yaw_rate", "acceleration", "at", "moving")
+
+    def __init__(self, use_numpy=True, capacity=16):
+        """Initialize an empty table.
+
+        Args:
+            use_numpy: Use NumPy arrays when NumPy is installed
+            capacity: Rows to allocate up front (doubled whenever full)
+        """
+        self.np = numpy if use_numpy else None
+        self.backend = "python" if self.np is None else "numpy"
+        self._cols = {name: self._zeros(capacity) for name in self.COLUMNS}
+        self._free = list(range(capacity - 1, -1, -1))  # pop() hands out low rows first
+        self._released = []  # freed by release_later(), not yet back in _free
+        self._lock = threading.Lock()
+        self._allocated = 0
+
+    @property
+    def rows(self):
+        """Rows in use."""
+        return self._allocated - len(self._released)
+
+    def _zeros(self, n):
+        return [0.0] * n if self.np is None else self.np.zeros(n)
+
+    def add(self, **values):
+        """Store a row (columns not given are 0) and return its index."""
+        with self._lock:
+            while self._released:
+                self._free.append(self._released.pop())
+                self._allocated -= 1
+            if not self._free:
+                self._grow()
+            row = self._free.pop()
+            for name in self.COLUMNS:
+                self._cols[name][row] = values.get(name, 0.0)
+            self._allocated += 1
+        return row
+
+    def release(self, row):
+        """Free a row for reuse."""
+        with self._lock:
+            self._free.append(row)
+            self._allocated -= 1
+
+    def release_later(self, row):
+        """Free a row at the next :meth:`add`, without taking the lock (safe from a finalizer)."""
+        self._released.append(row)
+
+    def get(self, row, name):
+        return float(self._cols[name][row])
+
+    def advance(self, rows, now):
+        """Move ``rows`` on to monotonic time ``now`` along their motion.
+
+        Integrates over the time each row actually needs, so a late tick
+        lands where the vehicle is rather than one nominal interval along.
+        A turning row's rates fade over ``RATE_DECAY_SECONDS``; it moves along
+        its mean heading and speed over the step (midpoint rule), and its
+        speed never drops below zero. A row that is not ``moving`` keeps its
+        exact coordinates.
+        """
+        with self._lock:
+            if self.np is None or len(rows) < VECTOR_MIN_ROWS:
+                for row in rows:
+                    self._advance_row(row, now)
+            else:
+                self._advance_rows(self.np.asarray(rows, dtype=self.np.intp), now)
+
+    def _advance_row(self, row, now):
+        c = self._cols
+        elapsed, c["at"][row] = now - c["at"][row], now
+        if not c["moving"][row]:
+            return
+        yaw_rate, acceleration = c["yaw_rate"][row], c["acceleration"][row]
+        if not (yaw_rate or acceleration):
+            c["lat"][row], c["lon"][row] = project(c["lat"][row], c["lon"][row], c["heading"][row],
+                                                   c["speed_ms"][row], elapsed)
+            return
+        fade = exp(-elapsed / RATE_DECAY_SECONDS)
+        gain = RATE_DECAY_SECONDS * (1 - fade)  # integral of the fading rate over the step
+        turn = yaw_rate * gain
+        speed_ms = c["speed_ms"][row]
+        new_speed_ms = max(0.0, speed_ms + acceleration * gain)
+        c["lat"][row], c["lon"][row] = project(c["lat"][row], c["lon"][row], c["heading"][row] + turn / 2,
+                                               (speed_ms + new_speed_ms) / 2, elapsed)
+        c["heading"][row] = (c["heading"][row] + turn) % 360
+        c["speed_ms"][row] = new_speed_ms
+        c["yaw_rate"][row] = yaw_rate * fade
+        c["acceleration"][row] = acceleration * fade
+
+    def _advance_rows(self, rows, now):
+        """:meth:`_advance_row` for an index array of rows at once."""
+        np, c = self.np, self._cols
+        elapsed = now - c["at"][rows]
+        c["at"][rows] = now
+        moving = c["moving"][rows] != 0
+        rows, elapsed = rows[moving], elapsed[moving]
+        heading, speed_ms = c["heading"][rows], c["speed_ms"][rows]
+        yaw_rate, acceleration = c["yaw_rate"][rows], c["acceleration"][rows]
+        # A straight row has zero rates, so this reduces to a plain projection for it
+        fade = np.exp(-elapsed / RATE_DECAY_SECONDS)
+        gain = RATE_DECAY_SECONDS * (1 - fade)
+        turn = yaw_rate * gain
+        new_speed_ms = np.maximum(0.0, speed_ms + acceleration * gain)
+        c["lat"][rows], c["lon"][rows] = project(c["lat"][rows], c["lon"][rows], heading + turn / 2,
+                                                 (speed_ms + new_speed_ms) / 2, elapsed, np)
+        c["heading"][rows] = np.where((yaw_rate != 0) | (acceleration != 0), (heading + turn) % 360, heading)
+        c["speed_ms"][rows] = new_speed_ms
+        c["yaw_rate"][rows] = yaw_rate * fade
+        c["acceleration"][rows] = acceleration * fade
+
+    def _grow(self):
+        size = len(self._cols["lat"])
+        for name, col in self._cols.items():
+            if self.np is None:
+                col.extend([0.0] * size)
+            else:
+                self._cols[name] = self.np.concatenate((col, self.np.zeros(size)))
+        self._free.extend(range(2 * size - 1, size - 1, -1))
+
+
+def _column(name, doc):
+    """A read-only :class:`Track` attribute stored in its :class:`FleetTable` row."""
+    return property(lambda track: track.table.get(track.row, name), doc=doc)
+
+
+class Track:
+    """One vehicle's dead reckoning: the fix it extrapolates from, and its row in a :class:`FleetTable`.
+
+    The row is freed by :meth:`release` (the scheduler does this once the
+    track is replaced, cancelled or done), or failing that when the track is
+    garbage collected.
+    """
+
+    lat = _column("lat", "Current latitude")
+    lon = _column("lon", "Current longitude")
+    heading = _column("heading", "Current course, degrees")
+    speed_ms = _column("speed_ms", "Current speed, m/s")
+    yaw_rate = _column("yaw_rate", "Turn rate still being followed, degrees/s")
+    acceleration = _column("acceleration", "Speed change still being followed, m/s^2")
+    at = _column("at", "Monotonic time of the current position")
+
+    def __init__(self, data, deadband, started, max_duration, yaw_rate=0.0, acceleration=0.0, table=None):
+        """Initialize from a fix.
+
+        Args:
+            data: Mapped vehicle data of the fix, with coordinates (copied into each update)
+            deadband: The vehicle's :class:`DeadBand`
+            started: Monotonic time of the fix, where the position stands
+            max_duration: Seconds after ``started`` to stop (just before the next poll)
+            yaw_rate: Turn rate to follow, degrees/s (ignored when stopped)
+            acceleration: Speed change to follow, m/s^2 (ignored when stopped)
+            table: :class:`FleetTable` to keep the motion state in (default: the shared ``fleet``)
+        """
+        self.data = data
+        # Tesla API returns speed in mph
+        self.speed = data.get('speed') or 0
+        self.deadband = deadband
+        self.started = started
+        self.max_duration = max_duration
+        self.updates = 0
+        self.table = fleet if table is None else table
+        # A stopped car may or may not pull away; don't guess which
+        moving = bool(self.speed)
+        self.row = self.table.add(
+            lat=data['latitude'], lon=data['longitude'], heading=data.get('heading') or 0,
+            speed_ms=self.speed * MPH_TO_MS, yaw_rate=yaw_rate if moving else 0.0,
+            acceleration=acceleration if moving else 0.0, at=started, moving=moving)
+        # A finalizer can run on a thread that holds the table's lock, so it must not take it
+        self._finalizer = weakref.finalize(self, self.table.release_later, self.row)
+
+    def release(self):
+        """Free the track's row now; the track must not be advanced or read after this."""
+        if self._finalizer.detach() is not None:
+            self.table.release(self.row)
+
+    @property
+    def turning(self):
+        """True when the track follows a curve or a speed change, not a straight line."""
+        return bool(self.yaw_rate or self.acceleration)
+
+    def advance_to(self, now):
+        """Move the position on to monotonic time ``now`` (see :meth:`FleetTable.advance`).
+
+        Returns:
+            float: Seconds advanced
+        """
+        elapsed = now - self.at
+        self.table.advance((self.row,), now)
+        return elapsed
+
+    def expired(self, now):
+        """True once the next API poll is close (``max_duration`` after the fix)."""
+        return now - self.started >= self.max_duration
+
+
+class DeadReckoningScheduler:
+    """One thread that runs the dead-reckoning ticks of every vehicle.
+
+    Each vehicle (``key``) has at most one tick function, queued in a heap by
+    the monotonic time it is next due. :meth:`schedule` replaces a vehicle's
+    tick in O(log n): the new entry is pushed and the old one is dropped
+    lazily when it reaches the top. A tick is called with the monotonic time
+    it runs at and returns the seconds until it should run again, or None
+    when it is done.
+
+    The schedule is absolute: a tick is due one interval after the previous
+    one was *due*, not after it finished, so time spent sending does not
+    slow the rate. A tick that falls behind runs once as soon as possible and
+    any further intervals it missed are skipped.
+
+    Ticks that are due together run as one batch, and the :class:`Track`
+    each was scheduled with is moved on first, one :meth:`FleetTable.advance`
+    per table; rounding due times up to a ``quantum`` grid lines vehicles up
+    into such batches. A track that is replaced, cancelled or done is
+    released before the next batch, when no tick can still be using it.
+
+    How late each tick runs (tick lag) is tracked for the health snapshot,
+    with a histogram of it in ``TICK_JITTER_BUCKETS_MS``; it grows when a
+    slow send holds up the vehicles queued behind it.
+    """
+
+    def __init__(self, quantum=0.0):
+        """Initialize an idle scheduler.
+
+        Args:
+            quantum: Round due times up to a multiple of this many seconds (0 = exact)
+        """
+        self.quantum = quantum
+        self._heap = []  # (due, seq, key, tick, track)
+        self._ticks = {}  # key -> its current tick function
+        self._tracks = {}  # key -> the track its current tick was scheduled with
+        self._retired = []  # tracks to release before the next batch
+        self._seq = itertools.count()  # orders equal due times, never compares keys
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self.ticks = 0
+        self.skipped = 0
+        self.lag_last = 0.0
+        self.lag_max = 0.0
+        self.lag_total = 0.0
+        self.jitter = [0] * (len(TICK_JITTER_BUCKETS_MS) + 1)  # the last bucket is "over the top one"
+
+    def schedule(self, key, tick, delay, track=None):
+        """Run ``tick`` for ``key`` in ``delay`` seconds, replacing any tick it had.
+
+        ``track``, if given, is advanced to the tick's time just before each run.
+        """
+        with self._cond:
+            self._ticks[key] = tick
+            self._retire(key, track)
+            self._push(key, tick, track, self._align(time.monotonic() + delay))
+            self._stopped = False
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="DeadReckoning")
+                self._thread.start()
+            self._cond.notify()
+
+    def cancel(self, key):
+        """Stop running ticks for ``key`` (a tick already underway still finishes)."""
+        with self._cond:
+            self._ticks.pop(key, None)
+            self._retire(key)
+            self._cond.notify()  # the thread releases the track
+
+    def scheduled(self, key):
+        """True while ``key`` has a tick queued or running."""
+        with self._cond:
+            return key in self._ticks
+
+    def stop(self, timeout=1):
+        """Stop the thread; queued ticks are kept and resume on the next :meth:`schedule`."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+
+    def run_pending(self):
+        """Run every tick that is due now, in batches, oldest first."""
+        while True:
+            with self._cond:
+                retired, self._retired = self._retired, []
+                for track in retired:
+                    track.release()
+                wait = self._next_wait()
+                if wait is None or wait > 0:
+                    return
+                now = time.monotonic()
+                batch = []
+                while self._heap and self._heap[0][0] <= now:
+                    entry = heapq.heappop(self._heap)
+                    if self._ticks.get(entry[2]) is entry[3]:
+                        batch.append(entry)
+            tables = {}
+            for *_, track in batch:
+                if track is not None:
+                    tables.setdefault(track.table, []).append(track.row)
+            for table, rows in tables.items():
+                table.advance(rows, now)
+            for due, _, key, tick, track in batch:
+                self._run_tick(due, key, tick, track, now)
+
+    def _run_tick(self, due, key, tick, track, now):
+        with self._cond:
+            if self._ticks.get(key) is not tick:  # cancelled or replaced by an earlier tick in the batch
+                return
+        self._record_lag(now - due)
+        try:
+            delay = tick(now)
+        except Exception as e:
+            logger.error(f"Dead-reckoning tick failed: {e}", exc_info=True)
+            delay = None
+        with self._cond:
+            if self._ticks.get(key) is tick:  # not replaced or cancelled meanwhile
+                if delay is None:
+                    del self._ticks[key]
+                    self._retire(key)
+                else:
+                    self._push(key, tick, track, self._next_due(due, delay))
+
+    def stats(self):
+        """Vehicles scheduled, ticks run and skipped, and tick lag, for the health snapshot.
+
+        Lag is in seconds; ``tick_jitter_ms`` counts ticks by lag, keyed by
+        each bucket's upper bound in milliseconds (``le_<ms>``) and ``over``.
+        """
+        with self._cond:
+            vehicles = len(self._ticks)
+        labels = [f"le_{ms}" for ms in TICK_JITTER_BUCKETS_MS] + ["over"]
+        return {
+            "vehicles": vehicles,
+            "ticks": self.ticks,
+            "ticks_skipped": self.skipped,
+            "tick_lag_last": round(self.lag_last, 4),
+            "tick_lag_max": round(self.lag_max, 4),
+            "tick_lag_mean": round(self.lag_total / self.ticks, 4) if self.ticks else None,
+            "tick_jitter_ms": dict(zip(labels, self.jitter)),
+        }
+
+    def _record_lag(self, lag):
+        self.ticks += 1
+        self.lag_last = lag
+        self.lag_max = max(self.lag_max, lag)
+        self.lag_total += lag
+        self.jitter[bisect.bisect_left(TICK_JITTER_BUCKETS_MS, lag * 1000)] += 1
+
+    def _next_due(self, due, delay):
+        """One ``delay`` after ``due``, skipping whole intervals already missed beyond that."""
+        next_due = due + delay
+        behind = time.monotonic() - next_due
+        if behind > 0 and delay > 0:
+            missed = int(behind // delay)
+            self.skipped += missed
+            next_due += missed * delay
+        return self._align(next_due)
+
+    def _align(self, due):
+        return math.ceil(due / self.quantum) * self.quantum if self.quantum else due
+
+    def _retire(self, key, track=None):
+        """Make ``track`` (or none) ``key``'s track, releasing its previous one; caller holds the lock."""
+        previous = self._tracks.pop(key, None)
+        if track is not None:
+            self._tracks[key] = track
+        if previous is not None and previous is not track:
+            self._retired.append(previous)
+
+    def _push(self, key, tick, track, due):
+        heapq.heappush(self._heap, (due, next(self._seq), key, tick, track))
+
+    def _next_wait(self):
+        """Seconds until the first live tick is due (None if there is none); caller holds the lock."""
+        while self._heap:
+            _, _, key, tick, _ = self._heap[0]
+            if self._ticks.get(key) is tick:
+                return self._heap[0][0] - time.monotonic()
+            heapq.heappop(self._heap)  # replaced or cancelled
+        return None
+
+    def _run(self):
+        while True:
+            self.run_pending()
+            with self._cond:
+                if self._stopped:
+                    return
+                self._cond.wait(self._next_wait())  # returns at once if a tick is already due
+
+
+# Shared by every TeslaCoT in the process
+fleet = FleetTable()
+scheduler = DeadReckoningScheduler(TICK_QUANTUM_SECONDS)
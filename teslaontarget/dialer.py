@@ -0,0 +1,197 @@
+"""Resolving and connecting TCP endpoints without DNS or one bad address on the critical path.
+
+:class:`ResolverCache` keeps ``getaddrinfo`` results for a TTL. Once an entry
+expires it is still served while a background refresh runs, and it is kept if
+the resolver fails. A reconnect therefore waits on DNS only the first time a
+host is resolved (or every time, with a TTL of 0). :func:`connect_first` races the resolved addresses Happy
+Eyeballs style (RFC 8305): IPv6 and IPv4 alternate, a new attempt starts every
+``stagger`` seconds (or as soon as one fails), and the first socket to connect
+wins. An unreachable address family costs a quarter second instead of a full
+connect timeout, and IPv6-only servers work.
+"""
+
+import errno
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+#: Seconds a resolved address list is used before it is refreshed.
+DEFAULT_DNS_TTL = 60
+#: Seconds between starting connection attempts (RFC 8305's recommended 250 ms).
+HAPPY_EYEBALLS_DELAY = 0.25
+
+_IN_PROGRESS = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, getattr(errno, "WSAEWOULDBLOCK", errno.EWOULDBLOCK)}
+
+
+class ResolverCache:
+    """Thread-safe TTL cache of ``getaddrinfo`` results for TCP endpoints."""
+
+    def __init__(self, ttl=DEFAULT_DNS_TTL):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds an address list is fresh (0 = resolve on every call)
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # (host, port) -> (expires, addresses)
+        self._refreshing = set()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.errors = 0
+        self.resolve_ms_last = None
+
+    def _lookup(self, host, port):
+        started = time.monotonic()
+        try:
+            addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        finally:
+            self.resolve_ms_last = (time.monotonic() - started) * 1000
+        if self.ttl > 0:
+            with self._lock:
+                self._entries[(host, port)] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def _refresh(self, host, port):
+        try:
+            self._lookup(host, port)
+        except OSError as e:
+            self.errors += 1
+            logger.warning(f"Re-resolving {host} failed ({e}); keeping the cached addresses")
+        finally:
+            with self._lock:
+                self._refreshing.discard((host, port))
+
+    def resolve(self, host, port):
+        """Return the ``getaddrinfo`` entries for ``host:port``.
+
+        Resolves synchronously only on a miss; an expired entry is returned at
+        once while it is refreshed in the background. With a TTL of 0 nothing
+        is cached, and every call resolves synchronously.
+
+        Raises:
+            socket.gaierror: Resolution failed and nothing is cached.
+        """
+        key = (host, port)
+        with self._lock:
+            entry = self._entries.get(key) if self.ttl > 0 else None
+            if entry is not None:
+                expires, addresses = entry
+                if time.monotonic() < expires:
+                    self.hits += 1
+                    return addresses
+                self.stale += 1
+                if key in self._refreshing:
+                    return addresses
+                self._refreshing.add(key)
+        if entry is None:
+            self.misses += 1
+            try:
+                return self._lookup(host, port)
+            except OSError:
+                self.errors += 1
+                raise
+        threading.Thread(target=self._refresh, args=key, name="TAKResolver", daemon=True).start()
+        return addresses
+
+    def stats(self):
+        """Counters suitable for a health snapshot."""
+        return {
+            "dns_hits": self.hits,
+            "dns_misses": self.misses,
+            "dns_stale": self.stale,
+            "dns_errors": self.errors,
+            "dns_resolve_ms_last": self.resolve_ms_last,
+        }
+
+
+def interleave(addresses):
+    """Order addresses so families alternate, keeping the resolver's preference first."""
+    by_family = {}
+    for address in addresses:
+        by_family.setdefault(address[0], []).append(address)
+    queues = list(by_family.values())
+    ordered = []
+    while queues:
+        ordered.extend(q.pop(0) for q in queues)
+        queues = [q for q in queues if q]
+    return ordered
+
+
+def connect_first(addresses, timeout, stagger=HAPPY_EYEBALLS_DELAY):
+    """Connect to whichever of ``addresses`` answers first.
+
+    Args:
+        addresses: ``getaddrinfo`` entries to try
+        timeout: Seconds before giving up on every attempt
+        stagger: Seconds to wait for an attempt before starting the next one
+
+    Returns:
+        tuple: ``(socket, sockaddr)``; the socket is connected, with
+        ``timeout`` as its timeout.
+
+    Raises:
+        OSError: Every attempt failed (the last error), or ``socket.timeout``.
+    """
+    if len(addresses) == 1:
+        family, type_, proto, _, sockaddr = addresses[0]
+        sock = socket.socket(family, type_, proto)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(sockaddr)
+        except OSError:
+            sock.close()
+            raise
+        return sock, sockaddr
+    queue = interleave(addresses)
+    deadline = time.monotonic() + timeout
+    next_start = time.monotonic()
+    error = None
+    with selectors.DefaultSelector() as selector:
+        try:
+            while True:
+                now = time.monotonic()
+                if queue and (now >= next_start or not selector.get_map()):
+                    error = _start_attempt(selector, queue.pop(0)) or error
+                    next_start = now + stagger
+                    continue
+                if not selector.get_map():
+                    raise error or OSError("no addresses to connect to")
+                if now >= deadline:
+                    raise socket.timeout("timed out")
+                wait = min(deadline, next_start) if queue else deadline
+                for key, _ in selector.select(wait - now):
+                    sock = key.fileobj
+                    selector.unregister(sock)
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if not err:
+                        sock.settimeout(timeout)
+                        return sock, key.data
+                    sock.close()
+                    error = OSError(err, os.strerror(err))
+                    next_start = now  # a failure starts the next attempt at once
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+
+
+def _start_attempt(selector, address):
+    """Begin a non-blocking connect and register it; returns the error if it failed at once."""
+    family, type_, proto, _, sockaddr = address
+    try:
+        sock = socket.socket(family, type_, proto)
+    except OSError as e:
+        return e
+    sock.setblocking(False)
+    err = sock.connect_ex(sockaddr)
+    if err not in _IN_PROGRESS:
+        sock.close()
+        return OSError(err, os.strerror(err))
+    selector.register(sock, selectors.EVENT_WRITE, sockaddr)
+    return None
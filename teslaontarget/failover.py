@@ -0,0 +1,201 @@
+"""Primary/secondary TAK failover with hot-standby connections.
+
+:class:`FailoverClient` holds one :class:`~teslaontarget.tak_client.TAKClient`
+per endpoint, in priority order, and sends through exactly one of them (the
+*active* endpoint). Every endpoint stays connected, so a standby is already
+connected, negotiated and pinging when it is needed. When the active
+connection fails (seen by its reader within milliseconds, or by its pings
+within seconds), a supervisor thread switches to the best connected standby.
+It moves over everything still queued on the failed endpoint, plus the events
+written to it in the last ``resend_window`` seconds, which may have died in
+flight. Delivery across a switch is at-least-once; a duplicate position
+report is harmless to a TAK server. Once a higher-priority endpoint has been
+connected for ``failback_after`` seconds, traffic moves back to it.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+#: Seconds a higher-priority endpoint must stay connected before failing back.
+DEFAULT_FAILBACK_AFTER = 30
+#: Seconds of already-written events re-sent after an unplanned switchover.
+DEFAULT_RESEND_WINDOW = 2.0
+
+
+class FailoverClient:
+    """Send CoT events to the best available endpoint of an ordered list."""
+
+    def __init__(self, clients, failback_after=DEFAULT_FAILBACK_AFTER, resend_window=DEFAULT_RESEND_WINDOW):
+        """Initialize the failover group.
+
+        Args:
+            clients: ``TAKClient`` per endpoint, highest priority (the primary) first
+            failback_after: Seconds a higher-priority endpoint must stay
+                connected before traffic moves back to it
+            resend_window: Seconds of written events each endpoint keeps for
+                re-sending after an unplanned switchover
+        """
+        self.clients = list(clients)
+        self.failback_after = failback_after
+        for client in self.clients:
+            client.resend_window = resend_window
+        self.active_index = 0
+        self.poll_interval = 0.05  # seconds; bounds switchover latency
+        self.supervisor_thread = None
+        self.stop_supervisor = threading.Event()
+        self._lock = threading.Lock()  # serializes switchovers with sends
+        # Health / telemetry
+        self.switchovers = 0
+        self.last_switchover = None
+        self.last_switchover_ms = None
+        self.last_switchover_reason = None
+
+    @property
+    def active(self):
+        """The endpoint currently carrying traffic."""
+        return self.clients[self.active_index]
+
+    @property
+    def wire_format(self):
+        """``(protocol_version, mesh)`` of the active endpoint."""
+        return self.active.wire_format
+
+    @property
+    def connected(self):
+        """True while the active endpoint is connected."""
+        return self.active.connected
+
+    def send_cot(self, cot_message, uid=None):
+        """Queue an event on the active endpoint; see ``TAKClient.send_cot``."""
+        self.start_supervisor()
+        with self._lock:
+            return self.active.send_cot(cot_message, uid=uid)
+
+    def send_batch(self, cot_messages, uids=None):
+        """Queue several events on the active endpoint; see ``TAKClient.send_batch``."""
+        self.start_supervisor()
+        with self._lock:
+            return self.active.send_batch(cot_messages, uids)
+
+    def _preferred(self):
+        """Index of the endpoint that should be active now.
+
+        The active endpoint stays while it is connected, unless a
+        higher-priority one has been connected for ``failback_after``. A dead
+        active endpoint gives way to the highest-priority connected one. With
+        nothing connected, traffic stays queued where it is.
+        """
+        active = self.active
+        for index, client in enumerate(self.clients):
+            if not client.connected:
+                continue
+            if index == self.active_index or not active.connected:
+                return index
+            if time.time() - client.last_connect_ok >= self.failback_after:
+                return index
+        return self.active_index
+
+    def _switch(self, index):
+        """Make ``index`` the active endpoint, carrying over the old one's traffic."""
+        old, new = self.active, self.clients[index]
+        planned = old.connected
+        started = time.time()
+        with self._lock:
+            self.active_index = index
+            pending = old.outbound.get_many(len(old.outbound))
+            # An unplanned switch re-sends what may have died in flight; after a
+            # planned one the old endpoint stays up, so it delivered its writes.
+            resent = [] if planned else old.recent_writes()
+            new.outbound.absorb(resent + pending)
+        new.start_writer()
+        self.switchovers += 1
+        self.last_switchover = time.time()
+        # Unplanned: measured from when the failure was noticed.
+        since = started if planned or old.last_error_time is None else min(started, old.last_error_time)
+        self.last_switchover_ms = (self.last_switchover - since) * 1000
+        self.last_switchover_reason = "failback" if planned else "failover"
+        logger.warning(
+            f"TAK {self.last_switchover_reason}: {old.endpoint} -> {new.endpoint} "
+            f"({len(pending)} queued, {len(resent)} re-sent, {self.last_switchover_ms:.0f} ms)")
+
+    def _supervise_once(self):
+        """One supervisor pass: switch if needed, then keep the standbys warm."""
+        index = self._preferred()
+        if index != self.active_index:
+            self._switch(index)
+        for i, client in enumerate(self.clients):
+            if i == self.active_index:
+                continue
+            if len(client.outbound):
+                # Stragglers the old endpoint's writer requeued after a switch.
+                with self._lock:
+                    self.active.outbound.absorb(client.outbound.get_many(len(client.outbound)))
+                self.active.start_writer()
+            if not client.connected:
+                client.start_background_reconnect()
+
+    def _supervisor_loop(self):
+        logger.info(f"Starting TAK failover supervisor ({len(self.clients)} endpoints)")
+        while not self.stop_supervisor.is_set():
+            self._supervise_once()
+            self.stop_supervisor.wait(self.poll_interval)
+        logger.info("TAK failover supervisor stopped")
+
+    def start_supervisor(self):
+        """Start the supervisor thread if it is not already running."""
+        if self.supervisor_thread and self.supervisor_thread.is_alive():
+            return
+        with self._lock:
+            if self.supervisor_thread and self.supervisor_thread.is_alive():
+                return
+            self.stop_supervisor.clear()
+            self.supervisor_thread = threading.Thread(
+                target=self._supervisor_loop, name="TAKFailover", daemon=True)
+            self.supervisor_thread.start()
+
+    def disconnect(self):
+        """Disconnect every endpoint."""
+        for client in self.clients:
+            client.disconnect()
+
+    def start_background_reconnect(self):
+        """Reconnect every endpoint; the supervisor picks the active one."""
+        for client in self.clients:
+            client.start_background_reconnect()
+        self.start_supervisor()
+
+    def close(self):
+        """Stop the supervisor, then every endpoint."""
+        self.stop_supervisor.set()
+        if self.supervisor_thread and self.supervisor_thread.is_alive():
+            self.supervisor_thread.join(timeout=2)
+        for client in self.clients:
+            client.close()
+
+    def health_snapshot(self):
+        """Return a health dict: the active endpoint, switchover stats, and every endpoint.
+
+        ``last_send_ok`` is the most recent send on *any* endpoint (standbys
+        only send pings), so the health monitor escalates only once the whole
+        group is unreachable.
+        """
+        snapshots = [client.health_snapshot() for client in self.clients]
+        sends = [s["last_send_ok"] for s in snapshots if s.get("last_send_ok") is not None]
+        connects = [s["last_connect_ok"] for s in snapshots if s.get("last_connect_ok") is not None]
+        active = self.active
+        return {
+            "connected": active.connected,
+            "active_endpoint": active.endpoint,
+            "active_index": self.active_index,
+            "endpoints_connected": sum(1 for s in snapshots if s.get("connected")),
+            "switchovers": self.switchovers,
+            "last_switchover": self.last_switchover,
+            "last_switchover_ms": self.last_switchover_ms,
+            "last_switchover_reason": self.last_switchover_reason,
+            "last_send_ok": max(sends) if sends else None,
+            "last_connect_ok": max(connects) if connects else None,
+            "endpoints": snapshots,
+        }
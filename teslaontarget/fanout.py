@@ -0,0 +1,96 @@
+"""Fan-out of one event stream to several TAK destinations.
+
+:class:`FanOutClient` wraps one transport per configured ``COT_URL`` and
+presents them as a single client. Each destination keeps its own outbound
+queue, writer and reconnect state, so a slow or unreachable server only backs
+up its own queue. Each event is encoded once per wire format in use, however
+many destinations share it.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FanOutClient:
+    """Send every CoT event to N independent TAK transports."""
+
+    def __init__(self, destinations):
+        """Initialize the fan-out.
+
+        Args:
+            destinations: Transport clients (``TAKClient``, ``AsyncTAKClient``,
+                ``UDPTAKClient``), one per destination
+        """
+        self.destinations = list(destinations)
+
+    def _encode_once(self, cot_message):
+        """Encode an event for every destination's wire format up front.
+
+        Events memoize their encodings, so the per-destination writers then
+        reuse the same bytes instead of racing to encode them again.
+        """
+        if isinstance(cot_message, (bytes, bytearray, memoryview)):
+            return
+        for version, mesh in {d.wire_format for d in self.destinations}:
+            cot_message.encode(version, mesh=mesh)
+
+    def send_cot(self, cot_message, uid=None):
+        """Hand the event to every destination.
+
+        Args:
+            cot_message: Formatted CoT message bytes or a ``CotMessage``
+            uid: CoT UID used as each destination's coalescing key
+
+        Returns:
+            bool: True if at least one destination accepted the event.
+        """
+        self._encode_once(cot_message)
+        accepted = [d.send_cot(cot_message, uid=uid) for d in self.destinations]
+        return any(accepted)
+
+    def send_batch(self, cot_messages, uids=None):
+        """Hand several events to every destination; see :meth:`send_cot`."""
+        cot_messages = list(cot_messages)
+        for message in cot_messages:
+            self._encode_once(message)
+        accepted = [d.send_batch(cot_messages, uids) for d in self.destinations]
+        return any(accepted)
+
+    @property
+    def connected(self):
+        """True while any destination is connected."""
+        return any(d.connected for d in self.destinations)
+
+    def disconnect(self):
+        """Disconnect every destination."""
+        for d in self.destinations:
+            d.disconnect()
+
+    def start_background_reconnect(self):
+        """Ask every destination to reconnect (each does so independently)."""
+        for d in self.destinations:
+            d.start_background_reconnect()
+
+    def close(self):
+        """Stop and disconnect every destination."""
+        for d in self.destinations:
+            d.close()
+
+    def health_snapshot(self):
+        """Return a health dict with one entry per destination.
+
+        Top-level ``last_send_ok`` is the most recent send to *any* destination,
+        so the health monitor only escalates once nothing is getting through;
+        each destination's own state is under ``destinations``.
+        """
+        snapshots = [d.health_snapshot() for d in self.destinations]
+        sends = [s["last_send_ok"] for s in snapshots if s.get("last_send_ok") is not None]
+        connects = [s["last_connect_ok"] for s in snapshots if s.get("last_connect_ok") is not None]
+        return {
+            "connected": any(s.get("connected") for s in snapshots),
+            "destinations_connected": sum(1 for s in snapshots if s.get("connected")),
+            "last_send_ok": max(sends) if sends else None,
+            "last_connect_ok": max(connects) if connects else None,
+            "destinations": snapshots,
+        }
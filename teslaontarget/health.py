@@ -15,6 +15,9 @@ import logging
 import urllib.request
 from typing import Optional
 
+from .cot import cot_stats
+from .dead_reckoning import scheduler
+
 logger = logging.getLogger(__name__)
 
 
@@ -96,6 +99,8 @@ class HealthMonitor:
             "time": now,
             "connected": snap.get("connected"),
             "tak": snap,
+            "cot": cot_stats(),
+            "dead_reckoning": scheduler.stats(),
             "stale_seconds": stale_for,
             "threshold_seconds": self.max_no_send_seconds,
         })
@@ -0,0 +1,125 @@
+"""Bounded outbound queue with per-UID latest-wins coalescing.
+
+Producers (vehicle and dead-reckoning threads) hand events to the queue and
+return immediately; a single writer drains it onto the TAK socket. While the
+link is slow or down the queue holds at most one event per CoT UID -- the
+newest -- so a backlog never replays stale positions.
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+
+#: Default bound on the number of distinct pending events.
+DEFAULT_MAX_QUEUE = 256
+
+
+class CoalescingQueue:
+    """Thread-safe FIFO of pending messages keyed by CoT UID.
+
+    Putting a message whose key is already pending replaces it in place (a
+    *coalesce*), keeping its position in line so one chatty vehicle can't starve
+    the others. When the queue is full the oldest entry is evicted (a *drop*).
+    Messages put without a key are never coalesced.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAX_QUEUE):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._cond = threading.Condition()
+        self._anonymous = itertools.count()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, message, key=None):
+        """Queue ``message`` under ``key`` (latest wins); never blocks.
+
+        Returns:
+            The message this one displaced (coalesced or evicted), else None.
+        """
+        with self._cond:
+            if key is None:
+                key = (None, next(self._anonymous))
+            displaced = None
+            if key in self._items:
+                displaced = self._items[key]
+                self._items[key] = message
+                self.coalesced += 1
+            else:
+                if len(self._items) >= self.maxsize:
+                    displaced = self._items.popitem(last=False)[1]
+                    self.dropped += 1
+                self._items[key] = message
+            self.enqueued += 1
+            self._cond.notify()
+            return displaced
+
+    def requeue(self, key, message):
+        """Return a message that failed to send to the head of the line.
+
+        Skipped if a newer message for the same key arrived in the meantime, or
+        if the queue has since filled up (the failed message is the oldest).
+
+        Returns:
+            ``message`` if it was not put back, else None.
+        """
+        with self._cond:
+            return self._push_front(key, message)
+
+    def absorb(self, items):
+        """Put ``(key, message)`` pairs taken from another queue ahead of this one's.
+
+        Used when traffic moves between connections: the pairs keep their
+        order, and each is skipped as :meth:`requeue` would skip it.
+
+        Returns:
+            list: The messages that were not taken.
+        """
+        with self._cond:
+            left = []
+            for key, message in reversed(items):
+                if isinstance(key, tuple) and key[0] is None:
+                    key = (None, next(self._anonymous))  # the other queue's numbering
+                if self._push_front(key, message) is not None:
+                    left.append(message)
+            return left
+
+    def _push_front(self, key, message):
+        if key in self._items:
+            return message
+        if len(self._items) >= self.maxsize:
+            self.dropped += 1
+            return message
+        self._items[key] = message
+        self._items.move_to_end(key, last=False)
+        self._cond.notify()
+        return None
+
+    def get(self, timeout=None):
+        """Pop the oldest ``(key, message)``, waiting up to ``timeout``; None if empty."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popitem(last=False)
+
+    def get_many(self, limit):
+        """Pop up to ``limit`` oldest ``(key, message)`` pairs without waiting."""
+        with self._cond:
+            count = min(limit, len(self._items))
+            return [self._items.popitem(last=False) for _ in range(count)]
+
+    def stats(self):
+        """Counters suitable for a health snapshot."""
+        with self._cond:
+            return {
+                "queue_depth": len(self._items),
+                "queue_max": self.maxsize,
+                "queue_enqueued": self.enqueued,
+                "queue_coalesced": self.coalesced,
+                "queue_dropped": self.dropped,
+            }
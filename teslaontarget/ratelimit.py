@@ -0,0 +1,159 @@
+"""Token-bucket egress rate limiting with priority classes.
+
+:class:`RateLimitedClient` wraps the TAK transport and admits an event only
+while its token buckets (bytes per second and/or events per second) hold more
+than the event's priority class must leave in reserve. A real fix may drain a
+bucket; a dead-reckoned update needs it over a quarter full and a cached
+resend over half full. As the uplink saturates, cached resends are shed
+first, then dead-reckoned updates, and real fixes last. An admitted event's
+cost is debited even if that overdraws the bucket, so an event larger than
+the whole bucket still gets through on a slow link, and the debt is repaid
+before anything else is sent. Shed events are dropped, not queued: the next
+update for the same vehicle supersedes them.
+"""
+
+import logging
+import threading
+import time
+
+from .cot import PRIORITY_FIX, PRIORITY_NAMES
+
+logger = logging.getLogger(__name__)
+
+#: Seconds of traffic each bucket holds, i.e. the largest burst let through.
+DEFAULT_BURST_SECONDS = 2.0
+#: Fraction of each bucket a class must leave untouched, indexed by ``cot.PRIORITY_*``.
+RESERVES = (0.0, 0.25, 0.5)
+
+
+class TokenBucket:
+    """Tokens refilled at ``rate`` per second, up to ``capacity``; not thread-safe."""
+
+    def __init__(self, rate, capacity):
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            capacity: Most tokens held
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._refilled = time.monotonic()
+
+    def refill(self, now):
+        """Add the tokens earned since the last refill."""
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def allows(self, reserve):
+        """True while more than ``reserve`` (a fraction of capacity) is left."""
+        return self.tokens > self.capacity * reserve
+
+    def take(self, cost):
+        """Debit ``cost`` tokens; the balance may go negative."""
+        self.tokens -= cost
+
+
+class RateLimitedClient:
+    """Cap a TAK transport's egress, shedding low-priority events first."""
+
+    def __init__(self, inner, bytes_per_sec=0, events_per_sec=0, burst_seconds=DEFAULT_BURST_SECONDS):
+        """Initialize the limiter.
+
+        Args:
+            inner: Transport client to send through (``TAKClient``,
+                ``FanOutClient``, ...)
+            bytes_per_sec: Average egress cap in encoded bytes (0 = no cap)
+            events_per_sec: Average egress cap in events (0 = no cap)
+            burst_seconds: Seconds of traffic each bucket holds
+        """
+        self.inner = inner
+        self.buckets = []  # (bucket, cost function)
+        if bytes_per_sec:
+            self.buckets.append((TokenBucket(bytes_per_sec, bytes_per_sec * burst_seconds), self._event_bytes))
+        if events_per_sec:
+            self.buckets.append((TokenBucket(events_per_sec, events_per_sec * burst_seconds), lambda _: 1))
+        self._lock = threading.Lock()
+        # Health / telemetry, per priority class
+        self.admitted = [0] * len(PRIORITY_NAMES)
+        self.shed = [0] * len(PRIORITY_NAMES)
+
+    @property
+    def wire_format(self):
+        """``(protocol_version, mesh)`` of the wrapped transport (XML for a fan-out)."""
+        return getattr(self.inner, "wire_format", (0, False))
+
+    def _event_bytes(self, message):
+        if isinstance(message, (bytes, bytearray, memoryview)):
+            return len(message)
+        version, mesh = self.wire_format
+        return len(message.encode(version, mesh=mesh))
+
+    def _admit(self, message):
+        """Charge the buckets for ``message``; False if its class must be shed."""
+        priority = getattr(message, "priority", PRIORITY_FIX)
+        reserve = RESERVES[priority]
+        with self._lock:
+            now = time.monotonic()
+            for bucket, _ in self.buckets:
+                bucket.refill(now)
+            if not all(bucket.allows(reserve) for bucket, _ in self.buckets):
+                self.shed[priority] += 1
+                logger.debug(f"Rate limit: shed {PRIORITY_NAMES[priority]} event")
+                return False
+            for bucket, cost in self.buckets:
+                bucket.take(cost(message))
+            self.admitted[priority] += 1
+            return True
+
+    def send_cot(self, cot_message, uid=None):
+        """Send the event if the rate limit admits it.
+
+        Returns:
+            bool: False if the event was shed, else the transport's result.
+        """
+        if not self._admit(cot_message):
+            return False
+        return self.inner.send_cot(cot_message, uid=uid)
+
+    def send_batch(self, cot_messages, uids=None):
+        """Send the admitted subset of several events; see :meth:`send_cot`."""
+        cot_messages = list(cot_messages)
+        uids = list(uids) if uids is not None else [None] * len(cot_messages)
+        admitted = [(m, u) for m, u in zip(cot_messages, uids) if self._admit(m)]
+        if not admitted:
+            return False
+        messages, keys = zip(*admitted)
+        return self.inner.send_batch(list(messages), list(keys))
+
+    @property
+    def connected(self):
+        """True while the wrapped transport is connected."""
+        return self.inner.connected
+
+    def disconnect(self):
+        """Disconnect the wrapped transport."""
+        self.inner.disconnect()
+
+    def start_background_reconnect(self):
+        """Ask the wrapped transport to reconnect."""
+        self.inner.start_background_reconnect()
+
+    def close(self):
+        """Stop and disconnect the wrapped transport."""
+        self.inner.close()
+
+    def stats(self):
+        """Admitted and shed counts per priority class."""
+        stats = {}
+        for index, name in enumerate(PRIORITY_NAMES):
+            stats[f"ratelimit_admitted_{name}"] = self.admitted[index]
+            stats[f"ratelimit_shed_{name}"] = self.shed[index]
+        return stats
+
+    def health_snapshot(self):
+        """Return the wrapped transport's health dict plus the per-class counts."""
+        snapshot = self.inner.health_snapshot()
+        snapshot.update(self.stats())
+        return snapshot
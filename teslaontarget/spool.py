@@ -0,0 +1,230 @@
+"""Append-only on-disk spool of CoT events held back during TAK outages.
+
+While the link is down the outbound queue keeps only the newest event per
+vehicle; :class:`Spool` keeps the ones it displaces, so the server's track
+history can be backfilled once the link returns. Records are appended to
+numbered segment files in one directory. A full segment rolls over to a new
+one, and when the total exceeds the size cap the oldest segment is deleted.
+Replay is at-least-once: the read position is kept in memory, so after a
+restart the oldest unfinished segment is replayed from its start.
+
+Record layout (little-endian): event time (float64 epoch), stale time
+(float64 epoch), payload kind (uint8), payload length (uint32), payload.
+"""
+
+import itertools
+import logging
+import os
+import struct
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+#: Bytes per segment file before rolling to the next.
+DEFAULT_SEGMENT_BYTES = 1 << 20
+#: Total spool size cap; the oldest segment is deleted beyond it.
+DEFAULT_MAX_BYTES = 64 << 20
+
+#: Payload kinds: pre-encoded wire bytes, or a serialized ``CotMessage``.
+RAW, EVENT = 0, 1
+
+_HEADER = struct.Struct("<ddBI")
+_SUFFIX = ".seg"
+
+
+class Spool:
+    """Thread-safe segmented append-only spool with peek/commit replay."""
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, max_bytes=DEFAULT_MAX_BYTES):
+        """Open (or create) the spool in ``directory``, recovering any existing segments.
+
+        Args:
+            directory: Directory holding the segment files
+            segment_bytes: Size at which the active segment rolls over
+            max_bytes: Total size cap across all segments
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # seq -> [bytes, records, oldest event time]; ordered oldest first
+        self._segments = {}
+        self._tail = None  # open append handle for the newest segment
+        self._tail_seq = None
+        self._head = deque()  # parsed, unreplayed records of the oldest segment
+        self._head_seq = None
+        self.appended = 0
+        self.replayed = 0
+        self.expired = 0
+        self.dropped = 0
+        os.makedirs(directory, exist_ok=True)
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit():
+                self._recover(int(name[:-len(_SUFFIX)]))
+        if self._segments:
+            logger.info(f"Spool recovered {self.pending} events ({self.size} bytes) from {directory}")
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f"{seq:08d}{_SUFFIX}")
+
+    def _read_segment(self, seq):
+        """Parse every whole record in a segment, truncating a torn final record."""
+        with open(self._path(seq), "rb") as f:
+            data = f.read()
+        records, offset = [], 0
+        while offset + _HEADER.size <= len(data):
+            event_time, stale, kind, length = _HEADER.unpack_from(data, offset)
+            end = offset + _HEADER.size + length
+            if end > len(data):
+                break
+            records.append((event_time, stale, kind, data[offset + _HEADER.size:end]))
+            offset = end
+        if offset < len(data):
+            logger.warning(f"Spool segment {self._path(seq)} ends in a partial record; truncating")
+            with open(self._path(seq), "r+b") as f:
+                f.truncate(offset)
+        return records, offset
+
+    def _recover(self, seq):
+        records, size = self._read_segment(seq)
+        if not records:
+            os.remove(self._path(seq))
+            return
+        self._segments[seq] = [size, len(records), records[0][0]]
+
+    @property
+    def size(self):
+        """Bytes on disk across all segments."""
+        return sum(s[0] for s in self._segments.values())
+
+    @property
+    def pending(self):
+        """Records not yet replayed."""
+        return sum(s[1] for s in self._segments.values())
+
+    def append(self, event_time, stale, kind, payload):
+        """Append one record, rolling segments and enforcing the size cap."""
+        record = _HEADER.pack(event_time, stale, kind, len(payload)) + payload
+        with self._lock:
+            if self._tail is None or self._segments[self._tail_seq][0] + len(record) > self.segment_bytes:
+                self._roll()
+            self._tail.write(record)
+            self._tail.flush()
+            segment = self._segments[self._tail_seq]
+            segment[0] += len(record)
+            segment[1] += 1
+            if segment[2] is None:
+                segment[2] = event_time
+            self.appended += 1
+            while self.size > self.max_bytes and len(self._segments) > 1:
+                self._drop_oldest()
+
+    def _roll(self):
+        """Close the active segment and start the next one."""
+        if self._tail is not None:
+            self._tail.close()
+        self._tail_seq = max(self._segments, default=0) + 1
+        self._tail = open(self._path(self._tail_seq), "ab")
+        self._segments[self._tail_seq] = [0, 0, None]
+
+    def _drop_oldest(self):
+        seq = next(iter(self._segments))
+        dropped = self._segments[seq][1]
+        self._remove(seq)
+        self.dropped += dropped
+        logger.warning(f"Spool over {self.max_bytes} bytes; dropped {dropped} oldest events")
+
+    def _remove(self, seq):
+        """Delete a segment that is not being appended to."""
+        del self._segments[seq]
+        if seq == self._head_seq:
+            self._head.clear()
+            self._head_seq = None
+        os.remove(self._path(seq))
+
+    def _load_head(self):
+        """Make sure ``_head`` holds the oldest segment's unreplayed records."""
+        while not self._head:
+            if self._head_seq is not None:
+                self._remove(self._head_seq)  # fully replayed
+            if not self._segments:
+                return
+            seq = next(iter(self._segments))
+            if seq == self._tail_seq:
+                self._tail.close()  # never read a segment that is still being appended to
+                self._tail = self._tail_seq = None
+            self._head_seq = seq
+            self._head.extend(self._read_segment(seq)[0])
+
+    def peek(self, limit, now=None):
+        """Return up to ``limit`` oldest unexpired ``(kind, payload)`` records.
+
+        Records whose stale time has passed are discarded on the way (counted as
+        ``expired``). The returned records stay spooled until passed to :meth:`commit`.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            while True:
+                self._load_head()
+                while self._head and self._head[0][1] <= now:
+                    self._head.popleft()
+                    self._consumed()
+                    self.expired += 1
+                if self._head or not self._segments:
+                    break
+            out = []
+            for _, stale, kind, payload in itertools.islice(self._head, limit):
+                if stale <= now:
+                    break  # expired mid-batch: dropped by the next peek
+                out.append((kind, payload))
+            return out
+
+    def commit(self, records):
+        """Mark ``records``, as returned by :meth:`peek`, as replayed.
+
+        Only records still at the head are committed: if the size cap dropped
+        them since the peek, they are gone already and nothing else is.
+        """
+        with self._lock:
+            for _, payload in records:
+                if not self._head or self._head[0][3] is not payload:
+                    return
+                self._head.popleft()
+                self._consumed()
+                self.replayed += 1
+
+    def _consumed(self):
+        segment = self._segments[self._head_seq]
+        segment[1] -= 1
+        segment[2] = self._head[0][0] if self._head else None
+
+    def lag(self, now=None):
+        """Seconds between now and the oldest unreplayed event (0 when empty)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            oldest = [s[2] for s in self._segments.values() if s[1] and s[2] is not None]
+            return max(0.0, now - min(oldest)) if oldest else 0.0
+
+    def close(self):
+        """Close the active segment file."""
+        with self._lock:
+            if self._tail is not None:
+                self._tail.close()
+                self._tail = self._tail_seq = None
+
+    def stats(self, now=None):
+        """Counters suitable for a health snapshot."""
+        lag = self.lag(now)
+        with self._lock:
+            return {
+                "spool_bytes": self.size,
+                "spool_segments": len(self._segments),
+                "spool_pending": self.pending,
+                "spool_lag_seconds": lag,
+                "spool_appended": self.appended,
+                "spool_replayed": self.replayed,
+                "spool_expired": self.expired,
+                "spool_dropped": self.dropped,
+            }
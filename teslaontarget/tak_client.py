@@ -1,65 +1,385 @@
 """TAK server connection and communication handling."""
 
+import selectors
 import socket
 import time
 import logging
 import threading
+import uuid
+from collections import deque
 from urllib.parse import urlparse
 
+from . import dialer, takproto
+from .cot import CotMessage
+from .outbound import DEFAULT_MAX_QUEUE, CoalescingQueue
+from .spool import EVENT, RAW
+
 logger = logging.getLogger(__name__)
 
+#: Most events gathered into one scatter-gather write (well under IOV_MAX).
+MAX_BATCH = 256
+#: Spooled events replayed per second after a reconnect.
+DEFAULT_REPLAY_RATE = 20
+#: Stale window assumed for spooled pre-encoded bytes, which carry no stale time
+#: the spool can read (``build_cot_event``'s default); spooled ``CotMessage``
+#: events keep their own per-vehicle stale time.
+RAW_STALE_SECONDS = 300
+#: Seconds before an unanswered ping is counted as lost and may be re-sent.
+PING_TIMEOUT = 5
+#: Seconds between CoT pings on an open connection (0 = never ping).
+DEFAULT_PING_INTERVAL = 10
+#: Idle seconds before the kernel starts TCP keepalive probes (0 = kernel defaults).
+DEFAULT_KEEPALIVE = 5
+#: Seconds between keepalive probes, and unanswered probes before the peer is dead.
+KEEPALIVE_INTERVAL = 1
+KEEPALIVE_PROBES = 3
+#: Weight of each new sample in the smoothed round-trip time (as TCP's SRTT).
+RTT_ALPHA = 0.125
+
+
+def _wire_bytes(message, version):
+    """Bytes for ``message`` on a connection speaking TAK Protocol ``version``.
+
+    Pre-encoded bytes pass through untouched; event objects (``cot.CotMessage``)
+    are encoded for the negotiated version.
+    """
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return message
+    return message.encode(version)
+
 
 class TAKClient:
     """Handle connection and communication with TAK server."""
     
-    def __init__(self, cot_url):
+    def __init__(self, cot_url, max_queue=DEFAULT_MAX_QUEUE, flush_window=0.0, max_batch=MAX_BATCH,
+                 protocol=0, spool=None, replay_rate=DEFAULT_REPLAY_RATE,
+                 keepalive=DEFAULT_KEEPALIVE, ping_interval=DEFAULT_PING_INTERVAL, dns_ttl=dialer.DEFAULT_DNS_TTL):
         """Initialize TAK client.
         
         Args:
-            cot_url: TAK server URL (e.g., 'tcp://192.168.1.100:8085')
+            cot_url: TAK server URL (e.g., 'tcp://192.168.1.100:8085'), or
+                'unix:///path/to/socket' for a server or relay on this host
+            max_queue: Bound on distinct pending events in the outbound queue
+            flush_window: Seconds the writer lingers after the first pending
+                event so concurrent updates share one write (0 = no linger)
+            max_batch: Most events written with one ``sendmsg`` call
+            protocol: Highest TAK protocol version to negotiate (0 = XML only,
+                1 = switch to protobuf when the server offers it)
+            spool: Optional ``spool.Spool`` that keeps events displaced from
+                the queue while disconnected, for replay after reconnecting
+            replay_rate: Most spooled events replayed per second
+            keepalive: Idle seconds before TCP keepalive probing; also bounds
+                how long sent data may go unacknowledged (0 = kernel defaults)
+            ping_interval: Seconds between CoT pings (0 = never ping)
+            dns_ttl: Seconds a resolved address list is reused across reconnects
         """
         parsed = urlparse(cot_url)
         self.host = parsed.hostname
         self.port = parsed.port
+        self.path = parsed.path if parsed.scheme == "unix" else None
         self.socket = None
         self.connected = False
+        self.resolver = dialer.ResolverCache(ttl=dns_ttl)
+        self.peer_address = None
         self.reconnect_thread = None
         self.stop_reconnect = threading.Event()
         self.reconnect_interval = 5  # seconds between reconnection attempts
+        # Outbound queue drained by a single writer thread (the only socket writer)
+        self.outbound = CoalescingQueue(max_queue)
+        self.writer_thread = None
+        self.stop_writer = threading.Event()
+        self.writer_poll_interval = 0.1  # seconds; bounds writer wake-up latency
+        self.flush_window = flush_window
+        self.max_batch = max_batch
+        # TAK protocol: preferred version and the one negotiated for this connection
+        self.protocol = protocol
+        self.protocol_version = 0
+        self.negotiation_timeout = 2  # seconds to wait for each takp control event
+        self.uid = f"TeslaOnTarget-{uuid.uuid4().hex[:8]}"
+        self._writer_lock = threading.Lock()
+        # Outage spool and its replay token bucket (refilled by the writer thread)
+        self.spool = spool
+        self.replay_rate = replay_rate
+        self._replay_budget = 0.0
+        self._replay_refilled = time.monotonic()
+        self._live_event_times = {}  # CoT UID -> event time of its newest live write
+        self.spool_superseded = 0
+        # Inbound reader (one thread per connection) and ping round-trip timing
+        self.reader_thread = None
+        self.reader_poll_interval = 0.1  # seconds; bounds reader exit latency after disconnect
+        self.keepalive = keepalive
+        self.ping_interval = ping_interval
+        self.ping_timeout = PING_TIMEOUT
+        self._ping_sent_at = None
+        self._next_ping = 0.0
+        self._pong_seen = False  # this server answers pings, so silence means a dead peer
+        # Events written in the last ``resend_window`` seconds (0 = not kept), for
+        # a failover group to re-send if this connection dies with them in flight
+        self.resend_window = 0
+        self._recent = deque()
+        self._recent_lock = threading.Lock()  # the writer adds, a failover supervisor takes
         # Health / telemetry
         self.last_connect_ok = None
         self.last_send_ok = None
         self.last_send_attempt = None
         self.last_error = None
         self.last_error_time = None
+        self.write_calls = 0
+        self.events_sent = 0
+        self.bytes_sent = 0
+        self.connect_attempts = 0
+        self.connect_failures = 0
+        self.connect_ms_last = None
+        self.inbound_events = 0
+        self.inbound_bytes = 0
+        self.inbound_errors = 0
+        self.last_inbound = None
+        self.pings_sent = 0
+        self.pings_lost = 0
+        self.pings_answered = 0
+        self.pongs_received = 0
+        self.rtt_last = None
+        self.rtt_smoothed = None
         
+    @property
+    def endpoint(self):
+        """The server as ``host:port``, or ``unix:<path>`` for a local socket."""
+        return f"unix:{self.path}" if self.path else f"{self.host}:{self.port}"
+
+    @property
+    def wire_format(self):
+        """``(protocol_version, mesh)`` that queued ``CotMessage`` events are encoded with."""
+        return self.protocol_version, False
+
     def connect(self):
         """Connect to TAK server."""
         try:
             if self.socket:
                 self.disconnect()
                 
-            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.socket.settimeout(10)
-            self.socket.connect((self.host, self.port))
+            # Nothing is agreed on a new connection until its handshake says so
+            self.protocol_version = 0
+            self.connect_attempts += 1
+            started = time.monotonic()
+            if self.path:
+                addresses = [(socket.AF_UNIX, socket.SOCK_STREAM, 0, "", self.path)]
+            else:
+                addresses = self.resolver.resolve(self.host, self.port)
+            self.socket, sockaddr = dialer.connect_first(addresses, timeout=10)
+            self.peer_address = sockaddr if self.path else sockaddr[0]
+            self.connect_ms_last = (time.monotonic() - started) * 1000
+            logger.info(f"Connected to TAK server at {self.endpoint} "
+                        f"({self.peer_address}, {self.connect_ms_last:.0f} ms)")
+            if not self.path:
+                # Set TCP_NODELAY to send packets immediately
+                self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                self._tune_keepalive()
+            if self.protocol >= 1:
+                self.protocol_version = self._negotiate_protocol()
+            # Only now may the writer use the socket: it holds the queue until then
             self.connected = True
             self.last_connect_ok = time.time()
-            logger.info(f"Connected to TAK server at {self.host}:{self.port}")
-            # Set TCP_NODELAY to send packets immediately
-            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._start_reader()
             return True
             
         except socket.error as e:
             logger.error(f"Failed to connect to TAK server: {e}")
+            self.connect_failures += 1
             self.connected = False
             return False
             
+    def _tune_keepalive(self):
+        """Have the kernel give up on a dead peer within seconds instead of minutes.
+
+        Keepalive probes catch an idle half-open connection; ``TCP_USER_TIMEOUT``
+        catches one with unacknowledged data in flight, which probes never do.
+        Options this platform lacks are skipped.
+        """
+        if not self.keepalive:
+            return
+        dead_after = self.keepalive + KEEPALIVE_INTERVAL * KEEPALIVE_PROBES
+        options = (("TCP_KEEPIDLE", self.keepalive), ("TCP_KEEPINTVL", KEEPALIVE_INTERVAL),
+                   ("TCP_KEEPCNT", KEEPALIVE_PROBES), ("TCP_USER_TIMEOUT", dead_after * 1000))
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            for name, value in options:
+                option = getattr(socket, name, None)
+                if option is not None:
+                    self.socket.setsockopt(socket.IPPROTO_TCP, option, value)
+        except OSError as e:
+            logger.warning(f"Could not tune TCP keepalive ({e}); relying on CoT pings")
+
+    def _read_control_event(self, buf, wanted, deadline):
+        """Read XML events until one of type ``wanted`` arrives or ``deadline`` passes.
+
+        Returns:
+            tuple: ``(payload, remaining_buffer)``; payload is None on timeout or EOF.
+        """
+        while True:
+            end = buf.find(b"</event>")
+            if end >= 0:
+                event, buf = buf[:end + len(b"</event>")], buf[end + len(b"</event>"):]
+                start = event.find(b"<event")
+                event_type, payload = takproto.parse_control(event[max(start, 0):])
+                if event_type == wanted:
+                    return payload, buf
+                continue  # other traffic (e.g. SA) during the handshake is ignored
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, buf
+            self.socket.settimeout(remaining)
+            try:
+                data = self.socket.recv(4096)
+            except socket.timeout:
+                return None, buf
+            if not data:
+                return None, buf
+            buf += data
+
+    def _negotiate_protocol(self):
+        """Run the TAK protocol handshake; return the version to speak (0 or 1).
+
+        The server advertises ``t-x-takp-v`` on connect; if it supports v1 we
+        send ``t-x-takp-q`` and switch only after a positive ``t-x-takp-r``.
+        Any timeout or refusal keeps the connection on XML.
+        """
+        deadline = time.monotonic() + self.negotiation_timeout
+        try:
+            versions, buf = self._read_control_event(b"", takproto.TAKP_SUPPORT, deadline)
+            if not versions or 1 not in versions:
+                logger.info("TAK server did not offer protocol v1; using XML (v0)")
+                return 0
+            self.socket.sendall(takproto.protocol_request(self.uid, 1))
+            accepted, _ = self._read_control_event(
+                buf, takproto.TAKP_RESPONSE, time.monotonic() + self.negotiation_timeout)
+            if accepted:
+                logger.info("TAK server accepted protocol v1 (protobuf)")
+                return 1
+            logger.info("TAK server declined protocol v1; using XML (v0)")
+            return 0
+        except socket.error as e:
+            logger.warning(f"TAK protocol negotiation failed ({e}); using XML (v0)")
+            return 0
+        finally:
+            self.socket.settimeout(10)
+
+    def _start_reader(self):
+        """Start the inbound reader for the socket just connected."""
+        self._ping_sent_at = None  # a ping sent on the old connection gets no reply
+        self._pong_seen = False
+        self._next_ping = time.monotonic()  # first ping at once: an early RTT sample
+        self.reader_thread = threading.Thread(
+            target=self._reader_loop, args=(self.socket, self.protocol_version), name="TAKReader", daemon=True)
+        self.reader_thread.start()
+
+    def _reader_loop(self, sock, version):
+        """Reader thread: drain ``sock`` as data arrives and act on each inbound event.
+
+        Waiting in a selector means a server-initiated close (EOF or reset) is
+        seen as soon as it arrives, instead of on the next write, which could
+        otherwise appear to succeed and lose its events. The thread exits when
+        the connection is lost or ``sock`` is no longer the client's socket.
+        """
+        parser = takproto.StreamParser(version)
+        with selectors.DefaultSelector() as selector:
+            try:
+                selector.register(sock, selectors.EVENT_READ)
+            except ValueError:
+                return  # already closed by disconnect()
+            while self.socket is sock:
+                if not self._keepalive_tick(sock):
+                    return
+                try:
+                    if not selector.select(self.reader_poll_interval):
+                        continue
+                    data = sock.recv(65536)
+                except (BlockingIOError, socket.timeout):
+                    continue
+                except (OSError, ValueError) as e:
+                    # ValueError: selecting on a socket closed under us by disconnect().
+                    self._connection_lost(sock, f"receive failed: {e}")
+                    return
+                if not data:
+                    self._connection_lost(sock, "TAK server closed the connection")
+                    return
+                self.inbound_bytes += len(data)
+                self.last_inbound = time.time()
+                errors = parser.errors
+                for event_type, _ in parser.feed(data):
+                    self._handle_inbound(event_type)
+                self.inbound_errors += parser.errors - errors
+
+    def _keepalive_tick(self, sock):
+        """Send the periodic ping; False once a server that answers pings stops.
+
+        A server that has never answered a ping is not held to it (not every
+        CoT endpoint implements ``t-x-c-t``); its pings are only counted lost.
+        """
+        now = time.monotonic()
+        if self._pong_seen and self._ping_sent_at is not None and now - self._ping_sent_at >= self.ping_timeout:
+            self.pings_lost += 1
+            self._connection_lost(sock, f"no ping reply in {self.ping_timeout}s")
+            return False
+        if self.ping_interval and now >= self._next_ping:
+            self._next_ping = now + self.ping_interval
+            self.send_ping()
+        return True
+
+    def _connection_lost(self, sock, reason):
+        """Mark the link down as soon as the reader sees it go (if ``sock`` is still current)."""
+        if self.socket is not sock or not self.connected:
+            return
+        logger.warning(f"TAK connection lost ({reason}); holding updates, reconnecting in background")
+        self.connected = False
+        self.last_error = reason
+        self.last_error_time = time.time()
+        self.start_background_reconnect()
+
+    def _handle_inbound(self, event_type):
+        """Answer server pings and time replies to ours; other traffic is only counted."""
+        self.inbound_events += 1
+        if event_type == takproto.PING:
+            # Queued, not written here: the writer stays the only socket writer,
+            # and the reader never blocks on a full send buffer.
+            self.outbound.put(takproto.ControlMessage(takproto.PONG, self.uid))
+            self.pings_answered += 1
+            self.start_writer()
+        elif event_type == takproto.PONG and self._ping_sent_at is not None:
+            rtt, self._ping_sent_at = time.monotonic() - self._ping_sent_at, None
+            self.pongs_received += 1
+            self._pong_seen = True
+            self.rtt_last = rtt
+            self.rtt_smoothed = rtt if self.rtt_smoothed is None else (
+                (1 - RTT_ALPHA) * self.rtt_smoothed + RTT_ALPHA * rtt)
+
+    def send_ping(self):
+        """Queue a ``t-x-c-t`` ping; the reader times the server's ``t-x-c-t-r`` reply.
+
+        The round trip is measured from queuing, so it includes any local
+        queueing delay, as a queued event would see. Only one ping is in flight
+        at a time; one unanswered for ``ping_timeout`` seconds is counted lost.
+
+        Returns:
+            bool: True if a ping was queued, False while one is still in flight.
+        """
+        now = time.monotonic()
+        if self._ping_sent_at is not None:
+            if now - self._ping_sent_at < self.ping_timeout:
+                return False
+            self.pings_lost += 1
+        self._ping_sent_at = now
+        self.pings_sent += 1
+        self.outbound.put(takproto.ControlMessage(takproto.PING, self.uid))
+        self.start_writer()
+        return True
+
     def disconnect(self):
         """Disconnect from TAK server."""
-        # Stop reconnection thread
-        self.stop_reconnect.set()
-        if self.reconnect_thread and self.reconnect_thread.is_alive():
-            self.reconnect_thread.join(timeout=2)
+        # Stop reconnection thread (unless it is the caller, via connect())
+        if threading.current_thread() is not self.reconnect_thread:
+            self.stop_reconnect.set()
+            if self.reconnect_thread and self.reconnect_thread.is_alive():
+                self.reconnect_thread.join(timeout=2)
             
         if self.socket:
             try:
@@ -70,43 +390,227 @@ class TAKClient:
         self.connected = False
         logger.info("Disconnected from TAK server")
         
-    def send_cot(self, cot_message):
-        """Send a CoT message to the TAK server, failing fast.
+    def send_cot(self, cot_message, uid=None):
+        """Queue a CoT message for the writer thread and return immediately.
+
+        The caller never touches the socket: the message is handed to the
+        bounded outbound queue and a single writer thread puts it on the wire.
+        Messages sharing a ``uid`` coalesce (latest wins), so while the link is
+        slow or reconnecting only the newest position per vehicle is kept.
+
+        Args:
+            cot_message: Formatted CoT message bytes, or a ``CotMessage``
+                encoded for the negotiated protocol when it is written
+            uid: CoT UID used as the coalescing key (None = never coalesced)
+
+        Returns:
+            bool: True once the message is queued.
+        """
+        self._spool_displaced(self.outbound.put(cot_message, uid))
+        self.start_writer()
+        return True
+
+    def send_batch(self, cot_messages, uids=None):
+        """Queue several pre-encoded CoT messages at once; see :meth:`send_cot`.
+
+        The writer emits whatever is pending with a single scatter-gather
+        ``sendmsg`` call, so a whole fleet tick can share one TCP segment.
+
+        Args:
+            cot_messages: Iterable of formatted CoT message bytes
+            uids: Matching iterable of coalescing keys (None = never coalesced)
+
+        Returns:
+            bool: True once the messages are queued.
+        """
+        cot_messages = list(cot_messages)
+        uids = list(uids) if uids is not None else [None] * len(cot_messages)
+        for message, uid in zip(cot_messages, uids):
+            self._spool_displaced(self.outbound.put(message, uid))
+        self.start_writer()
+        return True
+
+    def _write(self, *cot_messages):
+        """Write messages on the socket in one call where possible, failing fast.
 
         If the server is unreachable or the send fails, this marks the client
         disconnected, kicks off the background reconnect thread, and returns
-        ``False`` instead of blocking the caller. The poll loop sends a fresh
-        position on its next cycle, and the health monitor reacts to a prolonged
-        send gap -- so a single dropped update is harmless and the tracking
-        thread is never wedged behind a dead server.
+        ``False`` instead of retrying. Only the writer thread calls this.
 
         Args:
-            cot_message: Formatted CoT message bytes
+            cot_messages: Formatted CoT message bytes or ``CotMessage`` events
 
         Returns:
             bool: True if sent successfully, False otherwise.
         """
         if not self.connected and not self.connect():
-            logger.warning("TAK server unreachable; dropping update, reconnecting in background")
+            logger.warning("TAK server unreachable; holding updates, reconnecting in background")
             self.last_error = "TAK server unreachable"
             self.last_error_time = time.time()
             self.start_background_reconnect()
             return False
 
+        cot_messages = [_wire_bytes(m, self.protocol_version) for m in cot_messages]
         try:
             self.last_send_attempt = time.time()
-            self.socket.sendall(cot_message)
+            if len(cot_messages) == 1:
+                self.socket.sendall(cot_messages[0])
+                self.write_calls += 1
+            else:
+                self._sendmsg_all(cot_messages)
             self.last_send_ok = time.time()
-            logger.info(f"Sent CoT message to TAK server ({len(cot_message)} bytes)")
+            size = sum(len(m) for m in cot_messages)
+            self.events_sent += len(cot_messages)
+            self.bytes_sent += size
+            if len(cot_messages) == 1:
+                logger.info(f"Sent CoT message to TAK server ({size} bytes)")
+            else:
+                logger.info(f"Sent CoT message batch to TAK server ({len(cot_messages)} events, {size} bytes)")
             return True
-        except socket.error as e:
+        except (socket.error, AttributeError) as e:
+            # AttributeError: the socket was closed under us by disconnect().
             logger.error(f"Failed to send CoT message: {e}")
             self.connected = False
             self.last_error = str(e)
             self.last_error_time = time.time()
             self.start_background_reconnect()
             return False
-    
+
+    def _sendmsg_all(self, buffers):
+        """Scatter-gather write of every buffer, resuming after partial sends."""
+        if not hasattr(self.socket, "sendmsg"):  # e.g. Windows
+            self.socket.sendall(b"".join(buffers))
+            self.write_calls += 1
+            return
+        views = [memoryview(b) for b in buffers]
+        first = 0
+        while first < len(views):
+            sent = self.socket.sendmsg(views[first:first + self.max_batch])
+            self.write_calls += 1
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent:
+                views[first] = views[first][sent:]
+
+    def _reconnecting(self):
+        """True while a background reconnect thread owns connection recovery."""
+        return bool(self.reconnect_thread and self.reconnect_thread.is_alive())
+
+    def _drain_once(self):
+        """Write pending live messages, then any spool replay the rate cap allows.
+
+        The queue is held while reconnecting.
+        """
+        if not self.connected and self._reconnecting():
+            # Keep coalescing in the queue until the link is back.
+            self.stop_writer.wait(self.writer_poll_interval)
+            return
+        item = self.outbound.get(timeout=self.writer_poll_interval)
+        if item is not None:
+            self._write_live(item)
+        self._replay_spool()
+
+    def _write_live(self, item):
+        """Write ``item`` and whatever else is pending in one call; requeue on failure."""
+        if self.flush_window and len(self.outbound) < self.max_batch - 1:
+            # Linger so updates from other vehicles can share this write.
+            self.stop_writer.wait(self.flush_window)
+        items = [item] + self.outbound.get_many(self.max_batch - 1)
+        if not self._write(*(message for _, message in items)):
+            for key, message in reversed(items):
+                self._spool_displaced(self.outbound.requeue(key, message))
+            return
+        if self.spool is not None:
+            for _, message in items:
+                if isinstance(message, CotMessage):
+                    self._live_event_times[message.uid] = message.event["time"].timestamp()
+        if self.resend_window:
+            now = time.monotonic()
+            with self._recent_lock:
+                # Pings and pongs belong to this connection; only CoT events are worth re-sending
+                self._recent.extend((now, key, message) for key, message in items
+                                    if not isinstance(message, takproto.ControlMessage))
+                while self._recent and now - self._recent[0][0] > self.resend_window:
+                    self._recent.popleft()
+
+    def recent_writes(self):
+        """Take the ``(key, message)`` pairs written in the last ``resend_window`` seconds."""
+        cutoff = time.monotonic() - self.resend_window
+        with self._recent_lock:
+            recent, self._recent = self._recent, deque()
+        return [(key, message) for written, key, message in recent if written >= cutoff]
+
+    def _spool_displaced(self, message):
+        """Keep an event the queue let go of while the link is down (if spooling)."""
+        if message is None or self.spool is None or self.connected or isinstance(message, takproto.ControlMessage):
+            return
+        if isinstance(message, CotMessage):
+            event = message.event
+            self.spool.append(event["time"].timestamp(), event["stale"].timestamp(), EVENT, message.dumps())
+        else:
+            now = time.time()
+            self.spool.append(now, now + RAW_STALE_SECONDS, RAW, bytes(message))
+
+    def _replay_spool(self):
+        """Backfill spooled events without waiting, within the replay rate cap.
+
+        Called by the writer between live writes, so live traffic is never
+        held behind a backlog: each call sends at most what the token bucket
+        (one second of ``replay_rate``) allows. A spooled event for a vehicle
+        whose newer event already went out live is skipped (counted as
+        superseded), so a receiver applying events in arrival order never
+        moves that vehicle back to an old position.
+        """
+        now = time.monotonic()
+        elapsed, self._replay_refilled = now - self._replay_refilled, now
+        if self.spool is None or not self.connected:
+            return
+        self._replay_budget = min(self.replay_rate, self._replay_budget + elapsed * self.replay_rate)
+        if self._replay_budget < 1:
+            return
+        records = self.spool.peek(min(int(self._replay_budget), self.max_batch))
+        if not records:
+            return
+        messages, superseded = [], 0
+        for kind, payload in records:
+            message = CotMessage.loads(payload) if kind == EVENT else payload
+            live = self._live_event_times.get(message.uid) if kind == EVENT else None
+            if live is not None and message.event["time"].timestamp() <= live:
+                superseded += 1
+            else:
+                messages.append(message)
+        if messages and not self._write(*messages):
+            return
+        self.spool.commit(records)
+        self.spool_superseded += superseded
+        self._replay_budget -= len(messages)
+
+    def _writer_loop(self):
+        """Writer thread: the single consumer of the outbound queue."""
+        logger.info("Starting TAK writer thread")
+        while not self.stop_writer.is_set():
+            self._drain_once()
+        logger.info("TAK writer thread stopped")
+
+    def start_writer(self):
+        """Start the writer thread if it is not already running."""
+        with self._writer_lock:
+            if self.writer_thread and self.writer_thread.is_alive():
+                return
+            self.stop_writer.clear()
+            self.writer_thread = threading.Thread(target=self._writer_loop, name="TAKWriter", daemon=True)
+            self.writer_thread.start()
+
+    def close(self):
+        """Stop the writer thread and disconnect (pending messages are discarded)."""
+        self.stop_writer.set()
+        if self.writer_thread and self.writer_thread.is_alive():
+            self.writer_thread.join(timeout=2)
+        self.disconnect()
+        if self.spool is not None:
+            self.spool.close()
+
     def _background_reconnect(self):
         """Background thread to keep trying to reconnect to TAK server."""
         logger.info("Starting background reconnection thread")
@@ -155,13 +659,38 @@ class TAKClient:
 
     def health_snapshot(self):
         """Return a snapshot dict of connection health suitable for JSON export."""
-        return {
+        snapshot = {
             "host": self.host,
             "port": self.port,
+            "path": self.path,
             "connected": self.connected,
             "last_connect_ok": self.last_connect_ok,
             "last_send_ok": self.last_send_ok,
             "last_send_attempt": self.last_send_attempt,
             "last_error": self.last_error,
             "last_error_time": self.last_error_time,
+            "protocol_version": self.protocol_version,
+            "peer_address": self.peer_address,
+            "connect_attempts": self.connect_attempts,
+            "connect_failures": self.connect_failures,
+            "connect_ms_last": self.connect_ms_last,
+            "write_calls": self.write_calls,
+            "events_sent": self.events_sent,
+            "bytes_sent": self.bytes_sent,
+            "inbound_events": self.inbound_events,
+            "inbound_bytes": self.inbound_bytes,
+            "inbound_errors": self.inbound_errors,
+            "last_inbound": self.last_inbound,
+            "pings_sent": self.pings_sent,
+            "pings_lost": self.pings_lost,
+            "pings_answered": self.pings_answered,
+            "pongs_received": self.pongs_received,
+            "rtt_last_ms": self.rtt_last * 1000 if self.rtt_last is not None else None,
+            "rtt_smoothed_ms": self.rtt_smoothed * 1000 if self.rtt_smoothed is not None else None,
         }
+        snapshot.update(self.resolver.stats())
+        snapshot.update(self.outbound.stats())
+        if self.spool is not None:
+            snapshot.update(self.spool.stats())
+            snapshot["spool_superseded"] = self.spool_superseded
+        return snapshot
@@ -0,0 +1,330 @@
+"""TAK Protocol Version 1 (protobuf) encoding, without a protobuf runtime.
+
+Only the handful of messages TeslaOnTarget emits are needed, so the wire format
+is written by hand: ``TakMessage { CotEvent cotEvent = 2; }`` with the event's
+point, track, contact, group, status, takv and precision-location details as
+typed sub-messages and everything else (remarks, ``uid``) in ``xmlDetail``.
+
+Framing follows the TAK protocol spec:
+
+* stream (TCP): ``0xBF`` magic, varint payload length, payload
+* mesh (UDP):   ``0xBF 0x01 0xBF`` header, payload
+
+Also builds and parses the v0 XML ``TakControl`` events used to negotiate the
+switch from XML to protobuf on a streaming connection, builds ping/pong control
+events for either version, and splits an inbound stream back into events.
+"""
+
+import re
+import struct
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from xml.sax.saxutils import escape, quoteattr
+
+#: Leading byte of every TAK Protocol v1 frame.
+MAGIC = 0xBF
+#: Header of a v1 mesh (datagram) frame.
+MESH_HEADER = bytes((MAGIC, 0x01, MAGIC))
+
+#: Server -> client: protocol versions the server supports.
+TAKP_SUPPORT = "t-x-takp-v"
+#: Client -> server: request to switch protocol version.
+TAKP_REQUEST = "t-x-takp-q"
+#: Server -> client: accept/reject of the request.
+TAKP_RESPONSE = "t-x-takp-r"
+#: Keepalive ping, and the reply to one.
+PING = "t-x-c-t"
+PONG = "t-x-c-t-r"
+
+#: Inbound bytes buffered without completing an event before the buffer is
+#: discarded as garbage.
+MAX_INBOUND_EVENT = 1 << 20
+
+_VARINT, _FIXED64, _LENGTH = 0, 1, 2
+
+
+def encode_varint(value):
+    """Encode a non-negative int as a protobuf base-128 varint."""
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _key(field, wire_type):
+    return encode_varint((field << 3) | wire_type)
+
+
+def _string(field, value):
+    """Length-delimited string field; empty strings are omitted (proto3 default)."""
+    if not value:
+        return b""
+    data = value.encode("utf-8")
+    return _key(field, _LENGTH) + encode_varint(len(data)) + data
+
+
+def _message(field, body):
+    """Embedded message field; empty messages are omitted."""
+    if not body:
+        return b""
+    return _key(field, _LENGTH) + encode_varint(len(body)) + body
+
+
+def _double(field, value):
+    return _key(field, _FIXED64) + struct.pack("<d", value)
+
+
+def _uint(field, value):
+    if not value:
+        return b""
+    return _key(field, _VARINT) + encode_varint(value)
+
+
+def _millis(dt):
+    return int(dt.timestamp() * 1000)
+
+
+def _xml_detail(event):
+    """Detail children with no typed protobuf equivalent, as an XML fragment.
+
+    Either may be missing from an event trimmed by ``cot.CotProfile``.
+    """
+    uid = f"<uid Droid={quoteattr(event['callsign'])}/>" if "callsign" in event else ""
+    remarks = f"<remarks>{escape(event['remarks'])}</remarks>" if "remarks" in event else ""
+    return uid + remarks
+
+
+def encode_event(event):
+    """Encode a CoT event dict (see ``cot.build_cot_event``) as a TakMessage payload.
+
+    Detail fields missing from the dict (see ``cot.CotProfile``) are omitted.
+    """
+    get = event.get
+    detail = b"".join((
+        _string(1, _xml_detail(event)),
+        _message(2, _string(1, get("endpoint")) + _string(2, get("callsign"))),
+        _message(3, _string(1, get("group_name")) + _string(2, get("group_role"))),
+        _message(4, _string(1, get("geopointsrc")) + _string(2, get("altsrc"))),
+        _message(5, _uint(1, int(get("battery", 0)))),
+        _message(6, _string(1, get("device")) + _string(2, get("platform"))
+                 + _string(3, get("os")) + _string(4, get("version"))),
+        _message(7, _double(1, event["speed"]) + _double(2, event["course"])),
+    ))
+    cot_event = b"".join((
+        _string(1, event["type"]),
+        _string(2, event["access"]),
+        _string(5, event["uid"]),
+        _uint(6, _millis(event["time"])),
+        _uint(7, _millis(event["time"])),
+        _uint(8, _millis(event["stale"])),
+        _string(9, event["how"]),
+        _double(10, float(event["lat"] or 0)),
+        _double(11, float(event["lon"] or 0)),
+        _double(12, float(event["hae"])),
+        _double(13, float(event["ce"])),
+        _double(14, float(event["le"])),
+        _message(15, detail),
+    ))
+    return _message(2, cot_event)
+
+
+def frame_stream(payload):
+    """Frame a TakMessage payload for a v1 streaming (TCP) connection."""
+    return bytes((MAGIC,)) + encode_varint(len(payload)) + payload
+
+
+def frame_mesh(payload):
+    """Frame a TakMessage payload for v1 mesh (UDP/multicast) delivery."""
+    return MESH_HEADER + payload
+
+
+def _xml_time(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+def _control_xml(event_type, uid, now, stale_seconds, detail=""):
+    """A v0 control event (no position) with the XML declaration."""
+    if now is None:
+        now = datetime.now(timezone.utc)
+    time_str = _xml_time(now)
+    stale_str = _xml_time(now + timedelta(seconds=stale_seconds))
+    return (
+        "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>"
+        f"<event version=\"2.0\" uid={quoteattr(uid)} type=\"{event_type}\" how=\"m-g\" "
+        f"time=\"{time_str}\" start=\"{time_str}\" stale=\"{stale_str}\">"
+        "<point lat=\"0.0\" lon=\"0.0\" hae=\"0.0\" ce=\"999999\" le=\"999999\"/>"
+        f"<detail>{detail}</detail>"
+        "</event>"
+    ).encode("utf-8")
+
+
+def protocol_request(uid, version, now=None):
+    """Build the v0 ``t-x-takp-q`` event asking the server to switch to ``version``."""
+    detail = f"<TakControl><TakRequest version=\"{version}\"/></TakControl>"
+    return _control_xml(TAKP_REQUEST, uid, now, 60, detail)
+
+
+def control_event(event_type, uid, version=0, now=None, stale_seconds=20):
+    """Build a ping/pong style control event framed for a ``version`` stream."""
+    if version != 1:
+        return _control_xml(event_type, uid, now, stale_seconds)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    cot_event = b"".join((
+        _string(1, event_type),
+        _string(5, uid),
+        _uint(6, _millis(now)),
+        _uint(7, _millis(now)),
+        _uint(8, _millis(now + timedelta(seconds=stale_seconds))),
+        _string(9, "m-g"),
+        _double(13, 999999.0),
+        _double(14, 999999.0),
+    ))
+    return frame_stream(_message(2, cot_event))
+
+
+class ControlMessage:
+    """A control event queued like a ``CotMessage``, encoded for the connection's version."""
+
+    __slots__ = ("type", "uid")
+
+    def __init__(self, event_type, uid):
+        self.type = event_type
+        self.uid = uid
+
+    def encode(self, version=0, mesh=False):
+        """Return the framed wire bytes (built fresh: control events carry the send time)."""
+        return control_event(self.type, self.uid, version)
+
+
+_XML_TYPE = re.compile(rb"""\stype\s*=\s*["']([^"']*)["']""")
+_XML_UID = re.compile(rb"""\suid\s*=\s*["']([^"']*)["']""")
+
+
+def _read_varint(buf, pos):
+    """Decode a varint at ``pos``; returns ``(value, next_pos)`` or None if incomplete."""
+    value = shift = 0
+    while pos < len(buf):
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+    return None
+
+
+def _fields(buf):
+    """Yield ``(field, wire_type, value)`` for a protobuf message (varint/fixed64/length only)."""
+    pos = 0
+    while pos < len(buf):
+        key, pos = _read_varint(buf, pos)
+        field, wire_type = key >> 3, key & 7
+        if wire_type == _VARINT:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == _FIXED64:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == _LENGTH:
+            length, pos = _read_varint(buf, pos)
+            value, pos = buf[pos:pos + length], pos + length
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        if pos > len(buf):
+            raise ValueError("truncated field")
+        yield field, wire_type, value
+
+
+def event_header(payload):
+    """Return ``(type, uid)`` of a TakMessage payload's CotEvent (None if absent)."""
+    event_type = uid = None
+    for field, wire_type, value in _fields(payload):
+        if field == 2 and wire_type == _LENGTH:
+            for sub, sub_type, sub_value in _fields(value):
+                if sub_type == _LENGTH and sub == 1:
+                    event_type = bytes(sub_value).decode("utf-8", "replace")
+                elif sub_type == _LENGTH and sub == 5:
+                    uid = bytes(sub_value).decode("utf-8", "replace")
+    return event_type, uid
+
+
+class StreamParser:
+    """Incrementally split an inbound TAK stream into ``(type, uid)`` per event.
+
+    Speaks whichever protocol the connection negotiated: ``</event>``-delimited
+    XML for v0, ``0xBF``-framed protobuf for v1. Only the event header is
+    decoded, which is all the client acts on.
+    """
+
+    def __init__(self, version=0):
+        self.version = version
+        self.errors = 0
+        self._buf = bytearray()
+
+    def feed(self, data):
+        """Add received bytes; return the ``(type, uid)`` of every event now complete."""
+        self._buf += data
+        events = self._split_v1() if self.version == 1 else self._split_xml()
+        if len(self._buf) > MAX_INBOUND_EVENT:
+            self.errors += 1
+            self._buf.clear()
+        return events
+
+    def _split_xml(self):
+        events, start = [], 0
+        while (end := self._buf.find(b"</event>", start)) >= 0:
+            chunk = self._buf[start:end]
+            head = chunk[chunk.find(b"<event"):]
+            head = head[:head.find(b">") + 1]
+            event_type, uid = _XML_TYPE.search(head), _XML_UID.search(head)
+            if event_type is None:
+                self.errors += 1
+            else:
+                events.append((event_type.group(1).decode("utf-8", "replace"),
+                               uid.group(1).decode("utf-8", "replace") if uid else None))
+            start = end + len(b"</event>")
+        del self._buf[:start]
+        return events
+
+    def _split_v1(self):
+        events, pos = [], 0
+        while pos < len(self._buf):
+            if self._buf[pos] != MAGIC:
+                self.errors += 1
+                nxt = self._buf.find(bytes((MAGIC,)), pos + 1)  # resynchronize
+                pos = len(self._buf) if nxt < 0 else nxt
+                continue
+            header = _read_varint(self._buf, pos + 1)
+            if header is None or header[1] + header[0] > len(self._buf):
+                break  # frame not complete yet
+            length, start = header
+            try:
+                events.append(event_header(bytes(self._buf[start:start + length])))
+            except (ValueError, TypeError, IndexError):
+                self.errors += 1
+            pos = start + length
+        del self._buf[:pos]
+        return events
+
+
+def parse_control(event_xml):
+    """Parse a v0 ``TakControl`` event.
+
+    Returns:
+        tuple: ``(type, payload)`` where payload is the set of supported versions
+        for ``t-x-takp-v``, the accept flag for ``t-x-takp-r``, and None for any
+        other event. ``(None, None)`` if the XML does not parse.
+    """
+    try:
+        root = ET.fromstring(event_xml)
+    except ET.ParseError:
+        return None, None
+    event_type = root.get("type")
+    if event_type == TAKP_SUPPORT:
+        versions = {int(el.get("version", -1)) for el in root.iter("TakProtocolSupport")}
+        return event_type, versions
+    if event_type == TAKP_RESPONSE:
+        response = root.find(".//TakResponse")
+        return event_type, response is not None and response.get("status") == "true"
+    return event_type, None
@@ -1,13 +1,13 @@
+import functools
 import json
 import logging
 import os
-import threading
 import time
 from datetime import datetime
-from math import cos, degrees, radians, sin
 
-from .constants import EARTH_RADIUS_M, MPH_TO_MS
-from .cot import format_cot_for_tak, generate_cot_packet
+from .cot import PRIORITY_CACHED, PRIORITY_DEAD_RECKONED, PRIORITY_FIX, CotMessage, CotProfile, DuplicateFilter
+from .constants import MPH_TO_MS
+from .dead_reckoning import DeadBand, MotionEstimator, Track, emission_interval, scheduler
 from .tak_client import TAKClient
 from .vehicle_mapper import map_vehicle_data
 from .utils import load_json_file, save_json_file
@@ -22,6 +22,15 @@ _LOOP_ENDPOINTS = ('location_data;drive_state;charge_state;vehicle_state;'
 # Substrings in an API error that mean "slow down" rather than "broken"
 _RATE_LIMIT_MARKERS = ('429', 'rate limit', 'too many requests', 'timeout')
 
+# CoT stale time: a track goes stale once this many expected updates are missed,
+# within [STALE_MIN_SECONDS, STALE_MAX_SECONDS]. A parked or asleep vehicle can't
+# move before its next update, so its track is kept alive for longer.
+STALE_MISSED_UPDATES = 3
+STALE_MIN_SECONDS = 30
+STALE_MAX_SECONDS = 3600
+PARKED_STALE_SECONDS = 900
+ASLEEP_STALE_SECONDS = 1800
+
 
 class TeslaCoT:
     def __init__(self, config, vehicle_id=None, tak_client=None):
@@ -31,11 +40,22 @@ class TeslaCoT:
         self.vehicle_id = vehicle_id
         self.position_file = self._get_position_filename()
         self.last_known_valid_data = self.read_last_position_from_file()
-        self.dead_reckoning_thread = None
-        self.stop_dead_reckoning = threading.Event()
+        # Runs this vehicle's dead-reckoning ticks alongside every other vehicle's
+        self.dead_reckoning_scheduler = scheduler
+        # Yaw rate and acceleration from successive fixes (DEAD_RECKONING_MODEL=ctrv)
+        self.motion = MotionEstimator()
 
         # Use shared TAK client if provided, otherwise create new one
-        self.tak_client = tak_client if tak_client else TAKClient(config.cot_url)
+        primary = config.cot_urls[0]
+        if not isinstance(primary, str):
+            primary = primary[0]  # failover group: its primary endpoint
+        self.tak_client = tak_client if tak_client else TAKClient(primary)
+        # Remembers what this vehicle was last sent, for the lean/minimal profiles
+        self.cot_profile = CotProfile(config.cot_profile)
+        # Holds back unchanged events (stationary / cached resends) between heartbeats.
+        # Heartbeats come at least twice per health no-send limit, so a fleet that
+        # is all parked or asleep still sends often enough to count as healthy.
+        self.duplicates = DuplicateFilter(config.cot_heartbeat_fraction, config.health_no_send_limit / 2)
         self.tesla = None
         self.vehicle = None
 
@@ -45,6 +65,12 @@ class TeslaCoT:
         self.max_wake_attempts = 3
         # Loop state (promoted from a local so the loop body is testable)
         self.consecutive_no_gps_count = 0
+        # Set while the API reports the vehicle asleep/unavailable
+        self.vehicle_asleep = False
+        # Stale time of the last event sent
+        self.stale_seconds = None
+        # Dead-reckoned updates skipped because clients extrapolate them closely enough
+        self.dead_reckoning_suppressed = 0
 
         # Debug mode - captures all Tesla API responses (opt-in; off by default).
         self.debug_mode = config.debug_mode
@@ -103,103 +129,141 @@ class TeslaCoT:
         except Exception as e:
             logger.error(f"Failed to save debug capture: {e}")
     
-    def send_to_cot(self, data):
-        """Send data to TAK server via CoT."""
+    def _expected_update_interval(self, data, priority=PRIORITY_FIX):
+        """Seconds until the next update for this vehicle is expected."""
+        moving = (data.get('speed') or 0) > 0 or data.get('shift_state') in ['D', 'R']
+        if moving and self.config.dead_reckoning_enabled and priority != PRIORITY_CACHED:
+            if not self.config.dead_reckoning_adaptive:
+                return self.config.dead_reckoning_delay
+            if data.get('speed'):  # a stopped vehicle only gets the polled fixes
+                return self.config.dead_reckoning_max_delay
+        return self.config.api_loop_delay * self.rate_limit_backoff
+
+    def _stale_seconds_for(self, data, priority=PRIORITY_FIX):
+        """Seconds until TAK should treat this vehicle's event as stale."""
+        stale = max(STALE_MIN_SECONDS, STALE_MISSED_UPDATES * self._expected_update_interval(data, priority))
+        if self.vehicle_asleep:
+            stale = max(stale, ASLEEP_STALE_SECONDS)
+        elif not data.get('speed') and data.get('shift_state') in ['P', None, '']:
+            stale = max(stale, PARKED_STALE_SECONDS)
+        return min(stale, STALE_MAX_SECONDS)
+
+    def send_to_cot(self, data, priority=None):
+        """Send data to TAK server via CoT.
+
+        ``priority`` is the event's rate-limit class (``cot.PRIORITY_*``);
+        by default it follows the data's ``dead_reckoned`` flag. The event's
+        stale time follows the vehicle's expected update cadence
+        (:meth:`_stale_seconds_for`). An event identical to the last one sent
+        is held back until its heartbeat is due (see ``cot.DuplicateFilter``).
+
+        Returns:
+            bool: True if the event was queued for TAK, False if it was held
+            back, shed by the rate limiter or failed.
+        """
         try:
-            cot_packet = generate_cot_packet(data)
-            cot_bytes = format_cot_for_tak(cot_packet)
+            if priority is None:
+                priority = PRIORITY_DEAD_RECKONED if data.get('dead_reckoned') else PRIORITY_FIX
+            stale_seconds = self._stale_seconds_for(data, priority)
+            # Encoded by the transport for whichever TAK protocol it negotiated.
+            message = CotMessage(data, priority=priority, stale_seconds=stale_seconds)
+            if not self.duplicates.admit(message, stale_seconds):
+                logger.debug(f"Unchanged CoT for {data.get('display_name')} suppressed until its heartbeat")
+                return False
+            self.cot_profile.apply(message.event)
             
-            logger.info(f"Sending CoT for {data.get('display_name')} at {data.get('latitude')}, {data.get('longitude')}")
+            logger.info(f"Sending CoT for {data.get('display_name')} at {data.get('latitude')}, {data.get('longitude')} "
+                        f"(stale in {stale_seconds:.0f}s)")
             
-            if self.tak_client.send_cot(cot_bytes):
-                logger.info(f"Successfully sent CoT packet for {data.get('vehicle_name', 'Unknown')} ({len(cot_bytes)} bytes)")
-            else:
-                logger.warning("Failed to send CoT packet - background reconnection may be in progress")
+            if self.tak_client.send_cot(message, uid=message.uid):
+                logger.info(f"Queued CoT packet for {data.get('vehicle_name', 'Unknown')}")
+                self.stale_seconds = stale_seconds
+                return True
+            self.duplicates.forget(message.uid)
+            logger.warning("Failed to queue CoT packet")
         except Exception as e:
             logger.error(f"Error sending CoT packet: {e}", exc_info=True)
+        return False
     
-    def dead_reckoning_update(self, initial_data):
-        """Perform dead reckoning interpolation between Tesla API updates."""
-        start_time = time.time()
+    def _send_dead_reckoned(self, track, data):
+        """Send a dead-reckoned update if the track's dead-band says clients need it."""
+        if not track.deadband.due(track.lat, track.lon, track.at):
+            self.dead_reckoning_suppressed += 1
+            return
+        if self.send_to_cot(data):
+            track.deadband.mark_sent(track.lat, track.lon, track.heading, track.speed_ms, track.at)
+
+    def _dead_reckoning_delay(self, track):
+        """Seconds until ``track``'s next update: ``DEAD_RECKONING_DELAY``, or adaptive.
+
+        With ``DEAD_RECKONING_ADAPTIVE`` the interval follows the track's
+        current speed and turn rate (see ``emission_interval``), and is None
+        once the vehicle has stopped.
+        """
+        if not self.config.dead_reckoning_adaptive:
+            return self.config.dead_reckoning_delay
+        return emission_interval(track.speed_ms, track.yaw_rate, track.acceleration,
+                                 self.config.dead_reckoning_min_delay, self.config.dead_reckoning_max_delay)
+
+    def _schedule_dead_reckoning(self, data, sent=True):
+        """Start extrapolating ``data`` on the shared scheduler, replacing any earlier track.
+
+        ``sent`` says whether ``data`` was just queued for TAK; if not, clients
+        have nothing current to extrapolate and the first tick is sent.
+        """
+        if not self._has_coordinates(data):
+            logger.warning("No valid position for dead reckoning")
+            self.dead_reckoning_scheduler.cancel(self)
+            return
+        start_time = time.monotonic()
         max_duration = self.config.api_loop_delay - 1  # Run for slightly less than API interval
-        
-        # Keep track of current position
-        current_lat = initial_data.get('latitude')
-        current_lon = initial_data.get('longitude')
-        
-        logger.info(f"Dead reckoning started for up to {max_duration}s from lat={current_lat}, lon={current_lon}")
-
-        update_count = 0
-        while not self.stop_dead_reckoning.is_set():
-            # 0.0 is a valid coordinate (equator / prime meridian) -- check presence.
-            if current_lat is not None and current_lon is not None:
-                # Wait for the next update interval
-                time.sleep(self.config.dead_reckoning_delay)
-                
-                # Calculate new position based on speed and heading
-                speed = initial_data.get('speed', 0)
-                if speed is None:
-                    speed = 0
-                
-                # If speed is 0, just send the same position to maintain 1Hz updates
-                if speed == 0:
-                    # Still send position updates at 1Hz even when stopped
-                    updated_data = initial_data.copy()
-                    updated_data['latitude'] = current_lat
-                    updated_data['longitude'] = current_lon
-                    updated_data['timestamp'] = time.time()
-                    updated_data['dead_reckoned'] = True
-                    
-                    update_count += 1
-                    self.send_to_cot(updated_data)
-                    
-                    # Check if we should stop
-                    if time.time() - start_time >= max_duration:
-                        logger.info(f"Dead reckoning stopping after {update_count} updates - API update imminent")
-                        break
-                    continue
-                    
-                # Tesla API returns speed in mph
-                speed_ms = speed * MPH_TO_MS
-                heading = initial_data.get('heading', 0)
-                if heading is None:
-                    heading = 0
-                heading_rad = radians(heading)
-                
-                # Calculate distance traveled in one update cycle
-                distance = speed_ms * self.config.dead_reckoning_delay
-                
-                # Calculate new position from current position
-                lat_rad = radians(current_lat)
-                lon_rad = radians(current_lon)
-
-                # Calculate new latitude/longitude (equirectangular step)
-                new_lat_rad = lat_rad + (distance / EARTH_RADIUS_M) * cos(heading_rad)
-                new_lon_rad = lon_rad + (distance / (EARTH_RADIUS_M * cos(lat_rad))) * sin(heading_rad)
-
-                # Convert back to degrees
-                current_lat = degrees(new_lat_rad)
-                current_lon = degrees(new_lon_rad)
-                
-                # Create updated data packet
-                updated_data = initial_data.copy()
-                updated_data['latitude'] = current_lat
-                updated_data['longitude'] = current_lon
-                updated_data['timestamp'] = time.time()
-                updated_data['dead_reckoned'] = True
-                
-                # Send updated position
-                update_count += 1
-                logger.debug(f"Dead reckoning update #{update_count}: lat={current_lat:.6f}, lon={current_lon:.6f}, distance={distance:.1f}m")
-                self.send_to_cot(updated_data)
-                
-                # Check if we should stop (near next API update)
-                if time.time() - start_time >= max_duration:
-                    logger.info(f"Dead reckoning stopping after {update_count} updates - API update imminent")
-                    break
-            else:
-                logger.warning("No valid position for dead reckoning")
-                break
+        deadband = DeadBand(self.config.dead_reckoning_deadband_meters, self.config.dead_reckoning_max_interval)
+        track = Track(data.copy(), deadband, start_time, max_duration,
+                      self.motion.yaw_rate, self.motion.acceleration)
+        delay = self._dead_reckoning_delay(track)
+        if delay is None:
+            logger.debug("Vehicle stopped - no dead reckoning until it moves")
+            self.dead_reckoning_scheduler.cancel(self)
+            return
+        if sent:  # clients extrapolate from the fix the poller just sent
+            deadband.mark_sent(track.lat, track.lon, track.heading, track.speed_ms, start_time)
+        logger.info(f"Dead reckoning started for up to {max_duration}s from lat={track.lat}, lon={track.lon}")
+        self.dead_reckoning_scheduler.schedule(
+            self, functools.partial(self.dead_reckoning_update, track), delay, track=track)
+
+    def dead_reckoning_update(self, track, now):
+        """Send the position of ``track`` at monotonic time ``now`` (one scheduler tick).
+
+        The scheduler has already advanced the track to ``now``, along with
+        every other track due at the same time.
+
+        Returns:
+            float | None: Seconds until the next tick, or None once the next
+            API update is imminent (or, with adaptive emission, the vehicle
+            has stopped)
+        """
+        # At a fixed rate, a stopped vehicle's same position is still sent on each tick
+        updated_data = track.data.copy()
+        updated_data['latitude'] = track.lat
+        updated_data['longitude'] = track.lon
+        if track.turning:  # clients extrapolate from the course and speed we send
+            updated_data['heading'] = track.heading
+            updated_data['speed'] = track.speed_ms / MPH_TO_MS
+        updated_data['timestamp'] = time.time()
+        updated_data['dead_reckoned'] = True
+
+        # Send updated position, unless clients extrapolate it closely enough
+        track.updates += 1
+        logger.debug(f"Dead reckoning update #{track.updates}: lat={track.lat:.6f}, lon={track.lon:.6f}, "
+                     f"speed={track.speed_ms:.1f}m/s")
+        self._send_dead_reckoned(track, updated_data)
+
+        # Check if we should stop (near next API update)
+        if track.expired(now):
+            logger.info(f"Dead reckoning stopping after {track.updates} updates "
+                        f"({track.deadband.suppressed} within dead-band) - API update imminent")
+            return None
+        return self._dead_reckoning_delay(track)
 
     def _wake_if_asleep(self, vehicle):
         """Send a wake command if the vehicle reports asleep (best-effort)."""
@@ -241,7 +305,7 @@ class TeslaCoT:
             logger.error(f"Failed to get initial vehicle data after {self.max_wake_attempts} attempts")
             if self.last_known_valid_data:
                 logger.info("Using cached position data")
-                self.send_to_cot(self.last_known_valid_data)
+                self.send_to_cot(self.last_known_valid_data, priority=PRIORITY_CACHED)
                 return True
             logger.error(f"No cached data available for {vehicle.get('display_name', 'Unknown')}")
             return False
@@ -270,12 +334,13 @@ class TeslaCoT:
             logger.warning(f"Rate limit detected! Backing off to {delay}s delay (error #{self.consecutive_errors})")
             logger.warning(f"Error details: {exc}")
             if self.last_known_valid_data:
-                self.send_to_cot(self.last_known_valid_data)
+                self.send_to_cot(self.last_known_valid_data, priority=PRIORITY_CACHED)
             return delay
         if kind == "unavailable":
             logger.info("Vehicle is asleep/unavailable. Using last known position.")
+            self.vehicle_asleep = True
             if self.last_known_valid_data:
-                self.send_to_cot(self.last_known_valid_data)
+                self.send_to_cot(self.last_known_valid_data, priority=PRIORITY_CACHED)
             else:
                 logger.warning("No last known position available")
             return self.config.api_loop_delay
@@ -289,49 +354,47 @@ class TeslaCoT:
             return delay
         return self.config.api_loop_delay
 
-    def _start_dead_reckoning(self, data):
-        """(Re)start the dead-reckoning thread for the given position, if moving."""
-        if self.dead_reckoning_thread and self.dead_reckoning_thread.is_alive():
-            logger.debug("Restarting dead reckoning with new position")
-            self.stop_dead_reckoning.set()
-            self.dead_reckoning_thread.join(timeout=1)
+    def _start_dead_reckoning(self, data, sent=True):
+        """(Re)start dead reckoning from the given position if moving, else stop it.
+
+        ``sent`` is passed on to :meth:`_schedule_dead_reckoning`.
+        """
         speed = data.get('speed', 0)
         shift_state = data.get('shift_state')
         if (speed is not None and speed > 0) or shift_state in ['D', 'R']:
             logger.info(f"Starting dead reckoning interpolation (speed: {speed}mph, gear: {shift_state})")
-            self.stop_dead_reckoning.clear()
-            self.dead_reckoning_thread = threading.Thread(
-                target=self.dead_reckoning_update, args=(data.copy(),))
-            self.dead_reckoning_thread.start()
+            self._schedule_dead_reckoning(data, sent)
         else:
             logger.debug(f"Vehicle not moving (speed: {speed}mph, gear: {shift_state}), skipping dead reckoning")
+            self.dead_reckoning_scheduler.cancel(self)
 
     def _handle_valid_gps(self, relevant_data):
         """Persist + send a fresh fix and (re)start interpolation."""
         self.consecutive_no_gps_count = 0
         self.last_known_valid_data = relevant_data.copy()
         self.save_last_position_to_file(self.last_known_valid_data)
-        self.send_to_cot(relevant_data)
+        sent = self.send_to_cot(relevant_data)
         if self.config.dead_reckoning_enabled:
-            self._start_dead_reckoning(relevant_data.copy())
+            if self.config.dead_reckoning_model == "ctrv":
+                self.motion.update(relevant_data.get('heading') or 0,
+                                   (relevant_data.get('speed') or 0) * MPH_TO_MS,
+                                   relevant_data.get('timestamp') or time.time())
+            self._start_dead_reckoning(relevant_data.copy(), sent)
 
     def _handle_missing_gps(self):
         """No fresh GPS: keep interpolating / resend the last known position."""
         logger.warning("No valid GPS coordinates from Tesla API")
-        if not (self.dead_reckoning_thread and self.dead_reckoning_thread.is_alive()):
+        if not self.dead_reckoning_scheduler.scheduled(self):
             if self.config.dead_reckoning_enabled:
                 if self.last_known_valid_data and self.last_known_valid_data.get('speed', 0):
                     logger.info("No GPS - starting dead reckoning based on last known position")
-                    self.stop_dead_reckoning.clear()
-                    self.dead_reckoning_thread = threading.Thread(
-                        target=self.dead_reckoning_update,
-                        args=(self.last_known_valid_data.copy(),))
-                    self.dead_reckoning_thread.start()
+                    # Not sent just now: clients extrapolate an older event
+                    self._schedule_dead_reckoning(self.last_known_valid_data, sent=False)
         self.consecutive_no_gps_count += 1
         logger.warning(f"No valid GPS data available (count: {self.consecutive_no_gps_count})")
         if self.last_known_valid_data:
             logger.debug("Using last known position")
-            self.send_to_cot(self.last_known_valid_data)
+            self.send_to_cot(self.last_known_valid_data, priority=PRIORITY_CACHED)
 
     @staticmethod
     def _has_coordinates(data):
@@ -343,6 +406,7 @@ class TeslaCoT:
         try:
             vehicle_data = vehicle.get_vehicle_data(endpoints=_LOOP_ENDPOINTS)
             self.save_debug_capture(vehicle_data, "vehicle_data")
+            self.vehicle_asleep = False
             if self.consecutive_errors > 0 or self.rate_limit_backoff > 1:
                 logger.info("API responding normally again. Resetting backoff.")
                 self.consecutive_errors = 0
@@ -0,0 +1,186 @@
+"""UDP / multicast SA transport for LAN deployments.
+
+:class:`UDPTAKClient` sends each CoT event as one datagram, either unicast or
+broadcast (``udp://host:port``) or multicast (``mcast://239.2.3.1:6969``, the
+standard SA group), so ATAK devices on the mesh receive positions directly.
+With no connection there is nothing to reconnect and no head-of-line blocking:
+a datagram either leaves right away or is dropped and counted. It has the same
+``send_cot``/``health_snapshot`` surface as
+:class:`~teslaontarget.tak_client.TAKClient`.
+"""
+
+import logging
+import socket
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+#: URL schemes served by this transport.
+DATAGRAM_SCHEMES = ("udp", "mcast")
+#: Largest datagram sent: a 1500-byte Ethernet MTU minus IPv4 and UDP headers,
+#: so an event never relies on IP fragmentation.
+MAX_DATAGRAM = 1472
+
+
+class UDPTAKClient:
+    """Send CoT events as UDP datagrams (unicast, broadcast or multicast)."""
+
+    def __init__(self, cot_url, protocol=0, max_datagram=MAX_DATAGRAM, multicast_ttl=1):
+        """Initialize the datagram client.
+
+        Args:
+            cot_url: ``udp://host:port`` or ``mcast://group:port``; a multicast
+                URL may name the outgoing interface with ``?iface=<local IPv4>``
+            protocol: TAK protocol for event objects (0 = XML, 1 = protobuf
+                mesh framing, which needs no negotiation)
+            max_datagram: Largest datagram sent; bigger events are dropped
+            multicast_ttl: Hop limit for multicast datagrams (1 = local subnet)
+        """
+        parsed = urlparse(cot_url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.interface = parse_qs(parsed.query).get("iface", [None])[0]
+        self.protocol_version = 1 if protocol >= 1 else 0
+        self.max_datagram = max_datagram
+        self.multicast_ttl = multicast_ttl
+        self.socket = None
+        self.address = None
+        self.connected = False
+        self._lock = threading.Lock()
+        # Health / telemetry
+        self.last_connect_ok = None
+        self.last_send_ok = None
+        self.last_send_attempt = None
+        self.last_error = None
+        self.last_error_time = None
+        self.datagrams_sent = 0
+        self.datagrams_dropped = 0
+        self.datagrams_oversize = 0
+        self.bytes_sent = 0
+        self.datagram_bytes_last = 0
+        self.datagram_bytes_max = 0
+
+    @property
+    def wire_format(self):
+        """``(protocol_version, mesh)`` that ``CotMessage`` events are encoded with."""
+        return self.protocol_version, True
+
+    def connect(self):
+        """Open the datagram socket and resolve the destination; True on success."""
+        self.disconnect()
+        try:
+            self.address = (socket.gethostbyname(self.host), self.port)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            if self.scheme == "mcast":
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, self.multicast_ttl)
+                sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+                if self.interface:
+                    sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(self.interface))
+            else:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            # A full send buffer drops the datagram instead of stalling the caller.
+            sock.setblocking(False)
+        except OSError as e:
+            logger.error(f"Failed to open {self.scheme} socket for {self.host}:{self.port}: {e}")
+            self.last_error = f"socket setup failed: {e}"
+            self.last_error_time = time.time()
+            return False
+        self.socket = sock
+        self.connected = True
+        self.last_connect_ok = time.time()
+        logger.info(f"Sending CoT datagrams to {self.scheme}://{self.address[0]}:{self.port}")
+        return True
+
+    def disconnect(self):
+        """Close the datagram socket."""
+        sock, self.socket = self.socket, None
+        self.connected = False
+        if sock is not None:
+            sock.close()
+
+    def close(self):
+        """Close the socket (there is no writer thread to stop)."""
+        self.disconnect()
+
+    def ensure_connected(self):
+        """Open the socket if needed."""
+        return self.connected or self.connect()
+
+    def start_background_reconnect(self):
+        """Reopen the socket; opening a datagram socket never blocks on the network."""
+        self.ensure_connected()
+
+    def _record_drop(self, error):
+        self.datagrams_dropped += 1
+        self.last_error = error
+        self.last_error_time = time.time()
+
+    def send_cot(self, cot_message, uid=None):
+        """Send one CoT event as a single datagram.
+
+        Args:
+            cot_message: Formatted CoT message bytes, or a ``CotMessage``
+                encoded for ``protocol_version`` with mesh framing
+            uid: Unused; datagrams are never queued, so nothing coalesces
+
+        Returns:
+            bool: True if the datagram was handed to the kernel, False if dropped.
+        """
+        if not isinstance(cot_message, (bytes, bytearray, memoryview)):
+            cot_message = cot_message.encode(*self.wire_format)
+        size = len(cot_message)
+        with self._lock:
+            self.last_send_attempt = time.time()
+            if size > self.max_datagram:
+                self.datagrams_oversize += 1
+                self._record_drop(f"event of {size} bytes exceeds {self.max_datagram}-byte datagram")
+                logger.warning(f"Dropped CoT datagram: {size} bytes exceeds the {self.max_datagram}-byte limit")
+                return False
+            if not self.ensure_connected():
+                self._record_drop(self.last_error)
+                return False
+            try:
+                self.socket.sendto(cot_message, self.address)
+            except OSError as e:
+                # BlockingIOError (send buffer full), ENETUNREACH, ...: drop, don't retry.
+                self._record_drop(str(e) or repr(e))
+                logger.warning(f"Dropped CoT datagram: {e}")
+                return False
+            self.last_send_ok = time.time()
+            self.datagrams_sent += 1
+            self.bytes_sent += size
+            self.datagram_bytes_last = size
+            self.datagram_bytes_max = max(self.datagram_bytes_max, size)
+        logger.info(f"Sent CoT datagram ({size} bytes)")
+        return True
+
+    def send_batch(self, cot_messages, uids=None):
+        """Send several events, one datagram each; True if none were dropped."""
+        results = [self.send_cot(message) for message in cot_messages]
+        return all(results)
+
+    def health_snapshot(self):
+        """Return a snapshot dict of transport health suitable for JSON export."""
+        with self._lock:
+            return {
+                "transport": self.scheme,
+                "host": self.host,
+                "port": self.port,
+                "connected": self.connected,
+                "last_connect_ok": self.last_connect_ok,
+                "last_send_ok": self.last_send_ok,
+                "last_send_attempt": self.last_send_attempt,
+                "last_error": self.last_error,
+                "last_error_time": self.last_error_time,
+                "protocol_version": self.protocol_version,
+                "datagrams_sent": self.datagrams_sent,
+                "datagrams_dropped": self.datagrams_dropped,
+                "datagrams_oversize": self.datagrams_oversize,
+                "bytes_sent": self.bytes_sent,
+                "datagram_bytes_last": self.datagram_bytes_last,
+                "datagram_bytes_max": self.datagram_bytes_max,
+                "datagram_bytes_avg": self.bytes_sent / self.datagrams_sent if self.datagrams_sent else 0,
+            }
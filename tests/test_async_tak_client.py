@@ -0,0 +1,286 @@
+"""Tests for teslaontarget.async_tak_client.AsyncTAKClient (real loopback streams)."""
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget.async_tak_client import AsyncTAKClient
+from teslaontarget.cot import CotMessage
+
+
+class _StandIn:
+    """Minimal asyncio TAK server that records every byte it receives."""
+
+    def __init__(self, path=None):
+        self.received = bytearray()
+        self.connections = 0
+        self.server = None
+        self.port = None
+        self.path = path
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        while data := await reader.read(65536):
+            self.received += data
+        writer.close()
+
+    async def __aenter__(self):
+        if self.path:
+            self.server = await asyncio.start_unix_server(self._handle, self.path)
+            return self
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        await asyncio.sleep(0.005)
+
+
+@pytest.fixture
+def client():
+    return AsyncTAKClient("tcp://10.0.0.5:8087", reconnect_interval=0.01)
+
+
+class TestInit:
+    def test_parses_host_and_port(self, client):
+        assert client.host == "10.0.0.5"
+        assert client.port == 8087
+        assert client.connected is False
+
+    def test_send_before_start_just_queues(self, client):
+        assert client.send_cot(b"x", uid="A") is True
+        assert len(client.outbound) == 1
+
+
+class TestEndToEnd:
+    def test_delivers_in_order_and_coalesces(self):
+        async def scenario():
+            async with _StandIn() as srv:
+                c = AsyncTAKClient(f"tcp://127.0.0.1:{srv.port}")
+                c.send_cot(b"<a1/>", uid="A")
+                c.send_cot(b"<b/>", uid="B")
+                c.send_cot(b"<a2/>", uid="A")  # replaces <a1/> before the writer runs
+                await c.start()
+                await c.start()  # idempotent
+                await _until(lambda: len(srv.received) == len(b"<a2/><b/>"))
+                assert bytes(srv.received) == b"<a2/><b/>"
+                assert c.connected and c.last_send_ok is not None
+                await c.stop()
+                assert c.connected is False
+        asyncio.run(scenario())
+
+    def test_reconnects_without_blocking_the_loop(self):
+        async def scenario():
+            async with _StandIn() as srv:
+                port = srv.port
+            # Server is gone: the first attempt fails, the loop stays responsive.
+            c = AsyncTAKClient(f"tcp://127.0.0.1:{port}", reconnect_interval=0.01)
+            await c.start()
+            c.send_cot(b"<e/>", uid="A")
+            await _until(lambda: c.last_error is not None)
+            assert c.connected is False
+            assert len(c.outbound) == 1  # held for the next attempt
+            server = await asyncio.start_server(
+                lambda r, w: None, "127.0.0.1", port)
+            try:
+                await _until(lambda: c.last_send_ok is not None)
+            finally:
+                await c.stop()
+                server.close()
+                await server.wait_closed()
+        asyncio.run(scenario())
+
+    def test_start_in_thread_accepts_sends_from_other_threads(self):
+        async def serve(srv_holder, done):
+            async with _StandIn() as srv:
+                srv_holder.append(srv)
+                await done.wait()
+
+        async def scenario():
+            holder, done = [], asyncio.Event()
+            task = asyncio.create_task(serve(holder, done))
+            await _until(lambda: holder)
+            srv = holder[0]
+            c = AsyncTAKClient(f"tcp://127.0.0.1:{srv.port}").start_in_thread()
+            await asyncio.to_thread(c.send_cot, b"<t/>", "T")
+            await _until(lambda: bytes(srv.received) == b"<t/>")
+            c.loop.call_soon_threadsafe(c.loop.stop)
+            done.set()
+            await task
+        asyncio.run(scenario())
+
+    def test_unix_socket(self, tmp_path):
+        path = str(tmp_path / "tak.sock")
+
+        async def scenario():
+            async with _StandIn(path) as srv:
+                c = AsyncTAKClient(f"unix://{path}")
+                assert c.endpoint == f"unix:{path}"
+                c.send_cot(b"<u/>", uid="U")
+                await c.start()
+                await _until(lambda: bytes(srv.received) == b"<u/>")
+                assert c.health_snapshot()["path"] == path
+                await c.stop()
+        asyncio.run(scenario())
+
+    def test_send_batch_delivers_in_order_and_coalesces(self):
+        async def scenario():
+            async with _StandIn() as srv:
+                c = AsyncTAKClient(f"tcp://127.0.0.1:{srv.port}")
+                assert c.send_batch([b"<a1/>", b"<b/>", b"<a2/>"], ["A", "B", "A"]) is True
+                assert c.send_batch([b"<x/>"]) is True  # no keys: never coalesced
+                await c.start()
+                await _until(lambda: len(srv.received) == len(b"<a2/><b/><x/>"))
+                assert bytes(srv.received) == b"<a2/><b/><x/>"
+                await c.stop()
+        asyncio.run(scenario())
+
+    def test_cot_message_is_sent_as_xml(self):
+        async def scenario():
+            async with _StandIn() as srv:
+                c = AsyncTAKClient(f"tcp://127.0.0.1:{srv.port}")
+                msg = CotMessage({"UID": "TESLA-1"})
+                c.send_cot(msg, uid=msg.uid)
+                await c.start()
+                await _until(lambda: len(srv.received) == len(msg.encode(0)))
+                assert bytes(srv.received) == msg.encode(0)
+                await c.stop()
+        asyncio.run(scenario())
+
+
+class TestWrite:
+    def test_drain_timeout_marks_disconnected(self, client):
+        async def scenario():
+            client.connected = True
+            client._writer = MagicMock()
+
+            async def never():
+                await asyncio.sleep(10)
+            client._writer.drain = never
+            client._writer.wait_closed = MagicMock(side_effect=RuntimeError("closed"))
+            client.write_timeout = 0.01
+            assert await client._write(b"x") is False
+            assert client.write_timeouts == 1
+            assert client.connected is False
+            assert "drain" in client.last_error
+        asyncio.run(scenario())
+
+    def test_os_error_marks_disconnected(self, client):
+        async def scenario():
+            client.connected = True
+            client._writer = MagicMock()
+            client._writer.writelines.side_effect = ConnectionResetError("reset")
+            client._writer.wait_closed = MagicMock(side_effect=RuntimeError("closed"))
+            assert await client._write(b"x") is False
+            assert client.last_error == "reset"
+        asyncio.run(scenario())
+
+    def test_pending_messages_share_one_drain(self, client):
+        async def scenario():
+            client.connected = True
+            client._writer = MagicMock()
+            drains = []
+
+            async def drain():
+                drains.append(True)
+            client._writer.drain = drain
+            client.send_batch([b"a", b"b", CotMessage({"UID": "TESLA-1"})], ["A", "B", "C"])
+            client.max_batch = 2
+            assert await client._write(*(m for _, m in await client._wait_for_work())) is True
+            client._writer.writelines.assert_called_once_with([b"a", b"b"])
+            assert drains == [True] and len(client.outbound) == 1
+        asyncio.run(scenario())
+
+    def test_failed_write_requeues(self):
+        async def scenario():
+            async with _StandIn() as srv:
+                c = AsyncTAKClient(f"tcp://127.0.0.1:{srv.port}")
+                attempts = []
+
+                async def flaky(*messages):
+                    attempts.append(messages)
+                    return len(attempts) > 1
+                with patch.object(c, "_write", side_effect=flaky):
+                    await c.start()
+                    c.send_batch([b"m", b"n"], ["A", "B"])
+                    await _until(lambda: len(attempts) == 2)
+                    await c.stop()
+            assert attempts == [(b"m", b"n"), (b"m", b"n")]  # the batch goes back in order
+        asyncio.run(scenario())
+
+
+class TestConnect:
+    def test_connect_without_socket_info(self, client):
+        async def scenario():
+            writer = MagicMock()
+            writer.get_extra_info.return_value = None
+            with patch("teslaontarget.async_tak_client.asyncio.open_connection",
+                       return_value=(MagicMock(), writer)):
+                assert await client.connect() is True
+            assert client.last_connect_ok is not None
+        asyncio.run(scenario())
+
+
+class TestThreadSafeControls:
+    def test_disconnect_without_loop(self, client):
+        client.connected = True
+        client.disconnect()
+        assert client.connected is False
+
+    def test_disconnect_schedules_close_on_loop(self, client):
+        async def scenario():
+            await client.start()
+            client._writer = MagicMock()
+            client._writer.wait_closed = MagicMock(side_effect=RuntimeError("closed"))
+            writer = client._writer
+            await asyncio.to_thread(client.disconnect)
+            await _until(lambda: writer.close.called)
+            await client.stop()
+        asyncio.run(scenario())
+
+    def test_close_stops_writer_task_from_another_thread(self, client):
+        async def scenario():
+            await client.start()
+            await asyncio.to_thread(client.close)
+            await _until(lambda: client._task is None)
+        asyncio.run(scenario())
+
+    def test_close_without_loop(self, client):
+        client.close()  # must not raise
+
+    def test_wire_format_is_xml_stream(self, client):
+        assert client.wire_format == (0, False)
+
+    def test_stop_without_start(self, client):
+        asyncio.run(client.stop())  # must not raise
+        assert client.connected is False
+
+    def test_reconnect_nudge_without_loop_is_noop(self, client):
+        client.start_background_reconnect()  # must not raise
+
+    def test_notify_after_loop_closed_is_noop(self, client):
+        async def scenario():
+            await client.start()
+            await client.stop()
+        asyncio.run(scenario())
+        client.send_cot(b"x")  # loop closed; must not raise
+
+
+def test_health_snapshot(client):
+    client.send_cot(b"a", uid="A")
+    client.send_cot(b"b", uid="A")
+    snap = client.health_snapshot()
+    assert snap["host"] == "10.0.0.5"
+    assert snap["connected"] is False
+    assert snap["queue_depth"] == 1
+    assert snap["queue_coalesced"] == 1
+    assert snap["write_timeouts"] == 0
@@ -119,6 +119,82 @@ class TestBuildHealthMonitor:
         assert kw["alert_url"] == "https://ntfy.sh/tot"  # webhook wired through
 
 
+class TestBuildTakClient:
+    def test_thread_transport_is_default(self, make_config):
+        with patch("teslaontarget.cli.TAKClient") as TC:
+            assert cli._build_tak_client(make_config()) is TC.return_value
+        TC.assert_called_once_with("tcp://h:1", flush_window=0, protocol=0, spool=None, replay_rate=20,
+                                   keepalive=5, ping_interval=10, dns_ttl=60)
+
+    def test_rate_limit_wraps_the_whole_client(self, make_config):
+        with patch("teslaontarget.cli.TAKClient"), patch("teslaontarget.cli.UDPTAKClient"):
+            client = cli._build_tak_client(make_config(cot_url=("tcp://a:1", "udp://b:2"),
+                                                       tak_rate_limit_events_per_sec=2))
+        assert isinstance(client, cli.RateLimitedClient)
+        assert isinstance(client.inner, cli.FanOutClient)
+        assert len(client.buckets) == 1
+        with patch("teslaontarget.cli.TAKClient") as TC:
+            client = cli._build_tak_client(make_config(tak_rate_limit_bytes_per_sec=500))
+        assert client.inner is TC.return_value
+
+    def test_unix_url_uses_the_stream_transport(self, make_config):
+        with patch("teslaontarget.cli.TAKClient") as TC:
+            cli._build_tak_client(make_config(cot_url="unix:///run/tak.sock"))
+        assert TC.call_args.args == ("unix:///run/tak.sock",)
+
+    def test_flush_window_converted_to_seconds(self, make_config):
+        with patch("teslaontarget.cli.TAKClient") as TC:
+            cli._build_tak_client(make_config(tak_flush_window_ms=5))
+        assert TC.call_args.kwargs["flush_window"] == 0.005
+
+    def test_asyncio_transport_runs_on_its_own_loop(self, make_config):
+        with patch("teslaontarget.cli.AsyncTAKClient") as ATC:
+            client = cli._build_tak_client(make_config(tak_transport="asyncio"))
+        ATC.assert_called_once_with("tcp://h:1")
+        assert client is ATC.return_value.start_in_thread.return_value
+
+    def test_spool_opened_per_destination(self, make_config, tmp_path):
+        with patch("teslaontarget.cli.TAKClient") as TC:
+            cli._build_tak_client(make_config(cot_url=("tcp://a:1", "tcp://b:2"), tak_spool_dir=str(tmp_path),
+                                              tak_spool_max_mb=2, tak_spool_replay_rate=5))
+        spools = [c.kwargs["spool"] for c in TC.call_args_list]
+        assert [s.directory for s in spools] == [str(tmp_path / "tcp_a_1"), str(tmp_path / "tcp_b_2")]
+        assert spools[0].max_bytes == 2 << 20
+        assert TC.call_args.kwargs["replay_rate"] == 5
+
+    def test_url_list_fans_out_one_transport_per_destination(self, make_config):
+        urls = ("tcp://a:1", "mcast://239.2.3.1:6969")
+        with patch("teslaontarget.cli.TAKClient") as TC, patch("teslaontarget.cli.UDPTAKClient") as UTC:
+            client = cli._build_tak_client(make_config(cot_url=urls))
+        assert isinstance(client, cli.FanOutClient)
+        assert client.destinations == [TC.return_value, UTC.return_value]
+        TC.assert_called_once_with("tcp://a:1", flush_window=0, protocol=0, spool=None, replay_rate=20,
+                                   keepalive=5, ping_interval=10, dns_ttl=60)
+
+    def test_nested_urls_build_a_failover_group(self, make_config):
+        group = ("tcp://a:1", "tcp://b:1")
+        with patch("teslaontarget.cli.TAKClient") as TC, patch("teslaontarget.cli.AsyncTAKClient") as ATC:
+            client = cli._build_tak_client(make_config(cot_url=(group,), tak_transport="asyncio",
+                                                       tak_failback_seconds=7))
+        assert isinstance(client, cli.FailoverClient)
+        assert [c.args[0] for c in TC.call_args_list] == list(group)  # always threaded
+        ATC.assert_not_called()
+        assert client.failback_after == 7
+
+    def test_failover_group_alongside_other_destinations(self, make_config):
+        with patch("teslaontarget.cli.TAKClient"), patch("teslaontarget.cli.UDPTAKClient") as UTC:
+            client = cli._build_tak_client(make_config(cot_url=(("tcp://a:1", "tcp://b:1"), "udp://c:2")))
+        assert isinstance(client.destinations[0], cli.FailoverClient)
+        assert client.destinations[1] is UTC.return_value
+
+    @pytest.mark.parametrize("url", ["udp://10.0.0.255:4242", "mcast://239.2.3.1:6969"])
+    def test_datagram_urls_use_udp_transport(self, make_config, url):
+        with patch("teslaontarget.cli.UDPTAKClient") as UTC:
+            client = cli._build_tak_client(make_config(cot_url=url, tak_transport="asyncio", tak_protocol=1))
+        UTC.assert_called_once_with(url, protocol=1)
+        assert client is UTC.return_value
+
+
 class TestWakeVehicles:
     def test_wakes_asleep_only(self):
         a = _vmock("asleep")
@@ -177,7 +253,7 @@ class TestMain:
         return patch.multiple(
             "teslaontarget.cli",
             _parse_args=DEFAULT, _load_and_validate_config=DEFAULT, Tesla=DEFAULT,
-            _select_vehicles=DEFAULT, TAKClient=DEFAULT, _build_health_monitor=DEFAULT,
+            _select_vehicles=DEFAULT, _build_tak_client=DEFAULT, _build_health_monitor=DEFAULT,
             _wake_vehicles=DEFAULT, _start_tracking_threads=DEFAULT,
             _monitor_threads=DEFAULT, signal=DEFAULT,
         )
@@ -40,6 +40,54 @@ class TestAppConfig:
     def test_validate_missing_cot_url(self):
         assert AppConfig(tesla_username="a@b.com", cot_url="").validate() is False
 
+    def test_validate_empty_url_in_list(self):
+        assert AppConfig(tesla_username="a@b.com", cot_url=("tcp://h:1", "")).validate() is False
+        assert AppConfig(tesla_username="a@b.com", cot_url=()).validate() is False
+
+    def test_cot_urls_single_and_many(self):
+        assert AppConfig(cot_url="tcp://h:1").cot_urls == ("tcp://h:1",)
+        assert AppConfig(cot_url=("tcp://a:1", "udp://b:2")).cot_urls == ("tcp://a:1", "udp://b:2")
+
+    def test_failover_group_must_be_a_stream(self):
+        ok = AppConfig(tesla_username="a@b.com", cot_url=(("tcp://a:1", "tcp://b:1"), "udp://c:2"))
+        assert ok.validate() is True
+        assert ok.cot_urls[0] == ("tcp://a:1", "tcp://b:1")
+        bad = AppConfig(tesla_username="a@b.com", cot_url=(("tcp://a:1", "udp://b:1"),))
+        assert bad.validate() is False
+        local = AppConfig(tesla_username="a@b.com", cot_url=(("unix:///run/tak.sock", "tcp://b:1"),))
+        assert local.validate() is True
+
+    def test_validate_unknown_transport(self):
+        assert AppConfig(tesla_username="a@b.com", cot_url="tcp://h:1",
+                         tak_transport="carrier-pigeon").validate() is False
+
+    def test_validate_cot_profile(self):
+        assert AppConfig(tesla_username="a@b.com", cot_url="tcp://h:1", cot_profile="lean").validate() is True
+        assert AppConfig(tesla_username="a@b.com", cot_url="tcp://h:1", cot_profile="tiny").validate() is False
+
+    def test_validate_dead_reckoning_model(self):
+        cfg = AppConfig(tesla_username="a@b.com", cot_url="tcp://h:1")
+        assert cfg.dead_reckoning_model == "constant"  # ctrv is opt-in
+        assert dataclasses.replace(cfg, dead_reckoning_model="ctrv").validate() is True
+        assert dataclasses.replace(cfg, dead_reckoning_model="kalman").validate() is False
+
+    @pytest.mark.parametrize("no_send, api_loop_delay, limit", [(0, 10, 120), (0, 30, 240), (300, 10, 300)])
+    def test_health_no_send_limit(self, no_send, api_loop_delay, limit):
+        cfg = AppConfig(health_no_send_seconds=no_send, api_loop_delay=api_loop_delay)
+        assert cfg.health_no_send_limit == limit
+
+    @pytest.mark.parametrize("adaptive, min_delay, max_delay, valid", [
+        (True, 0.25, 5, True),
+        (True, 2, 2, True),
+        (True, 0, 5, False),
+        (True, 6, 5, False),
+        (False, 0, 5, True),  # bounds unused
+    ])
+    def test_validate_adaptive_dead_reckoning_bounds(self, adaptive, min_delay, max_delay, valid):
+        cfg = AppConfig(tesla_username="a@b.com", cot_url="tcp://h:1", dead_reckoning_adaptive=adaptive,
+                        dead_reckoning_min_delay=min_delay, dead_reckoning_max_delay=max_delay)
+        assert cfg.validate() is valid
+
 
 class TestLoadConfig:
     def test_explicit_path_maps_upper_to_fields(self, tmp_path):
@@ -60,6 +108,16 @@ class TestLoadConfig:
         assert c.tesla_username == "a@b.com"
         assert not hasattr(c, "something_else")
 
+    def test_cot_url_list_becomes_tuple(self, tmp_path):
+        path = _write_config(tmp_path, 'COT_URL = ["tcp://a:1", "tcp://b:2"]\n')
+        c = load_config(path)
+        assert c.cot_url == ("tcp://a:1", "tcp://b:2")
+        assert c.cot_urls == ("tcp://a:1", "tcp://b:2")
+
+    def test_nested_cot_url_list_becomes_failover_group(self, tmp_path):
+        path = _write_config(tmp_path, 'COT_URL = [["tcp://a:1", "tcp://b:1"], "tcp://c:2"]\n')
+        assert load_config(path).cot_url == (("tcp://a:1", "tcp://b:1"), "tcp://c:2")
+
     def test_vehicle_filter_list_becomes_tuple(self, tmp_path):
         path = _write_config(tmp_path, 'VEHICLE_FILTER = ["Tron", "Other"]\n')
         assert load_config(path).vehicle_filter == ("Tron", "Other")
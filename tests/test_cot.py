@@ -1,11 +1,22 @@
 """Tests for teslaontarget.cot — CoT XML generation from vehicle data."""
+import inspect
+import re
 import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
 
 import pytest
 from hypothesis import HealthCheck, given, settings, strategies as st
 
 
+from teslaontarget import cot, takproto
 from teslaontarget.cot import (
+    PRIORITY_CACHED,
+    PRIORITY_DEAD_RECKONED,
+    PRIORITY_FIX,
+    CotMessage,
+    CotProfile,
+    build_cot_event,
     generate_cot_packet,
     format_cot_for_tak,
     celsius_to_fahrenheit,
@@ -60,6 +71,12 @@ class TestEventSkeleton:
         stale = datetime.strptime(root.get("stale"), fmt)
         assert abs((stale - start).total_seconds() - 300) < 2
 
+    def test_stale_seconds_override(self):
+        now = datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+        assert (build_cot_event({}, now, stale_seconds=1800)["stale"] - now).total_seconds() == 1800
+        message = CotMessage({}, now=now, stale_seconds=45)
+        assert (message.event["stale"] - now).total_seconds() == 45
+
 
 class TestPointAndTrack:
     def test_moving_uses_tight_circular_error(self):
@@ -177,6 +194,56 @@ class TestRemarks:
         assert "FRUNK OPEN" not in r and "TRUNK OPEN" not in r
 
 
+class TestRemarksCache:
+    DATA = {"UID": "TESLA-1", "shift_state": "D", "battery_range": 200, "latitude": 30.0, "speed": 40}
+
+    def test_dead_reckoned_copies_reuse_the_string(self):
+        cache = cot._RemarksCache()
+        first = cache.get(self.DATA)
+        with patch("teslaontarget.cot._build_remarks") as build:
+            for step in range(5):  # position moves, remark inputs don't
+                assert cache.get(dict(self.DATA, latitude=30.0 + step, dead_reckoned=True)) is first
+        build.assert_not_called()
+        assert cache.stats() == {"remarks_cache_hits": 5, "remarks_cache_misses": 1,
+                                 "remarks_cache_hit_rate": 0.8333}
+
+    def test_changed_input_rebuilds(self):
+        cache = cot._RemarksCache()
+        cache.get(self.DATA)
+        assert "Range: 199 mi" in cache.get(dict(self.DATA, battery_range=199))
+        assert cache.misses == 2
+
+    def test_missing_and_none_are_distinct(self):
+        cache = cot._RemarksCache()
+        charging = {"UID": "TESLA-1", "charging_state": "Charging", "minutes_to_full_charge": 30}
+        assert "to 80%" in cache.get(charging)
+        assert "to None%" in cache.get(dict(charging, charge_limit_soc=None))
+
+    def test_entries_are_per_uid(self):
+        cache = cot._RemarksCache()
+        cache.get(self.DATA)
+        assert "Gear: P" in cache.get(dict(self.DATA, UID="TESLA-2", shift_state="P"))
+        assert cache.get(self.DATA) == cot._build_remarks(self.DATA)
+        assert cache.hits == 1
+
+    def test_empty_stats(self):
+        assert cot._RemarksCache().stats()["remarks_cache_hit_rate"] is None
+
+    def test_keys_cover_every_field_the_remarks_read(self):
+        source = "".join(inspect.getsource(fn) for fn in (
+            cot._build_remarks, cot._charging_remark, cot._charging_time_remark, cot._autopilot_remark,
+            cot._security_remark))
+        fields = set(re.findall(r"data\.get\([\"'](\w+)[\"']", source))
+        fields |= set(re.findall(r"\([\"'](\w+)[\"'], [\"'][A-Z]{2}[\"']\)", source))  # window pairs
+        assert fields and fields <= set(cot._REMARKS_KEYS)
+
+    def test_events_use_the_shared_cache(self):
+        before = cot.cot_stats()["remarks_cache_hits"]
+        build_cot_event(self.DATA)
+        build_cot_event(self.DATA)
+        assert cot.cot_stats()["remarks_cache_hits"] >= before + 1
+
+
 class TestFormatForTak:
     def test_prepends_xml_declaration_and_returns_bytes(self):
         out = format_cot_for_tak("<event/>")
@@ -191,6 +258,259 @@ class TestFormatForTak:
         assert ET.fromstring(body).get("uid") == "X"
 
 
+class TestCotMessage:
+    DATA = {"UID": "TESLA-9", "display_name": "Tron", "latitude": 30.0, "longitude": -87.0,
+            "speed": 40, "heading": 180, "battery_level": 60, "shift_state": "D"}
+
+    def test_uid_from_event(self):
+        assert CotMessage(self.DATA).uid == "TESLA-9"
+
+    def test_v0_matches_xml_pipeline(self):
+        msg = CotMessage(self.DATA)
+        expected = format_cot_for_tak(generate_cot_packet(self.DATA))
+        # Same event, same fields: only the timestamps may differ between the two builds.
+        got, want = (ET.fromstring(b.split(b"?>", 1)[1]) for b in (msg.encode(0), expected))
+        assert got.find("detail/remarks").text == want.find("detail/remarks").text
+        assert got.find("point").attrib == want.find("point").attrib
+        assert msg.encode().startswith(b"<?xml")
+
+    def test_v1_is_framed_protobuf_and_smaller(self):
+        msg = CotMessage(self.DATA)
+        v1 = msg.encode(1)
+        assert v1[0] == 0xBF
+        assert len(v1) < len(msg.encode(0))
+
+    def test_encodings_are_memoized_per_version(self):
+        msg = CotMessage(self.DATA)
+        assert msg.encode(0) is msg.encode(0)
+        assert msg.encode(1) is msg.encode(1)
+        assert msg.encode(0, mesh=True) is msg.encode(0)
+
+    def test_dumps_loads_round_trip_is_byte_identical(self):
+        msg = CotMessage(dict(self.DATA, elevation=12.345, vehicle_model="Model 3"))
+        again = CotMessage.loads(msg.dumps())
+        assert again.uid == "TESLA-9"
+        assert again.encode(0) == msg.encode(0)
+        assert again.encode(1) == msg.encode(1)
+
+    def test_priority_defaults_to_the_data_kind(self):
+        assert CotMessage(self.DATA).priority == PRIORITY_FIX
+        assert CotMessage(dict(self.DATA, dead_reckoned=True)).priority == PRIORITY_DEAD_RECKONED
+        assert CotMessage(self.DATA, priority=PRIORITY_CACHED).priority == PRIORITY_CACHED
+        assert CotMessage.loads(CotMessage(self.DATA).dumps()).priority == PRIORITY_FIX
+
+    def test_v1_mesh_framing(self):
+        msg = CotMessage(self.DATA)
+        mesh = msg.encode(1, mesh=True)
+        assert mesh.startswith(b"\xbf\x01\xbf")
+        assert mesh[3:] == takproto.encode_event(msg.event)
+
+
+def _etree_xml(event):
+    """The ElementTree rendering the template serializer must reproduce byte for byte."""
+    def cot_time(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-4] + "Z"
+
+    root = ET.Element("event", {"version": "2.0", "uid": event["uid"], "type": event["type"],
+                                "how": event["how"], "access": event["access"]})
+    root.set("time", cot_time(event["time"]))
+    root.set("start", cot_time(event["time"]))
+    root.set("stale", cot_time(event["stale"]))
+    ET.SubElement(root, "point", {"lat": str(event["lat"]), "lon": str(event["lon"]),
+                                  "hae": f"{event['hae']:.3f}", "ce": event["ce"], "le": event["le"]})
+    detail = ET.SubElement(root, "detail")
+    ET.SubElement(detail, "takv", {"os": event["os"], "version": event["version"], "device": event["device"],
+                                   "platform": event["platform"]})
+    ET.SubElement(detail, "contact", {"endpoint": event["endpoint"], "callsign": event["callsign"]})
+    ET.SubElement(detail, "uid", {"Droid": event["callsign"]})
+    ET.SubElement(detail, "precisionlocation", {"altsrc": event["altsrc"], "geopointsrc": event["geopointsrc"]})
+    ET.SubElement(detail, "__group", {"role": event["group_role"], "name": event["group_name"]})
+    ET.SubElement(detail, "status", {"battery": str(int(event["battery"]))})
+    ET.SubElement(detail, "track", {"course": f"{event['course']:.8f}", "speed": f"{event['speed']:.8f}"})
+    ET.SubElement(detail, "remarks").text = event["remarks"]
+    return ET.tostring(root, encoding="unicode")
+
+
+class TestTemplateSerializer:
+    @_PROP
+    @given(st.fixed_dictionaries({
+        "UID": st.text(),
+        "display_name": st.text(),
+        "vehicle_model": st.text(),
+        "latitude": st.floats(-90, 90),
+        "longitude": st.floats(-180, 180),
+        "elevation": st.one_of(st.none(), st.floats(-500, 9000)),
+        "speed": st.one_of(st.none(), st.floats(0, 200)),
+        "heading": st.one_of(st.none(), st.floats(0, 360)),
+        "battery_level": st.integers(0, 100),
+        "shift_state": st.sampled_from(["P", "D", "R", "N", "", None]),
+    }), st.datetimes(datetime(2000, 1, 1), datetime(2100, 1, 1), timezones=st.just(timezone.utc)))
+    def test_byte_identical_to_elementtree(self, data, now):
+        event = build_cot_event(data, now)
+        assert cot._render_xml(event) == _etree_xml(event)
+
+    def test_escapes_like_elementtree(self):
+        event = build_cot_event({"UID": "T<&>\"'x", "display_name": "A\tB\r\nC", "vehicle_model": "M<3>"})
+        event["remarks"] = "a & <b> \"c\"\n"
+        assert cot._render_xml(event) == _etree_xml(event)
+        assert 'callsign="A&#09;B&#13;&#10;C"' in cot._render_xml(event)
+
+    def test_empty_remarks_is_a_short_element(self):
+        event = build_cot_event({})
+        event["remarks"] = ""
+        assert cot._render_xml(event) == _etree_xml(event)
+        assert "<remarks />" in cot._render_xml(event)
+
+    @pytest.mark.parametrize("field", ["callsign", "remarks"])
+    def test_unserializable_values_raise_type_error(self, field):
+        event = build_cot_event({})
+        event[field] = 42
+        with pytest.raises(TypeError, match="cannot serialize 42"):
+            cot._render_xml(event)
+
+    def test_constant_fragments_are_rendered_once_per_vehicle(self):
+        cot._detail_head.cache_clear()
+        for speed in range(5):
+            generate_cot_packet({"UID": "TESLA-1", "display_name": "Tron", "speed": speed})
+        info = cot._detail_head.cache_info()
+        assert (info.misses, info.hits) == (1, 4)
+
+
+class TestCotProfile:
+    T0 = datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc)
+    DATA = {"UID": "TESLA-1", "display_name": "Tron", "latitude": 30.123456789, "longitude": -87.987654321,
+            "elevation": 12.3456, "speed": 45, "heading": 271.2345, "battery_level": 80,
+            "battery_range": 240, "shift_state": "D"}
+
+    def _xml(self, profile, seconds=0, **data):
+        event = build_cot_event(dict(self.DATA, **data), self.T0 + timedelta(seconds=seconds))
+        return cot._render_xml(profile.apply(event))
+
+    def test_full_is_untouched(self):
+        event = build_cot_event(self.DATA, self.T0)
+        assert CotProfile().apply(dict(event)) == event
+
+    def test_unknown_profile(self):
+        with pytest.raises(ValueError, match="COT_PROFILE|lean"):
+            CotProfile("tiny")
+
+    def test_lean_rounds_to_meaningful_precision(self):
+        root = ET.fromstring(self._xml(CotProfile("lean")))
+        point, track = root.find("point"), root.find("./detail/track")
+        assert (point.get("lat"), point.get("lon"), point.get("hae")) == ("30.123457", "-87.987654", "12.3")
+        assert (track.get("course"), track.get("speed")) == ("271.2", "20.12")
+
+    def test_lean_sends_constant_detail_once(self):
+        profile = CotProfile("lean")
+        first = ET.fromstring(self._xml(profile))
+        second = ET.fromstring(self._xml(profile, seconds=1))
+        assert first.find("./detail/contact").get("callsign") == "Tron"
+        assert [child.tag for child in second.find("detail")] == ["status", "track"]  # remarks unchanged
+        assert second.find("point") is not None
+
+    def test_lean_sends_remarks_when_they_change(self):
+        profile = CotProfile("lean")
+        self._xml(profile)
+        changed = ET.fromstring(self._xml(profile, seconds=1, battery_range=239))
+        assert "Range: 239 mi" in changed.find("./detail/remarks").text
+        assert changed.find("./detail/contact") is None
+        again = ET.fromstring(self._xml(profile, seconds=2, battery_range=239))
+        assert again.find("./detail/remarks") is None
+
+    def test_empty_remarks_change_is_sent(self):
+        profile = CotProfile("lean")
+        event = build_cot_event(self.DATA, self.T0)
+        profile.apply(event)
+        event = build_cot_event(self.DATA, self.T0)
+        event["remarks"] = ""
+        assert "<remarks />" in cot._render_xml(profile.apply(event))
+
+    def test_minimal_rounds_coarser_and_drops_status_and_remarks(self):
+        profile = CotProfile("minimal")
+        first = ET.fromstring(self._xml(profile))
+        assert first.find("point").get("lat") == "30.12346" and first.find("./detail/remarks") is not None
+        later = ET.fromstring(self._xml(profile, seconds=1, battery_range=100))
+        track = later.find("./detail/track")
+        assert (track.get("course"), track.get("speed")) == ("271", "20.1")
+        assert later.find("point").get("hae") == "12"
+        assert [child.tag for child in later.find("detail")] == ["track"]
+
+    def test_detail_is_refreshed_periodically(self):
+        profile = CotProfile("lean", refresh=60)
+        self._xml(profile)
+        assert "<takv" not in self._xml(profile, seconds=59)
+        assert "<takv" in self._xml(profile, seconds=60)
+        assert "<takv" not in self._xml(profile, seconds=61)
+        assert "<takv" in self._xml(profile, seconds=30)  # clock stepped back
+
+    def test_changed_constant_detail_is_sent_at_once(self):
+        profile = CotProfile("lean")
+        self._xml(profile)
+        assert 'callsign="Renamed"' in self._xml(profile, seconds=1, display_name="Renamed")
+
+    def test_vehicles_are_tracked_separately(self):
+        profile = CotProfile("lean")
+        self._xml(profile)
+        assert "<takv" in self._xml(profile, UID="TESLA-2")
+
+    def test_missing_coordinates_are_left_alone(self):
+        event = CotProfile("lean").apply(build_cot_event({"latitude": None}, self.T0))
+        assert event["lat"] is None and event["lon"] == 0
+
+    def test_trimmed_events_encode_and_spool(self):
+        profile = CotProfile("lean")
+        CotMessage(self.DATA, now=self.T0, profile=profile)
+        message = CotMessage(self.DATA, now=self.T0 + timedelta(seconds=1), profile=profile)
+        assert "callsign" not in message.event and "remarks" not in message.event
+        restored = CotMessage.loads(message.dumps())
+        assert restored.encode(0) == message.encode(0)
+        assert restored.encode(1) == message.encode(1)
+        assert len(message.encode(0)) < 0.6 * len(CotMessage(self.DATA, now=self.T0).encode(0))
+
+
+class TestDuplicateFilter:
+    DATA = {"UID": "TESLA-1", "latitude": 30.0, "longitude": -87.0, "battery_level": 80}
+
+    def test_fingerprint_ignores_timestamps_only(self):
+        a = CotMessage(self.DATA, now=datetime(2026, 1, 1, tzinfo=timezone.utc))
+        b = CotMessage(self.DATA, stale_seconds=60)
+        assert a.fingerprint() == b.fingerprint()
+        assert CotMessage(dict(self.DATA, battery_level=79)).fingerprint() != a.fingerprint()
+
+    def test_heartbeat_after_the_stale_fraction(self):
+        dupes = cot.DuplicateFilter(heartbeat_fraction=0.5)
+        with patch("teslaontarget.cot.time.monotonic", side_effect=[0.0, 29.0, 30.0, 31.0]):
+            assert dupes.admit(CotMessage(self.DATA), 60) is True
+            assert dupes.admit(CotMessage(self.DATA), 60) is False
+            assert dupes.admit(CotMessage(self.DATA), 60) is True  # heartbeat
+            assert dupes.admit(CotMessage(self.DATA), 60) is False
+        assert (dupes.suppressed, dupes.heartbeats) == (2, 1)
+
+    def test_heartbeat_interval_is_capped(self):
+        dupes = cot.DuplicateFilter(heartbeat_fraction=0.5, max_interval=60)
+        with patch("teslaontarget.cot.time.monotonic", side_effect=[0.0, 59.0, 60.0]):
+            assert dupes.admit(CotMessage(self.DATA), 1800) is True
+            assert dupes.admit(CotMessage(self.DATA), 1800) is False
+            assert dupes.admit(CotMessage(self.DATA), 1800) is True  # 60 s, not 900
+
+    def test_uids_and_forget(self):
+        dupes = cot.DuplicateFilter()
+        assert dupes.admit(CotMessage(self.DATA), 60)
+        assert dupes.admit(CotMessage(dict(self.DATA, UID="TESLA-2")), 60)
+        dupes.forget("TESLA-1")
+        dupes.forget("TESLA-9")
+        assert dupes.admit(CotMessage(self.DATA), 60)
+
+    def test_counters_are_in_cot_stats(self):
+        before = cot.cot_stats()["duplicates_suppressed"]
+        dupes = cot.DuplicateFilter()
+        dupes.admit(CotMessage(self.DATA), 60)
+        dupes.admit(CotMessage(self.DATA), 60)
+        stats = cot.cot_stats()
+        assert stats["duplicates_suppressed"] >= before + 1
+        assert "heartbeats_sent" in stats
+
+
 class TestCelsiusToFahrenheit:
     def test_none(self):
         assert celsius_to_fahrenheit(None) is None
@@ -0,0 +1,469 @@
+"""Tests for teslaontarget.dead_reckoning (projection, dead-band filter and tick scheduler)."""
+import gc
+import importlib.util
+import random
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget import dead_reckoning
+from teslaontarget.constants import MPH_TO_MS
+from teslaontarget.dead_reckoning import (
+    ADAPTIVE_SPACING_METERS,
+    MAX_ACCELERATION,
+    MAX_YAW_RATE,
+    DeadBand,
+    VECTOR_MIN_ROWS,
+    DeadReckoningScheduler,
+    FleetTable,
+    MotionEstimator,
+    Track,
+    emission_interval,
+    project,
+)
+from teslaontarget.utils import calculate_distance
+
+
+class TestProject:
+    def test_moves_the_expected_distance_along_the_heading(self):
+        lat, lon = project(30.0, -87.0, 90, 20.0, 10)
+        assert lat == pytest.approx(30.0)
+        assert lon > -87.0
+        assert calculate_distance(30.0, -87.0, lat, lon) == pytest.approx(200, rel=1e-3)
+
+    def test_zero_speed_or_time_stays_put(self):
+        assert project(30.0, -87.0, 45, 0, 10) == pytest.approx((30.0, -87.0))
+        assert project(30.0, -87.0, 45, 20, 0) == pytest.approx((30.0, -87.0))
+
+
+class TestEmissionInterval:
+    @pytest.mark.parametrize("mph, yaw_rate, acceleration, low, high", [
+        (70, 0, 0, 1.5, 1.7),  # highway, straight: one update per ADAPTIVE_SPACING_METERS
+        (65, 3, 0, 0.7, 0.9),  # highway curve
+        (20, -15, 0, 0.6, 0.7),  # junction turn
+        (30, 0, -4, 0.45, 0.55),  # hard braking
+        (10, 0, 0, 5, 5),  # slow traffic: capped at the maximum
+        (80, 30, 0, 0.25, 0.25),  # floored at the minimum
+    ])
+    def test_interval_follows_speed_and_turn_rate(self, mph, yaw_rate, acceleration, low, high):
+        assert low <= emission_interval(mph * MPH_TO_MS, yaw_rate, acceleration, 0.25, 5) <= high
+
+    def test_straight_interval_spaces_updates_evenly(self):
+        assert emission_interval(25.0, 0, 0, 0.1, 10) == pytest.approx(ADAPTIVE_SPACING_METERS / 25.0)
+
+    def test_stopped_vehicle_has_nothing_to_send(self):
+        assert emission_interval(0.0, 10, 0, 0.25, 5) is None
+
+
+class TestDeadBand:
+    def _band(self, threshold=5, max_interval=10):
+        band = DeadBand(threshold, max_interval)
+        band.mark_sent(30.0, -87.0, 0, 10.0, 100.0)  # northbound at 10 m/s
+        return band
+
+    def test_on_track_position_is_suppressed(self):
+        band = self._band()
+        assert band.due(*project(30.0, -87.0, 0, 10.0, 3), 103.0) is False
+        assert (band.sent, band.suppressed) == (0, 1)
+
+    def test_off_track_position_is_sent(self):
+        band = self._band()
+        lat, lon = project(30.0, -87.0, 0, 10.0, 3)
+        lat, lon = project(lat, lon, 90, 1.0, 6)  # 6 m east of the client's extrapolation
+        assert band.error_m(lat, lon, 103.0) == pytest.approx(6, rel=1e-3)
+        assert band.due(lat, lon, 103.0) is True
+
+    def test_max_interval_forces_a_send(self):
+        band = self._band(max_interval=10)
+        assert band.due(*project(30.0, -87.0, 0, 10.0, 10), 110.0) is True
+
+    def test_disabled_or_unseeded_sends_everything(self):
+        assert DeadBand(0).due(30.0, -87.0, 0) is True
+        assert DeadBand(5).due(30.0, -87.0, 0) is True
+
+
+class TestMotionEstimator:
+    def test_starts_with_no_rates(self):
+        est = MotionEstimator()
+        assert (est.yaw_rate, est.acceleration) == (0.0, 0.0)
+        est.update(90, 20.0, 100)
+        assert (est.yaw_rate, est.acceleration) == (0.0, 0.0)
+
+    def test_estimates_a_steady_turn_and_speed_change(self):
+        est = MotionEstimator()
+        for i in range(6):  # fixes 10 s apart: 2 deg/s to the right, speeding up 0.5 m/s^2
+            est.update((350 + 20 * i) % 360, 10.0 + 5 * i, 100 + 10 * i)
+        assert est.yaw_rate == pytest.approx(2.0, rel=0.05)  # across the 360 -> 0 wrap
+        assert est.acceleration == pytest.approx(0.5, rel=0.05)
+
+    def test_repeated_fix_is_ignored(self):
+        est = MotionEstimator()
+        est.update(0, 10.0, 100)
+        est.update(20, 15.0, 110)
+        rates = (est.yaw_rate, est.acceleration)
+        est.update(40, 20.0, 110)
+        assert (est.yaw_rate, est.acceleration) == rates
+
+    def test_stop_or_long_gap_restarts(self):
+        est = MotionEstimator()
+        est.update(0, 10.0, 100)
+        est.update(20, 15.0, 110)
+        est.update(20, 0, 120)  # stopped
+        assert (est.yaw_rate, est.acceleration) == (0.0, 0.0)
+        est.update(0, 10.0, 130)
+        est.update(90, 20.0, 200)  # 70 s later: a fresh start
+        assert (est.yaw_rate, est.acceleration) == (0.0, 0.0)
+
+    def test_rates_are_capped(self):
+        est = MotionEstimator()
+        est.update(0, 0.5, 100)
+        est.update(90, 40.0, 101)
+        assert (est.yaw_rate, est.acceleration) == (MAX_YAW_RATE, MAX_ACCELERATION)
+        est = MotionEstimator()
+        est.update(90, 40.0, 100)
+        est.update(0, 0.5, 101)
+        assert (est.yaw_rate, est.acceleration) == (-MAX_YAW_RATE, -MAX_ACCELERATION)
+
+
+class TestTrack:
+    def test_moving_track_advances_by_elapsed_time(self):
+        track = Track({"latitude": 30.0, "longitude": -87.0, "speed": 10, "heading": 90}, DeadBand(), 100, 9)
+        assert track.advance_to(102.5) == 2.5
+        assert (track.lat, track.lon) == project(30.0, -87.0, 90, track.speed_ms, 2.5)
+        assert track.at == 102.5 and not track.expired(108.9) and track.expired(109)
+
+    def test_stationary_track_keeps_exact_coordinates(self):
+        data = {"latitude": 30.1, "longitude": -87.1, "speed": None, "heading": None}
+        track = Track(data, DeadBand(), 0, 9, yaw_rate=5, acceleration=1)
+        track.advance_to(2)
+        assert (track.lat, track.lon, track.heading) == (30.1, -87.1, 0)
+        assert not track.turning  # a stopped car's rates are not followed
+
+    def test_turning_track_follows_a_fading_curve(self):
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 30, "heading": 350}
+        track = Track(data, DeadBand(), 0, 9, yaw_rate=10, acceleration=-1)
+        assert track.turning
+        for now in range(1, 4):
+            track.advance_to(now)
+        # 3 s at a rate fading from 10 deg/s (3 s time constant): ~19 deg, across north
+        assert track.heading == pytest.approx(8.96, abs=0.01)
+        assert track.speed_ms == pytest.approx(30 * 0.44704 - 1.896, abs=0.01)
+        assert track.yaw_rate == pytest.approx(10 / 2.71828, rel=1e-4)
+        # the same motion in one step lands within a metre of three 1 s steps
+        once = Track(data, DeadBand(), 0, 9, yaw_rate=10, acceleration=-1)
+        once.advance_to(3)
+        assert calculate_distance(track.lat, track.lon, once.lat, once.lon) < 1
+
+    def test_braking_track_stops_instead_of_reversing(self):
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 5, "heading": 0}
+        track = Track(data, DeadBand(), 0, 60, acceleration=-4)
+        track.advance_to(30)
+        assert track.speed_ms == 0
+        lat = track.lat
+        track.advance_to(40)
+        assert track.lat == lat
+
+
+def _random_rows(table, n, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        kind = i % 4  # stationary, straight, turning, braking to a stop
+        table.add(lat=rng.uniform(-60, 60), lon=rng.uniform(-180, 180), heading=rng.uniform(0, 360),
+                  speed_ms=(0.0, rng.uniform(1, 35), rng.uniform(1, 35), rng.uniform(1, 10))[kind],
+                  at=100.0, moving=kind != 0,
+                  yaw_rate=rng.uniform(-20, 20) if kind == 2 else 0.0,
+                  acceleration={2: rng.uniform(-2, 2), 3: -6.0}.get(kind, 0.0))
+
+
+class TestFleetTable:
+    def test_vectorized_step_matches_row_by_row(self):
+        pytest.importorskip("numpy")
+        vector, rows = FleetTable(), FleetTable(use_numpy=False)
+        assert (vector.backend, rows.backend) == ("numpy", "python")
+        for table in (vector, rows):
+            _random_rows(table, 200)
+            for now in (101.0, 101.7, 103.0, 110.0):
+                table.advance(range(200), now)
+        for name in FleetTable.COLUMNS:
+            assert [vector.get(r, name) for r in range(200)] == pytest.approx(
+                [rows.get(r, name) for r in range(200)], rel=1e-12, abs=1e-12), name
+        assert vector.get(0, "lat") == rows.get(0, "lat")  # stationary rows keep exact coordinates
+        assert vector.get(3, "speed_ms") == 0.0  # braking stops, never reverses
+
+    def test_small_batches_are_moved_row_by_row(self):
+        pytest.importorskip("numpy")
+        table = FleetTable()
+        _random_rows(table, VECTOR_MIN_ROWS)
+        with patch.object(table, "_advance_rows") as vectorized:
+            table.advance(range(VECTOR_MIN_ROWS - 1), 101.0)
+            vectorized.assert_not_called()
+            table.advance(range(VECTOR_MIN_ROWS), 102.0)
+            vectorized.assert_called_once()
+
+    def test_numpy_is_optional(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "numpy", None)  # import numpy -> ImportError
+        spec = importlib.util.spec_from_file_location("teslaontarget._dead_reckoning_without_numpy",
+                                                      dead_reckoning.__file__)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        assert module.numpy is None and module.fleet.backend == "python"
+
+    def test_pure_python_fallback_without_numpy(self):
+        with patch("teslaontarget.dead_reckoning.numpy", None):
+            table = FleetTable()
+        assert table.backend == "python"
+        _random_rows(table, VECTOR_MIN_ROWS * 2)
+        table.advance(range(VECTOR_MIN_ROWS * 2), 101.0)
+        assert table.get(1, "at") == 101.0
+
+    @pytest.mark.parametrize("use_numpy", [True, False])
+    def test_rows_grow_and_are_reused(self, use_numpy):
+        table = FleetTable(use_numpy=use_numpy, capacity=2)
+        rows = [table.add(lat=float(i)) for i in range(5)]
+        assert rows == [0, 1, 2, 3, 4] and table.rows == 5
+        assert [table.get(r, "lat") for r in rows] == [0.0, 1.0, 2.0, 3.0, 4.0]
+        table.release(1)
+        assert table.add(lat=9.0) == 1 and table.get(1, "heading") == 0.0
+
+    def test_track_row_is_freed_with_the_track(self):
+        table = FleetTable(capacity=4)
+        track = Track({"latitude": 30.0, "longitude": -87.0, "speed": 10}, DeadBand(), 0, 9, table=table)
+        assert table.rows == 1 and track.table is table
+        del track
+        gc.collect()
+        assert table.rows == 0
+        assert table.add() == 0  # the row is reused
+
+    def test_released_track_is_not_freed_again(self):
+        table = FleetTable(capacity=4)
+        track = Track({"latitude": 30.0, "longitude": -87.0, "speed": 10}, DeadBand(), 0, 9, table=table)
+        track.release()
+        track.release()
+        del track
+        gc.collect()
+        assert table.rows == 0
+        assert [table.add(), table.add()] == [0, 1]
+
+    def test_collecting_a_track_never_waits_for_the_table_lock(self):
+        table = FleetTable(capacity=4)
+        track = Track({"latitude": 30.0, "longitude": -87.0, "speed": 10}, DeadBand(), 0, 9, table=table)
+
+        def collect_under_the_lock():  # as if GC ran mid-advance on the thread holding it
+            with table._lock:
+                nonlocal track
+                del track
+                gc.collect()
+
+        worker = threading.Thread(target=collect_under_the_lock, daemon=True)
+        worker.start()
+        worker.join(1)
+        assert not worker.is_alive()
+        assert table.rows == 0
+
+
+class _Clock:
+    """Stand-in for ``time.monotonic`` that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    c = _Clock()
+    with patch("teslaontarget.dead_reckoning.time.monotonic", c):
+        yield c
+
+
+@pytest.fixture
+def sched():
+    with patch("teslaontarget.dead_reckoning.threading.Thread"):  # ticks are run by hand
+        yield DeadReckoningScheduler()
+
+
+class TestScheduler:
+    def test_ticks_run_in_due_order_and_repeat(self, clock, sched):
+        order = []
+        sched.schedule("A", lambda now: order.append("A") or 1.0, 0.5)
+        sched.schedule("B", lambda now: order.append("B") or None, 0.2)
+        sched.run_pending()
+        assert order == []
+        clock.now += 0.6
+        sched.run_pending()
+        assert order == ["B", "A"]
+        assert not sched.scheduled("B") and sched.scheduled("A")
+        clock.now += 1.0
+        sched.run_pending()
+        assert order == ["B", "A", "A"]
+
+    def test_new_tick_replaces_the_old_one(self, clock, sched):
+        old, new = MagicMock(return_value=1.0), MagicMock(return_value=None)
+        sched.schedule("A", old, 0.1)
+        sched.schedule("A", new, 0.5)
+        clock.now += 1
+        sched.run_pending()
+        old.assert_not_called()
+        new.assert_called_once()
+        assert sched._heap == []
+
+    def test_replaced_tick_behind_a_live_one_is_dropped_from_the_batch(self, clock, sched):
+        old, new, other = (MagicMock(return_value=None) for _ in range(3))
+        sched.schedule("A", old, 0.1)
+        sched.schedule("A", new, 0.5)
+        sched.schedule("B", other, 0)  # ahead of A's stale entry in the same batch
+        clock.now += 1
+        sched.run_pending()
+        old.assert_not_called()
+        new.assert_called_once()
+        other.assert_called_once()
+        assert sched._heap == []
+
+    def test_cancel_and_replace_during_a_tick(self, clock, sched):
+        sched.schedule("A", lambda now: sched.cancel("A") or 1.0, 0)
+        sched.schedule("B", lambda now: sched.schedule("B", lambda now: None, 5) or 1.0, 0)
+        sched.run_pending()
+        assert not sched.scheduled("A")
+        assert sched._heap[0][0] == clock.now + 5  # only the replacement is queued
+
+    def test_failing_tick_is_dropped(self, clock, sched):
+        sched.schedule("A", MagicMock(side_effect=RuntimeError("boom")), 0)
+        sched.run_pending()
+        assert not sched.scheduled("A")
+
+    def test_tick_gets_the_time_it_runs_at(self, clock, sched):
+        tick = MagicMock(return_value=None)
+        sched.schedule("A", tick, 1.0)
+        clock.now += 1.5
+        sched.run_pending()
+        tick.assert_called_once_with(1001.5)
+
+    def test_schedule_is_absolute(self, clock, sched):
+        def slow_tick(now):
+            clock.now += 0.3  # e.g. a blocking send
+            return 1.0
+
+        sched.schedule("A", slow_tick, 1.0)
+        for _ in range(5):
+            clock.now = sched._heap[0][0]
+            sched.run_pending()
+        assert sched._heap[0][0] == 1006.0  # no drift from the time spent in each tick
+
+    def test_late_tick_catches_up_once_then_skips(self, clock, sched):
+        ran = []
+        sched.schedule("A", lambda now: ran.append(now) or 1.0, 1.0)
+        clock.now = 1003.5  # due at 1001; missed 1002 and 1003
+        sched.run_pending()  # the 1001 tick, then the 1003 one catching up; 1002 is skipped
+        assert ran == [1003.5, 1003.5] and sched.skipped == 1
+        assert sched._heap[0][0] == 1004.0  # back in phase
+        assert sched.stats()["ticks_skipped"] == 1
+
+    def test_tick_lag_stats_and_jitter_histogram(self, clock, sched):
+        assert sched.stats() == {
+            "vehicles": 0, "ticks": 0, "ticks_skipped": 0, "tick_lag_last": 0.0, "tick_lag_max": 0.0,
+            "tick_lag_mean": None,
+            "tick_jitter_ms": {"le_1": 0, "le_5": 0, "le_10": 0, "le_50": 0, "le_100": 0, "le_500": 0,
+                               "le_1000": 0, "over": 0},
+        }
+        sched.schedule("A", lambda now: 1.0, 1.0)
+        for lag in (0, 0.003, 0.25, 0.75, 2):  # 2 s late: one interval skipped, one caught up on time
+            clock.now = sched._heap[0][0] + lag
+            sched.run_pending()
+        stats = sched.stats()
+        assert (stats["vehicles"], stats["ticks"], stats["ticks_skipped"]) == (1, 6, 1)
+        assert (stats["tick_lag_last"], stats["tick_lag_max"], stats["tick_lag_mean"]) == (0, 2, 0.5005)
+        assert stats["tick_jitter_ms"] == {"le_1": 2, "le_5": 1, "le_10": 0, "le_50": 0, "le_100": 0,
+                                           "le_500": 1, "le_1000": 1, "over": 1}
+
+    def test_due_tracks_advance_in_one_batch(self, clock, sched):
+        table = FleetTable(capacity=4)
+        tracks = [Track({"latitude": 30.0, "longitude": -87.0, "speed": 30, "heading": h}, DeadBand(),
+                        1000.0, 9, table=table) for h in (0, 90)]
+        seen = []
+        for key, track in zip("AB", tracks):
+            sched.schedule(key, lambda now, track=track: seen.append((track.at, track.lat)) or None, 1.0,
+                           track=track)
+        clock.now += 1.0
+        with patch.object(table, "advance", wraps=table.advance) as advance:
+            sched.run_pending()
+        advance.assert_called_once_with([tracks[0].row, tracks[1].row], 1001.0)
+        assert seen[0][0] == seen[1][0] == 1001.0 and seen[0][1] > 30.0  # ticks see the moved tracks
+
+    def test_replaced_cancelled_and_done_tracks_are_released(self, clock, sched):
+        table = FleetTable(capacity=4)
+
+        def track():
+            return Track({"latitude": 30.0, "longitude": -87.0, "speed": 30}, DeadBand(), clock.now, 9, table=table)
+
+        first, second, other = track(), track(), track()
+        sched.schedule("A", lambda now: 1.0, 1.0, track=first)
+        sched.schedule("A", lambda now: 1.0, 1.0, track=second)  # a new fix replaces the track
+        sched.schedule("B", lambda now: None, 1.0, track=other)  # done after one tick
+        assert table.rows == 3  # released only before the next batch, when no tick is using it
+        clock.now += 1.0
+        sched.run_pending()
+        assert table.rows == 1  # "first", and "other" once its batch finished
+        sched.cancel("A")
+        sched.run_pending()
+        assert table.rows == 0
+
+    def test_rescheduling_with_the_same_track_keeps_it(self, clock, sched):
+        table = FleetTable(capacity=4)
+        track = Track({"latitude": 30.0, "longitude": -87.0, "speed": 30}, DeadBand(), clock.now, 9, table=table)
+        sched.schedule("A", lambda now: 1.0, 1.0, track=track)
+        sched.schedule("A", lambda now: 1.0, 1.0, track=track)
+        sched.run_pending()
+        assert table.rows == 1
+        sched.schedule("A", lambda now: 1.0, 1.0)  # a tick without a track
+        sched.run_pending()
+        assert table.rows == 0
+
+    def test_tick_cancelled_earlier_in_its_batch_does_not_run(self, clock, sched):
+        b = MagicMock(return_value=1.0)
+        sched.schedule("A", lambda now: sched.cancel("B"), 0)
+        sched.schedule("B", b, 0)
+        sched.run_pending()
+        b.assert_not_called()
+        assert sched.ticks == 1
+
+    def test_quantum_lines_up_due_times(self, clock):
+        with patch("teslaontarget.dead_reckoning.threading.Thread"):
+            sched = DeadReckoningScheduler(quantum=0.25)
+        clock.now = 1000.1
+        sched.schedule("A", lambda now: 0.3, 1.0)
+        assert sched._heap[0][0] == 1001.25
+        clock.now = 1001.25
+        sched.run_pending()
+        assert sched._heap[0][0] == 1001.75  # 1001.55 rounded up
+
+    def test_thread_starts_once_and_restarts_after_stop(self):
+        with patch("teslaontarget.dead_reckoning.threading.Thread") as Thread:
+            sched = DeadReckoningScheduler()
+            Thread.return_value.is_alive.return_value = True
+            sched.schedule("A", lambda now: None, 1)
+            sched.schedule("B", lambda now: None, 1)
+            Thread.assert_called_once()
+            sched.stop()
+            Thread.return_value.join.assert_called_once_with(timeout=1)
+            Thread.return_value.is_alive.return_value = False
+            sched.schedule("C", lambda now: None, 1)
+            assert Thread.call_count == 2
+
+    def test_stop_without_thread(self):
+        DeadReckoningScheduler().stop()  # nothing to join
+
+    def test_thread_runs_ticks_for_every_vehicle(self):
+        sched = DeadReckoningScheduler()
+        done = {key: threading.Event() for key in "AB"}
+        try:
+            sched.schedule("A", lambda now: done["A"].set(), 0.01)
+            sched.schedule("B", lambda now: done["B"].set(), 0)
+            assert done["A"].wait(2) and done["B"].wait(2)
+            assert sched._thread.name == "DeadReckoning"
+        finally:
+            sched.stop()
+        assert not sched._thread.is_alive()
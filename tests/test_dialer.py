@@ -0,0 +1,218 @@
+"""Tests for teslaontarget.dialer (resolver cache and Happy Eyeballs connects)."""
+import socket
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget import dialer
+from teslaontarget.dialer import ResolverCache, connect_first, interleave
+
+
+def _addr(host, port, family=socket.AF_INET):
+    sockaddr = (host, port, 0, 0) if family == socket.AF_INET6 else (host, port)
+    return (family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", sockaddr)
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def listener():
+    server = socket.create_server(("127.0.0.1", 0))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def blackhole():
+    """A port whose accept backlog is full, so further connects hang (no SYN-ACK)."""
+    server = socket.create_server(("127.0.0.1", 0), backlog=0)
+    fillers = []
+    for _ in range(4):
+        s = socket.socket()
+        s.setblocking(False)
+        s.connect_ex(server.getsockname())
+        fillers.append(s)
+    time.sleep(0.05)
+    yield server.getsockname()[1]
+    for s in fillers:
+        s.close()
+    server.close()
+
+
+def _closed_port():
+    s = socket.create_server(("127.0.0.1", 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+class TestResolverCache:
+    def test_miss_then_hit(self):
+        cache = ResolverCache(ttl=60)
+        with patch("teslaontarget.dialer.socket.getaddrinfo", return_value=["a"]) as gai:
+            assert cache.resolve("tak.example", 8087) == ["a"]
+            assert cache.resolve("tak.example", 8087) == ["a"]
+        gai.assert_called_once_with("tak.example", 8087, type=socket.SOCK_STREAM)
+        stats = cache.stats()
+        assert (stats["dns_misses"], stats["dns_hits"], stats["dns_stale"]) == (1, 1, 0)
+        assert stats["dns_resolve_ms_last"] is not None
+
+    def test_expired_entry_is_served_while_refreshed(self):
+        cache = ResolverCache(ttl=60)
+        with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=[["old"], ["new"]]):
+            cache.resolve("tak.example", 8087)
+            cache._entries[("tak.example", 8087)] = (0, ["old"])  # expired
+            assert cache.resolve("tak.example", 8087) == ["old"]
+            assert _wait_for(lambda: not cache._refreshing)
+        assert cache._entries[("tak.example", 8087)][1] == ["new"]
+        assert cache.stats()["dns_stale"] == 1
+
+    def test_one_refresh_at_a_time(self):
+        cache = ResolverCache(ttl=60)
+        cache._entries[("h", 1)] = (0, ["old"])
+        cache._refreshing.add(("h", 1))
+        with patch("teslaontarget.dialer.threading.Thread") as Thread:
+            assert cache.resolve("h", 1) == ["old"]
+        Thread.assert_not_called()
+
+    def test_failed_refresh_keeps_the_cached_addresses(self):
+        cache = ResolverCache(ttl=60)
+        cache._entries[("h", 1)] = (0, ["old"])
+        with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=socket.gaierror("down")):
+            cache._refresh("h", 1)
+        assert cache._entries[("h", 1)][1] == ["old"]
+        assert cache.errors == 1 and not cache._refreshing
+
+    def test_zero_ttl_resolves_on_every_call(self):
+        cache = ResolverCache(ttl=0)
+        with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=[["first"], ["second"]]) as gai, \
+                patch("teslaontarget.dialer.threading.Thread") as Thread:
+            assert cache.resolve("h", 1) == ["first"]
+            assert cache.resolve("h", 1) == ["second"]
+        assert gai.call_count == 2
+        Thread.assert_not_called()  # synchronously, not in the background
+        assert not cache._entries
+        assert (cache.misses, cache.hits, cache.stale) == (2, 0, 0)
+
+    def test_miss_failure_raises(self):
+        cache = ResolverCache()
+        with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=socket.gaierror("nope")):
+            with pytest.raises(socket.gaierror):
+                cache.resolve("h", 1)
+        assert cache.errors == 1 and not cache._entries
+
+
+def test_interleave_alternates_families_in_resolver_order():
+    v6a, v6b, v4a, v4b = (_addr("::1", 1, socket.AF_INET6), _addr("::2", 1, socket.AF_INET6),
+                          _addr("10.0.0.1", 1), _addr("10.0.0.2", 1))
+    assert interleave([v6a, v6b, v4a, v4b]) == [v6a, v4a, v6b, v4b]
+    assert interleave([v4a, v6a, v6b]) == [v4a, v6a, v6b]
+
+
+class TestConnectFirst:
+    def test_single_address_is_a_plain_connect(self, listener):
+        port = listener.getsockname()[1]
+        sock, sockaddr = connect_first([_addr("127.0.0.1", port)], timeout=2)
+        try:
+            assert sockaddr == ("127.0.0.1", port)
+            assert sock.gettimeout() == 2
+        finally:
+            sock.close()
+
+    def test_single_address_failure_closes_the_socket(self):
+        with patch("teslaontarget.dialer.socket.socket") as sock_cls:
+            sock_cls.return_value.connect.side_effect = ConnectionRefusedError()
+            with pytest.raises(ConnectionRefusedError):
+                connect_first([_addr("127.0.0.1", 1)], timeout=2)
+        sock_cls.return_value.close.assert_called_once()
+
+    def test_refused_address_moves_on_at_once(self, listener):
+        port = listener.getsockname()[1]
+        started = time.monotonic()
+        sock, sockaddr = connect_first([_addr("127.0.0.1", _closed_port()), _addr("127.0.0.1", port)],
+                                       timeout=2, stagger=1)
+        try:
+            assert sockaddr == ("127.0.0.1", port)
+            assert time.monotonic() - started < 0.5
+            assert sock.gettimeout() == 2
+        finally:
+            sock.close()
+
+    def test_hanging_address_costs_one_stagger(self, listener, blackhole):
+        port = listener.getsockname()[1]
+        started = time.monotonic()
+        sock, sockaddr = connect_first([_addr("127.0.0.1", blackhole), _addr("127.0.0.1", port)],
+                                       timeout=5, stagger=0.1)
+        elapsed = time.monotonic() - started
+        sock.close()
+        assert sockaddr == ("127.0.0.1", port)
+        assert 0.1 <= elapsed < 1
+
+    def test_ipv6_and_ipv4_are_raced(self):
+        try:
+            server = socket.create_server(("::1", 0), family=socket.AF_INET6)
+        except OSError:  # host without IPv6 loopback
+            pytest.skip("no IPv6 loopback")
+        port = server.getsockname()[1]
+        try:
+            sock, sockaddr = connect_first([_addr("127.0.0.1", _closed_port()), _addr("::1", port, socket.AF_INET6)],
+                                           timeout=2)
+            assert sock.family == socket.AF_INET6 and sockaddr[0] == "::1"
+            sock.close()
+        finally:
+            server.close()
+
+    def test_every_address_failing_raises_the_last_error(self):
+        addresses = [_addr("127.0.0.1", _closed_port()), _addr("127.0.0.1", _closed_port())]
+        with pytest.raises(ConnectionRefusedError):
+            connect_first(addresses, timeout=2)
+
+    def test_timeout_closes_pending_attempts(self, blackhole):
+        closed = []
+        real_socket = socket.socket
+
+        def tracking(*args):
+            s = real_socket(*args)
+            closed.append(s)
+            return s
+
+        with patch("teslaontarget.dialer.socket.socket", side_effect=tracking):
+            with pytest.raises(socket.timeout):
+                connect_first([_addr("127.0.0.1", blackhole)] * 2, timeout=0.2, stagger=0.05)
+        assert len(closed) == 2 and all(s.fileno() == -1 for s in closed)
+
+    def test_immediate_failures(self):
+        bad_family = MagicMock(side_effect=OSError(97, "Address family not supported"))
+        with patch("teslaontarget.dialer.socket.socket", bad_family):
+            with pytest.raises(OSError, match="family"):
+                connect_first([_addr("::1", 1, socket.AF_INET6)] * 2, timeout=1)
+        sock = MagicMock()
+        sock.connect_ex.return_value = 101  # ENETUNREACH
+        with patch("teslaontarget.dialer.socket.socket", return_value=sock):
+            with pytest.raises(OSError) as err:
+                connect_first([_addr("10.0.0.1", 1)] * 2, timeout=1)
+        assert err.value.errno == 101
+        assert sock.close.call_count == 2
+
+    def test_no_addresses(self):
+        with pytest.raises(OSError, match="no addresses"):
+            connect_first([], timeout=1)
+
+
+def test_background_refresh_uses_a_named_thread():
+    cache = ResolverCache(ttl=60)
+    cache._entries[("h", 1)] = (0, ["old"])
+    seen = []
+    with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=lambda *a, **k: seen.append(
+            threading.current_thread().name) or ["new"]):
+        cache.resolve("h", 1)
+        assert _wait_for(lambda: not cache._refreshing)
+    assert seen == ["TAKResolver"]
+    assert dialer.HAPPY_EYEBALLS_DELAY == 0.25
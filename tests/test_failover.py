@@ -0,0 +1,287 @@
+"""Tests for teslaontarget.failover.FailoverClient."""
+import socket
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget import takproto
+from teslaontarget.failover import FailoverClient
+from teslaontarget.tak_client import TAKClient
+
+
+def _endpoint(name, connected=True, connected_for=3600):
+    c = TAKClient(f"tcp://{name}:8087")
+    c.connected = connected
+    c.last_connect_ok = time.time() - connected_for if connected else None
+    c.start_writer = MagicMock()
+    c.start_background_reconnect = MagicMock()
+    return c
+
+
+@pytest.fixture
+def group():
+    return FailoverClient([_endpoint("primary"), _endpoint("secondary")], failback_after=30)
+
+
+class TestRouting:
+    def test_sends_go_to_the_active_endpoint_only(self, group):
+        with patch.object(group, "start_supervisor") as sup:
+            assert group.send_cot(b"a", uid="A") is True
+            assert group.send_batch([b"b"], ["B"]) is True
+        assert len(group.clients[0].outbound) == 2
+        assert len(group.clients[1].outbound) == 0
+        assert sup.call_count == 2
+
+    def test_resend_window_is_set_on_every_endpoint(self):
+        a, b = _endpoint("a"), _endpoint("b")
+        FailoverClient([a, b], resend_window=1.5)
+        assert a.resend_window == b.resend_window == 1.5
+
+    def test_active_properties(self, group):
+        assert group.active is group.clients[0]
+        assert group.wire_format == (0, False)
+        assert group.connected is True
+        group.clients[0].connected = False
+        assert group.connected is False
+
+
+class TestPreferred:
+    def test_connected_active_stays(self, group):
+        assert group._preferred() == 0
+
+    def test_dead_active_gives_way_to_highest_priority_connected(self):
+        group = FailoverClient([_endpoint("a", connected=False), _endpoint("b", connected=False), _endpoint("c")])
+        assert group._preferred() == 2
+
+    def test_nothing_connected_keeps_the_active_endpoint(self, group):
+        group.active_index = 1
+        for c in group.clients:
+            c.connected = False
+        assert group._preferred() == 1
+
+    def test_fails_back_only_after_the_healthy_window(self, group):
+        group.active_index = 1
+        group.clients[0].last_connect_ok = time.time() - 5
+        assert group._preferred() == 1
+        group.clients[0].last_connect_ok = time.time() - 31
+        assert group._preferred() == 0
+
+
+class TestSwitch:
+    def test_failover_moves_queued_and_recent_writes(self, group):
+        primary, secondary = group.clients
+        primary.outbound.put(b"q1", "A")
+        primary.outbound.put(b"q2")
+        primary.resend_window = 2
+        primary._recent.extend([(time.monotonic() - 5, "old", b"too old"), (time.monotonic(), "B", b"w1")])
+        secondary.outbound.put(b"newer", "A")
+        primary.connected = False
+        primary.last_error_time = time.time() - 0.25
+        group._switch(1)
+        assert group.active is secondary
+        assert secondary.outbound.get_many(10) == [("B", b"w1"), ((None, 0), b"q2"), ("A", b"newer")]
+        assert len(primary.outbound) == 0
+        assert group.switchovers == 1
+        assert group.last_switchover_reason == "failover"
+        assert 250 <= group.last_switchover_ms < 1000
+        secondary.start_writer.assert_called_once()
+
+    def test_failback_leaves_written_events_alone(self, group):
+        primary, secondary = group.clients
+        group.active_index = 1
+        secondary.outbound.put(b"q", "A")
+        secondary._recent.append((time.monotonic(), "B", b"delivered"))
+        group._switch(0)
+        assert primary.outbound.get_many(10) == [("A", b"q")]
+        assert group.last_switchover_reason == "failback"
+        assert group.last_switchover_ms < 1000
+
+    def test_unix_endpoint_is_named_by_path(self):
+        local = TAKClient("unix:///run/tak.sock")
+        local.start_writer = MagicMock()
+        group = FailoverClient([local, _endpoint("remote")])
+        assert group.health_snapshot()["active_endpoint"] == "unix:/run/tak.sock"
+
+    def test_failure_time_unknown(self, group):
+        group.clients[0].connected = False
+        group._switch(1)
+        assert group.last_switchover_ms < 1000
+
+
+class TestSupervisor:
+    def test_switches_when_active_dies(self, group):
+        group.clients[0].connected = False
+        group._supervise_once()
+        assert group.active_index == 1
+
+    def test_moves_stragglers_and_warms_standbys(self, group):
+        primary, secondary = group.clients
+        group.active_index = 1
+        primary.connected = False
+        primary.outbound.put(b"late", "A")  # requeued by the old writer after the switch
+        group._supervise_once()
+        assert secondary.outbound.get_many(10) == [("A", b"late")]
+        secondary.start_writer.assert_called_once()
+        primary.start_background_reconnect.assert_called_once()
+        secondary.start_background_reconnect.assert_not_called()
+
+    def test_loop_runs_until_stopped(self, group):
+        with patch.object(group, "_supervise_once", side_effect=lambda: group.stop_supervisor.set()) as once:
+            group._supervisor_loop()
+        once.assert_called_once()
+
+    def test_start_is_idempotent(self, group):
+        with patch("teslaontarget.failover.threading.Thread") as Thread:
+            group.start_supervisor()
+            Thread.return_value.is_alive.return_value = True
+            group.start_supervisor()
+        Thread.assert_called_once()
+
+    def test_start_race_is_settled_under_the_lock(self, group):
+        alive = MagicMock()
+        alive.is_alive.side_effect = [False, True]
+        group.supervisor_thread = alive
+        with patch("teslaontarget.failover.threading.Thread") as Thread:
+            group.start_supervisor()
+        Thread.assert_not_called()
+
+    def test_reconnect_disconnect_and_close_reach_every_endpoint(self, group):
+        for c in group.clients:
+            c.disconnect = MagicMock()
+            c.close = MagicMock()
+        with patch.object(group, "start_supervisor") as sup:
+            group.start_background_reconnect()
+        sup.assert_called_once()
+        group.disconnect()
+        group.supervisor_thread = MagicMock()
+        group.close()
+        group.supervisor_thread.join.assert_called_once()
+        for c in group.clients:
+            c.start_background_reconnect.assert_called_once()
+            c.disconnect.assert_called_once()
+            c.close.assert_called_once()
+
+    def test_close_without_supervisor(self, group):
+        for c in group.clients:
+            c.close = MagicMock()
+        group.close()
+        assert group.stop_supervisor.is_set()
+
+
+def test_health_snapshot(group):
+    group.clients[0].last_send_ok = 5.0
+    group.clients[1].connected = False
+    group.clients[1].last_connect_ok = None
+    snap = group.health_snapshot()
+    assert snap["active_endpoint"] == "primary:8087"
+    assert snap["active_index"] == 0 and snap["connected"] is True
+    assert snap["endpoints_connected"] == 1
+    assert snap["switchovers"] == 0 and snap["last_switchover_ms"] is None
+    assert snap["last_send_ok"] == 5.0
+    assert snap["last_connect_ok"] == group.clients[0].last_connect_ok
+    assert [e["host"] for e in snap["endpoints"]] == ["primary", "secondary"]
+
+
+def test_health_snapshot_before_any_connect():
+    snap = FailoverClient([_endpoint("a", connected=False)]).health_snapshot()
+    assert snap["last_send_ok"] is None and snap["last_connect_ok"] is None
+
+
+class _StandIn:
+    """A local TAK server stand-in that records the UID of every event it receives."""
+
+    def __init__(self, port=0):
+        self.server = socket.create_server(("127.0.0.1", port))
+        self.port = self.server.getsockname()[1]
+        self.uids = set()
+        self.conns = []
+        self.paused = self.killed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.conns.append(conn)
+            threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        parser = takproto.StreamParser()
+        conn.settimeout(0.01)
+        while not self.killed:
+            if self.paused:
+                time.sleep(0.005)
+                continue
+            try:
+                data = conn.recv(65536)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            if not data:
+                return
+            self.uids.update(uid for _, uid in parser.feed(data))
+
+    def hang(self):
+        """Stop reading: what is sent from now on sits unread in the socket buffer."""
+        self.paused = True
+
+    def kill(self):
+        """Crash: stop listening and drop every connection (unread data is lost)."""
+        self.killed = True
+        self.server.shutdown(socket.SHUT_RDWR)  # wakes the blocked accept()
+        self.server.close()
+        for conn in self.conns:
+            conn.close()
+
+
+def _event(i):
+    return f"<event uid='U{i}' type='a-f-G'><point/></event>".encode()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_no_events_lost_across_failover_and_failback():
+    primary, secondary = _StandIn(), _StandIn()
+    clients = [TAKClient(f"tcp://127.0.0.1:{s.port}", ping_interval=0) for s in (primary, secondary)]
+    for c in clients:
+        c.reconnect_interval = 0.05
+    group = FailoverClient(clients, failback_after=0.3)
+    try:
+        group.start_background_reconnect()
+        assert _wait_for(lambda: all(c.connected for c in clients))
+        for i in range(300):
+            if i == 80:
+                primary.hang()
+            if i == 100:
+                primary.kill()  # the writes since the hang die with it
+            group.send_cot(_event(i), uid=f"U{i}")
+            time.sleep(0.001)
+        assert _wait_for(lambda: primary.uids | secondary.uids == {f"U{i}" for i in range(300)})
+        assert "U95" not in primary.uids  # delivered only by the re-send
+        snap = group.health_snapshot()
+        assert snap["active_endpoint"] == f"127.0.0.1:{secondary.port}"
+        assert snap["last_switchover_reason"] == "failover"
+        assert snap["last_switchover_ms"] < 1000
+
+        restarted = _StandIn(primary.port)
+        assert _wait_for(lambda: group.active_index == 0)
+        assert group.last_switchover_reason == "failback"
+        for i in range(300, 400):
+            group.send_cot(_event(i), uid=f"U{i}")
+        received = lambda: restarted.uids | secondary.uids  # noqa: E731
+        assert _wait_for(lambda: {f"U{i}" for i in range(300, 400)} <= received())
+        assert {f"U{i}" for i in range(300, 400)} <= restarted.uids
+        restarted.kill()
+    finally:
+        group.close()
+        secondary.kill()
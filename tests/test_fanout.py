@@ -0,0 +1,115 @@
+"""Tests for teslaontarget.fanout.FanOutClient."""
+import socket
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from teslaontarget.cot import CotMessage
+from teslaontarget.fanout import FanOutClient
+from teslaontarget.tak_client import TAKClient
+
+
+def _dest(wire_format=(0, False), **snapshot):
+    d = MagicMock()
+    d.wire_format = wire_format
+    d.health_snapshot.return_value = snapshot
+    return d
+
+
+class TestSend:
+    def test_every_destination_gets_the_same_event(self):
+        a, b = _dest(), _dest()
+        msg = CotMessage({"UID": "TESLA-1"})
+        assert FanOutClient([a, b]).send_cot(msg, uid="TESLA-1") is True
+        a.send_cot.assert_called_once_with(msg, uid="TESLA-1")
+        b.send_cot.assert_called_once_with(msg, uid="TESLA-1")
+
+    def test_encodes_once_per_wire_format(self, monkeypatch):
+        msg = CotMessage({"UID": "TESLA-1"})
+        calls = []
+        real = msg.encode
+        monkeypatch.setattr(CotMessage, "encode", lambda self, v=0, mesh=False: calls.append((v, mesh)) or real(v, mesh))
+        fan = FanOutClient([_dest(), _dest(), _dest((1, True))])
+        fan.send_cot(msg)
+        assert sorted(calls) == [(0, False), (1, True)]
+
+    def test_bytes_pass_straight_through(self):
+        a = _dest()
+        FanOutClient([a]).send_cot(b"<event/>")
+        a.send_cot.assert_called_once_with(b"<event/>", uid=None)
+
+    def test_true_if_any_destination_accepts(self):
+        a, b = _dest(), _dest()
+        a.send_cot.return_value = False
+        b.send_cot.return_value = True
+        assert FanOutClient([a, b]).send_cot(b"x") is True
+        b.send_cot.return_value = False
+        assert FanOutClient([a, b]).send_cot(b"x") is False
+
+    def test_batch(self):
+        a, b = _dest(), _dest()
+        msgs = [CotMessage({"UID": "A"}), b"<raw/>"]
+        assert FanOutClient([a, b]).send_batch(iter(msgs), ["A", None]) is True
+        a.send_batch.assert_called_once_with(msgs, ["A", None])
+        assert msgs[0]._encoded  # pre-encoded
+
+
+class TestControl:
+    def test_connected_if_any(self):
+        a, b = _dest(), _dest()
+        a.connected, b.connected = False, True
+        assert FanOutClient([a, b]).connected is True
+        b.connected = False
+        assert FanOutClient([a, b]).connected is False
+
+    @pytest.mark.parametrize("method", ["disconnect", "start_background_reconnect", "close"])
+    def test_broadcast_to_all(self, method):
+        a, b = _dest(), _dest()
+        getattr(FanOutClient([a, b]), method)()
+        getattr(a, method).assert_called_once_with()
+        getattr(b, method).assert_called_once_with()
+
+
+class TestHealthSnapshot:
+    def test_aggregates_most_recent_send(self):
+        a = _dest(connected=True, last_send_ok=10.0, last_connect_ok=1.0)
+        b = _dest(connected=False, last_send_ok=None, last_connect_ok=None)
+        snap = FanOutClient([a, b]).health_snapshot()
+        assert snap["connected"] is True
+        assert snap["destinations_connected"] == 1
+        assert snap["last_send_ok"] == 10.0 and snap["last_connect_ok"] == 1.0
+        assert snap["destinations"] == [a.health_snapshot.return_value, b.health_snapshot.return_value]
+
+    def test_nothing_sent_yet(self):
+        snap = FanOutClient([_dest(connected=False)]).health_snapshot()
+        assert snap["last_send_ok"] is None and snap["last_connect_ok"] is None
+
+
+def test_stalled_destination_does_not_delay_the_others():
+    """A server that accepts but never reads must not hold up a healthy one."""
+    stalled = socket.create_server(("127.0.0.1", 0))
+    healthy = socket.create_server(("127.0.0.1", 0))
+    slow = TAKClient(f"tcp://127.0.0.1:{stalled.getsockname()[1]}", max_queue=1000, ping_interval=0)
+    fast = TAKClient(f"tcp://127.0.0.1:{healthy.getsockname()[1]}", max_queue=1000, ping_interval=0)
+    fan = FanOutClient([slow, fast])
+    try:
+        assert slow.connect() and fast.connect()
+        slow.socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        slow.socket.settimeout(0.5)  # so close() can reclaim the stuck writer quickly
+        conn, _ = healthy.accept()
+        payload = b"x" * 65536
+        for i in range(200):  # ~13 MB: far more than the stalled peer's buffers
+            fan.send_cot(payload, uid=f"U{i}")
+        conn.settimeout(5)
+        received, deadline = 0, time.monotonic() + 5
+        while received < 200 * len(payload) and time.monotonic() < deadline:
+            received += len(conn.recv(1 << 20))
+        assert received == 200 * len(payload)
+        assert fast.events_sent == 200
+        assert slow.events_sent < 200
+        conn.close()
+    finally:
+        fan.close()
+        stalled.close()
+        healthy.close()
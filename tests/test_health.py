@@ -1,11 +1,15 @@
 """Tests for teslaontarget.health.HealthMonitor."""
 import json
+import socket
 import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from teslaontarget.cot import PRIORITY_CACHED
 from teslaontarget.health import HealthMonitor
+from teslaontarget.tesla_api import TeslaCoT
+from teslaontarget.udp_tak_client import UDPTAKClient
 
 
 def _client(**snapshot):
@@ -72,6 +76,8 @@ class TestCheckOnce:
         ex.assert_not_called()
         snap = json.loads((tmp_path / "h.json").read_text())
         assert snap["stale_seconds"] == 50
+        assert "remarks_cache_hit_rate" in snap["cot"]
+        assert "tick_lag_max" in snap["dead_reckoning"]
 
     def test_stale_forces_reconnect(self, tmp_path):
         client = _client(connected=False, last_send_ok=1000.0)
@@ -204,3 +210,34 @@ class TestThreadLifecycle:
 
     def test_stop_without_start_is_safe(self, monitor):
         monitor.stop()  # no thread -> no raise
+
+
+class TestIdleFleet:
+    def test_asleep_fleet_over_udp_stays_healthy(self, tmp_path, monkeypatch, make_config):
+        """UDP has no pings, so only heartbeats keep last_send_ok fresh while every car sleeps."""
+        monkeypatch.chdir(tmp_path)
+        receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        receiver.bind(("127.0.0.1", 0))
+        config = make_config(cot_url=f"udp://127.0.0.1:{receiver.getsockname()[1]}")
+        client = UDPTAKClient(config.cot_url)
+        fleet = []
+        for i in range(3):
+            car = TeslaCoT(config, vehicle_id=f"VIN{i}", tak_client=client)
+            car.vehicle_asleep = True
+            fleet.append((car, {"UID": f"TESLA-{i}", "latitude": 30.0 + i, "longitude": -87.0, "speed": 0}))
+        monitor = HealthMonitor(client, health_file=str(tmp_path / "health.json"),
+                                max_no_send_seconds=config.health_no_send_limit)
+        now = [1_000_000.0]
+        with patch("teslaontarget.cot.time.monotonic", side_effect=lambda: now[0]), \
+                patch("teslaontarget.udp_tak_client.time.time", side_effect=lambda: now[0]), \
+                patch.object(client, "start_background_reconnect") as reconnect, \
+                patch("teslaontarget.health.os._exit") as exit_:
+            while now[0] < 1_000_000 + 2 * monitor.hard_restart_seconds:
+                for car, data in fleet:  # one failed poll each: the cached position again
+                    car.send_to_cot(data, priority=PRIORITY_CACHED)
+                monitor._check_once(now[0])
+                now[0] += config.api_loop_delay
+        receiver.close()
+        reconnect.assert_not_called()
+        exit_.assert_not_called()
+        assert all(car.duplicates.suppressed and car.duplicates.heartbeats for car, _ in fleet)
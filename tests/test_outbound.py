@@ -0,0 +1,123 @@
+"""Tests for teslaontarget.outbound.CoalescingQueue."""
+import threading
+
+from teslaontarget.outbound import CoalescingQueue
+
+
+class TestPut:
+    def test_fifo_order(self):
+        q = CoalescingQueue()
+        q.put(b"a", "A")
+        q.put(b"b", "B")
+        assert q.get(timeout=0) == ("A", b"a")
+        assert q.get(timeout=0) == ("B", b"b")
+
+    def test_same_key_replaces_in_place(self):
+        q = CoalescingQueue()
+        assert q.put(b"a1", "A") is None
+        q.put(b"b", "B")
+        assert q.put(b"a2", "A") == b"a1"  # the displaced message is handed back
+        assert len(q) == 2
+        assert q.get(timeout=0) == ("A", b"a2")  # keeps its place in line
+        assert q.coalesced == 1
+        assert q.enqueued == 3
+
+    def test_keyless_messages_never_coalesce(self):
+        q = CoalescingQueue()
+        q.put(b"x")
+        q.put(b"x")
+        assert len(q) == 2
+        assert q.coalesced == 0
+
+    def test_full_queue_evicts_oldest(self):
+        q = CoalescingQueue(maxsize=2)
+        q.put(b"a", "A")
+        q.put(b"b", "B")
+        assert q.put(b"c", "C") == b"a"
+        assert q.dropped == 1
+        assert [q.get(timeout=0)[0] for _ in range(2)] == ["B", "C"]
+
+    def test_coalesce_on_full_queue_does_not_drop(self):
+        q = CoalescingQueue(maxsize=1)
+        q.put(b"a1", "A")
+        q.put(b"a2", "A")
+        assert q.dropped == 0
+
+
+class TestRequeue:
+    def test_returns_to_head_of_line(self):
+        q = CoalescingQueue()
+        q.put(b"b", "B")
+        assert q.requeue("A", b"a") is None
+        assert q.get(timeout=0) == ("A", b"a")
+
+    def test_skipped_when_newer_message_pending(self):
+        q = CoalescingQueue()
+        q.put(b"a-new", "A")
+        assert q.requeue("A", b"a-old") == b"a-old"
+        assert q.get(timeout=0) == ("A", b"a-new")
+        assert len(q) == 0
+
+    def test_dropped_when_full(self):
+        q = CoalescingQueue(maxsize=1)
+        q.put(b"b", "B")
+        assert q.requeue("A", b"a") == b"a"
+        assert q.dropped == 1
+        assert q.get(timeout=0) == ("B", b"b")
+
+
+class TestAbsorb:
+    def test_taken_ahead_in_order_skipping_newer_keys(self):
+        src, dst = CoalescingQueue(), CoalescingQueue()
+        src.put(b"a-old", "A")
+        src.put(b"x")
+        src.put(b"b", "B")
+        dst.put(b"a-new", "A")
+        dst.put(b"y")
+        assert dst.absorb(src.get_many(10)) == [b"a-old"]
+        assert [m for _, m in dst.get_many(10)] == [b"x", b"b", b"a-new", b"y"]
+
+    def test_keyless_messages_get_fresh_keys(self):
+        src, dst = CoalescingQueue(), CoalescingQueue()
+        src.put(b"x")
+        dst.put(b"y")  # same anonymous number as x in its own queue
+        assert dst.absorb(src.get_many(10)) == []
+        assert len(dst) == 2
+
+    def test_full_queue_leaves_the_rest(self):
+        dst = CoalescingQueue(maxsize=1)
+        assert dst.absorb([("A", b"a"), ("B", b"b")]) == [b"a"]
+        assert dst.get(timeout=0) == ("B", b"b")
+
+
+class TestGet:
+    def test_timeout_returns_none(self):
+        assert CoalescingQueue().get(timeout=0.01) is None
+
+    def test_wakes_on_put_from_another_thread(self):
+        q = CoalescingQueue()
+        threading.Timer(0.01, q.put, args=(b"m", "A")).start()
+        assert q.get(timeout=2) == ("A", b"m")
+
+
+class TestGetMany:
+    def test_pops_up_to_limit_in_order(self):
+        q = CoalescingQueue()
+        for key in "ABC":
+            q.put(key.encode(), key)
+        assert q.get_many(2) == [("A", b"A"), ("B", b"B")]
+        assert q.get_many(5) == [("C", b"C")]
+        assert q.get_many(5) == []
+
+
+def test_stats():
+    q = CoalescingQueue(maxsize=1)
+    q.put(b"a", "A")
+    q.put(b"b", "B")
+    assert q.stats() == {
+        "queue_depth": 1,
+        "queue_max": 1,
+        "queue_enqueued": 2,
+        "queue_coalesced": 0,
+        "queue_dropped": 1,
+    }
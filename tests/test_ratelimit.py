@@ -0,0 +1,173 @@
+"""Tests for teslaontarget.ratelimit (token buckets with priority shedding)."""
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget.cot import PRIORITY_CACHED, PRIORITY_DEAD_RECKONED, PRIORITY_FIX, CotMessage
+from teslaontarget.ratelimit import RateLimitedClient, TokenBucket
+
+
+class _Clock:
+    """Stand-in for ``time.monotonic`` that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    c = _Clock()
+    with patch("teslaontarget.ratelimit.time.monotonic", c):
+        yield c
+
+
+def _event(priority, uid="TESLA-1"):
+    return CotMessage({"UID": uid, "latitude": 30.0, "longitude": -87.0}, priority=priority)
+
+
+def _inner(**snapshot):
+    inner = MagicMock()
+    inner.wire_format = (0, False)
+    inner.send_cot.return_value = True
+    inner.send_batch.return_value = True
+    inner.health_snapshot.return_value = dict(snapshot)
+    return inner
+
+
+class TestTokenBucket:
+    def test_refills_at_rate_up_to_capacity(self, clock):
+        bucket = TokenBucket(rate=10, capacity=20)
+        bucket.take(15)
+        clock.now += 1
+        bucket.refill(clock.now)
+        assert bucket.tokens == 15
+        clock.now += 60
+        bucket.refill(clock.now)
+        assert bucket.tokens == 20
+
+    def test_reserve_and_overdraft(self, clock):
+        bucket = TokenBucket(rate=10, capacity=20)
+        assert bucket.allows(0.5)
+        bucket.take(10)
+        assert not bucket.allows(0.5) and bucket.allows(0.25)
+        bucket.take(50)  # one large event may overdraw
+        assert bucket.tokens == -40 and not bucket.allows(0)
+
+
+class TestShedding:
+    def test_lower_classes_are_shed_first(self, clock):
+        limiter = RateLimitedClient(_inner(), events_per_sec=2, burst_seconds=2)  # holds 4 events
+        assert limiter.send_cot(_event(PRIORITY_CACHED)) is True  # 4 -> 3
+        assert limiter.send_cot(_event(PRIORITY_CACHED)) is True  # 3 -> 2
+        assert limiter.send_cot(_event(PRIORITY_CACHED)) is False  # needs over half
+        assert limiter.send_cot(_event(PRIORITY_DEAD_RECKONED)) is True  # 2 -> 1
+        assert limiter.send_cot(_event(PRIORITY_DEAD_RECKONED)) is False  # needs over a quarter
+        assert limiter.send_cot(_event(PRIORITY_FIX)) is True  # 1 -> 0
+        assert limiter.send_cot(_event(PRIORITY_FIX)) is False  # empty
+        stats = limiter.stats()
+        assert (stats["ratelimit_admitted_cached"], stats["ratelimit_shed_cached"]) == (2, 1)
+        assert (stats["ratelimit_admitted_dead_reckoned"], stats["ratelimit_shed_dead_reckoned"]) == (1, 1)
+        assert (stats["ratelimit_admitted_fix"], stats["ratelimit_shed_fix"]) == (1, 1)
+        assert limiter.inner.send_cot.call_count == 4
+
+    def test_sustained_rate_matches_the_cap(self, clock):
+        limiter = RateLimitedClient(_inner(), events_per_sec=5)
+        sent = 0
+        for _ in range(1000):  # 100 s of 10 Hz fixes
+            clock.now += 0.1
+            sent += limiter.send_cot(_event(PRIORITY_FIX))
+        assert 500 <= sent <= 511  # 5/s plus the initial burst
+
+    def test_fixes_survive_a_flood_of_dead_reckoning(self, clock):
+        limiter = RateLimitedClient(_inner(), events_per_sec=1, burst_seconds=4)
+        fixes = 0
+        for tick in range(100):
+            clock.now += 0.1
+            limiter.send_cot(_event(PRIORITY_DEAD_RECKONED))
+            if tick % 10 == 0:
+                fixes += limiter.send_cot(_event(PRIORITY_FIX))
+        assert fixes == 10
+        assert limiter.shed[PRIORITY_DEAD_RECKONED] > 0 and limiter.shed[PRIORITY_FIX] == 0
+
+    def test_byte_cap_charges_the_wire_size(self, clock):
+        msg = _event(PRIORITY_FIX)
+        size = len(msg.encode(0))
+        limiter = RateLimitedClient(_inner(), bytes_per_sec=size, burst_seconds=1.5)
+        assert limiter.send_cot(msg) is True
+        assert limiter.send_cot(msg) is True  # half a bucket left: overdraws
+        assert limiter.send_cot(msg) is False
+        clock.now += 1
+        assert limiter.send_cot(msg) is True
+
+    def test_event_larger_than_the_bucket_still_gets_through(self, clock):
+        limiter = RateLimitedClient(_inner(), bytes_per_sec=10, burst_seconds=1)
+        assert limiter.send_cot(b"x" * 100) is True
+        clock.now += 5
+        assert limiter.send_cot(b"x") is False  # still paying off the debt
+        clock.now += 6
+        assert limiter.send_cot(b"x") is True
+
+    def test_both_caps_must_admit(self, clock):
+        limiter = RateLimitedClient(_inner(), bytes_per_sec=1000, events_per_sec=1, burst_seconds=1)
+        assert limiter.send_cot(b"x") is True
+        assert limiter.send_cot(b"x") is False
+        assert limiter.buckets[0][0].tokens == 999  # a shed event costs nothing
+
+    def test_no_caps_admit_everything(self, clock):
+        limiter = RateLimitedClient(_inner())
+        assert all(limiter.send_cot(_event(PRIORITY_CACHED)) for _ in range(100))
+
+    def test_transport_result_is_passed_through(self, clock):
+        inner = _inner()
+        inner.send_cot.return_value = False
+        assert RateLimitedClient(inner, events_per_sec=1).send_cot(b"x", uid="A") is False
+        inner.send_cot.assert_called_once_with(b"x", uid="A")
+
+
+class TestBatch:
+    def test_only_admitted_events_are_forwarded(self, clock):
+        inner = _inner()
+        limiter = RateLimitedClient(inner, events_per_sec=1, burst_seconds=2)
+        batch = [_event(PRIORITY_CACHED, "A"), _event(PRIORITY_CACHED, "B"), _event(PRIORITY_FIX, "C")]
+        assert limiter.send_batch(batch, ["A", "B", "C"]) is True
+        inner.send_batch.assert_called_once_with([batch[0], batch[2]], ["A", "C"])
+
+    def test_anonymous_batch(self, clock):
+        inner = _inner()
+        RateLimitedClient(inner).send_batch([b"a", b"b"])
+        inner.send_batch.assert_called_once_with([b"a", b"b"], [None, None])
+
+    def test_fully_shed_batch_is_not_forwarded(self, clock):
+        inner = _inner()
+        limiter = RateLimitedClient(inner, events_per_sec=1, burst_seconds=1)
+        limiter.send_cot(b"x")
+        assert limiter.send_batch([b"y"], ["Y"]) is False
+        inner.send_batch.assert_not_called()
+
+
+class TestDelegation:
+    def test_transport_surface(self):
+        inner = _inner(connected=True, last_send_ok=5.0)
+        limiter = RateLimitedClient(inner, events_per_sec=1)
+        assert limiter.connected is inner.connected
+        assert limiter.wire_format == (0, False)
+        limiter.disconnect()
+        limiter.start_background_reconnect()
+        limiter.close()
+        inner.disconnect.assert_called_once()
+        inner.start_background_reconnect.assert_called_once()
+        inner.close.assert_called_once()
+        snap = limiter.health_snapshot()
+        assert snap["last_send_ok"] == 5.0
+        assert snap["ratelimit_shed_fix"] == 0 and snap["ratelimit_admitted_cached"] == 0
+
+    def test_fan_out_is_charged_as_xml(self, clock):
+        inner = MagicMock(spec=["send_cot"])  # no wire_format, like FanOutClient
+        limiter = RateLimitedClient(inner, bytes_per_sec=100000)
+        msg = _event(PRIORITY_FIX)
+        limiter.send_cot(msg)
+        assert limiter.wire_format == (0, False)
+        assert limiter.buckets[0][0].tokens == 200000 - len(msg.encode(0))
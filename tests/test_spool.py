@@ -0,0 +1,156 @@
+"""Tests for teslaontarget.spool.Spool (real files under tmp_path)."""
+import os
+
+import pytest
+
+from teslaontarget.spool import EVENT, RAW, Spool
+
+NOW = 1_700_000_000.0
+
+
+def _fill(spool, n, stale=NOW + 300, start=0):
+    for i in range(start, start + n):
+        spool.append(NOW + i, stale, RAW, b"event-%03d" % i)
+
+
+def _segments(path):
+    return sorted(f for f in os.listdir(path) if f.endswith(".seg"))
+
+
+class TestAppendAndReplay:
+    def test_peek_commit_in_order(self, tmp_path):
+        s = Spool(str(tmp_path))
+        _fill(s, 3)
+        s.append(NOW, NOW + 300, EVENT, b"{}")
+        assert s.peek(2, now=NOW) == [(RAW, b"event-000"), (RAW, b"event-001")]
+        batch = s.peek(2, now=NOW)
+        assert batch == [(RAW, b"event-000"), (RAW, b"event-001")]  # not consumed yet
+        s.commit(batch)
+        batch = s.peek(10, now=NOW)
+        assert batch == [(RAW, b"event-002"), (EVENT, b"{}")]
+        s.commit(batch)
+        assert s.peek(10, now=NOW) == []
+        assert (s.pending, s.replayed, s.appended) == (0, 4, 4)
+        assert _segments(tmp_path) == []  # fully replayed segments are deleted
+
+    def test_rolls_segments_and_replays_across_them(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80)
+        _fill(s, 6)  # 30-byte records -> two per segment
+        assert len(_segments(tmp_path)) == 3
+        got = []
+        while batch := s.peek(10, now=NOW):
+            got += [p for _, p in batch]
+            s.commit(batch)
+        assert got == [b"event-%03d" % i for i in range(6)]
+
+    def test_appends_while_replaying_go_to_a_new_segment(self, tmp_path):
+        s = Spool(str(tmp_path))
+        _fill(s, 2)
+        batch = s.peek(10, now=NOW)
+        assert len(batch) == 2
+        _fill(s, 1, start=2)
+        s.commit(batch)
+        assert s.peek(10, now=NOW) == [(RAW, b"event-002")]
+
+    def test_expired_records_are_skipped(self, tmp_path):
+        s = Spool(str(tmp_path))
+        _fill(s, 2, stale=NOW - 1)
+        _fill(s, 1, start=2)
+        _fill(s, 1, start=3, stale=NOW - 1)
+        batch = s.peek(10, now=NOW)
+        assert batch == [(RAW, b"event-002")]  # stops before the expired one
+        s.commit(batch)
+        assert s.peek(10, now=NOW) == []
+        assert (s.expired, s.replayed, s.pending) == (3, 1, 0)
+
+
+class TestSizeCap:
+    def test_oldest_segment_dropped(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80, max_bytes=130)
+        _fill(s, 6)
+        assert s.size <= 130
+        assert s.dropped == 2
+        assert s.peek(1, now=NOW) == [(RAW, b"event-002")]
+
+    def test_dropping_the_head_being_replayed(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80, max_bytes=130)
+        _fill(s, 2)
+        assert s.peek(1, now=NOW)
+        _fill(s, 4, start=2)
+        assert s.peek(1, now=NOW) == [(RAW, b"event-002")]
+
+    def test_commit_after_the_peeked_head_was_dropped(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80, max_bytes=130)
+        _fill(s, 2)
+        batch = s.peek(2, now=NOW)
+        _fill(s, 4, start=2)  # over the cap: the segment being replayed is dropped
+        s.commit(batch)  # nothing left of it to commit, and nothing else is
+        assert (s.replayed, s.dropped) == (0, 2)
+        assert s.peek(10, now=NOW) == [(RAW, b"event-002"), (RAW, b"event-003")]
+
+    def test_commit_stops_at_a_record_no_longer_at_the_head(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80, max_bytes=130)
+        _fill(s, 2)
+        batch = s.peek(2, now=NOW)
+        s._drop_oldest()
+        _fill(s, 1, start=2)
+        assert s.peek(10, now=NOW) == [(RAW, b"event-002")]  # the new head
+        s.commit(batch)
+        assert s.replayed == 0
+        assert s.peek(10, now=NOW) == [(RAW, b"event-002")]
+
+
+class TestRecovery:
+    def test_reopen_replays_from_disk(self, tmp_path):
+        s = Spool(str(tmp_path), segment_bytes=80)
+        _fill(s, 3)
+        s.close()
+        s.close()  # idempotent
+        again = Spool(str(tmp_path), segment_bytes=80)
+        assert again.pending == 3
+        assert again.lag(now=NOW + 10) == 10
+        _fill(again, 1, start=3)
+        assert [p for _, p in again.peek(10, now=NOW)] == [b"event-000", b"event-001"]
+
+    def test_torn_record_is_truncated_and_junk_ignored(self, tmp_path):
+        s = Spool(str(tmp_path))
+        _fill(s, 2)
+        s.close()
+        path = tmp_path / _segments(tmp_path)[0]
+        with open(path, "ab") as f:
+            f.write(b"\x00" * 7)
+        (tmp_path / "00000002.seg").write_bytes(bytes(path.read_bytes()[:30]) + b"\x00" * 17 + b"\xff" * 4)
+        (tmp_path / "notes.txt").write_text("x")
+        (tmp_path / "00000009.seg").write_bytes(b"")  # empty segment is discarded
+        again = Spool(str(tmp_path))
+        assert again.pending == 3
+        assert os.path.getsize(path) == 60
+        assert os.path.getsize(tmp_path / "00000002.seg") == 30  # header promised more than was written
+        assert not (tmp_path / "00000009.seg").exists()
+
+
+class TestStats:
+    def test_lag_tracks_oldest_unreplayed(self, tmp_path):
+        s = Spool(str(tmp_path))
+        assert s.lag(now=NOW) == 0.0
+        _fill(s, 3)
+        assert s.lag(now=NOW + 60) == 60
+        s.commit(s.peek(1, now=NOW))
+        assert s.lag(now=NOW + 60) == 59
+        s.commit(s.peek(5, now=NOW)[:2])
+        assert s.lag(now=NOW + 60) == 0.0
+
+    def test_stats_keys(self, tmp_path):
+        s = Spool(str(tmp_path))
+        _fill(s, 2)
+        stats = s.stats(now=NOW + 5)
+        assert stats["spool_pending"] == 2 and stats["spool_segments"] == 1
+        assert stats["spool_bytes"] == 60
+        assert stats["spool_lag_seconds"] == 5
+        assert {"spool_appended", "spool_replayed", "spool_expired", "spool_dropped"} <= stats.keys()
+
+    def test_default_clock(self, tmp_path):
+        s = Spool(str(tmp_path))
+        s.append(0, 1, RAW, b"x")  # stale in 1970
+        assert s.peek(1) == []
+        assert s.lag() == pytest.approx(0.0)
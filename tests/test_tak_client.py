@@ -1,9 +1,16 @@
 """Tests for teslaontarget.tak_client.TAKClient (socket boundary, mocked)."""
 import socket
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from teslaontarget import takproto
+from teslaontarget.cot import CotMessage
+from teslaontarget.spool import EVENT, RAW, Spool
 from teslaontarget.tak_client import TAKClient
 
 
@@ -12,6 +19,13 @@ def client():
     return TAKClient("tcp://10.0.0.5:8087")
 
 
+@pytest.fixture(autouse=True)
+def _no_inbound_reader():
+    """Most tests connect over mocked sockets, which a reader thread can't select on."""
+    with patch.object(TAKClient, "_start_reader"):
+        yield
+
+
 class TestInit:
     def test_parses_host_and_port(self, client):
         assert client.host == "10.0.0.5"
@@ -33,7 +47,7 @@ class TestConnect:
             assert client.last_connect_ok is not None
             sock.settimeout.assert_called_once_with(10)
             sock.connect.assert_called_once_with(("10.0.0.5", 8087))
-            sock.setsockopt.assert_called_once()
+            sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
     def test_connect_disconnects_existing_socket_first(self, client):
         client.socket = MagicMock()
@@ -42,11 +56,170 @@ class TestConnect:
                 client.connect()
                 disc.assert_called_once()
 
+    def test_keepalive_is_tuned(self, client):
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            client.connect()
+        sock = sock_cls.return_value
+        sock.setsockopt.assert_any_call(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 5)
+        sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 1)
+        sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)
+        sock.setsockopt.assert_any_call(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT, 8000)
+
+    def test_keepalive_zero_keeps_kernel_defaults(self):
+        c = TAKClient("tcp://10.0.0.5:1", keepalive=0)
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            c.connect()
+        sock_cls.return_value.setsockopt.assert_called_once_with(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def test_missing_keepalive_options_are_skipped(self, client):
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls, \
+                patch.object(socket, "TCP_USER_TIMEOUT", None):
+            client.connect()
+        assert sock_cls.return_value.setsockopt.call_count == 5
+
+    def test_keepalive_failure_does_not_fail_connect(self, client):
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            sock_cls.return_value.setsockopt.side_effect = [None, OSError("not permitted")]
+            assert client.connect() is True
+
+    def test_keepalive_applies_to_a_real_socket(self, client):
+        server = socket.create_server(("127.0.0.1", 0))
+        c = TAKClient(f"tcp://127.0.0.1:{server.getsockname()[1]}", keepalive=7)
+        try:
+            assert c.connect() is True
+            assert c.socket.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE) == 1
+            assert c.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE) == 7
+            assert c.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_USER_TIMEOUT) == 10000
+        finally:
+            c.close()
+            server.close()
+
     def test_connect_failure_returns_false(self, client):
         with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
             sock_cls.return_value.connect.side_effect = socket.error("refused")
             assert client.connect() is False
             assert client.connected is False
+        assert (client.connect_attempts, client.connect_failures) == (1, 1)
+
+    def test_resolution_failure_returns_false(self):
+        c = TAKClient("tcp://tak.invalid:8087")
+        with patch("teslaontarget.dialer.socket.getaddrinfo", side_effect=socket.gaierror("unknown host")):
+            assert c.connect() is False
+        assert c.connect_failures == 1
+        assert c.health_snapshot()["dns_errors"] == 1
+
+    def test_reconnect_reuses_resolved_addresses(self):
+        c = TAKClient("tcp://tak.example:8087")
+        with patch("teslaontarget.dialer.socket.getaddrinfo",
+                   return_value=[(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.9", 8087))]) as gai, \
+                patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            assert c.connect() is True
+            assert c.connect() is True
+        gai.assert_called_once()
+        sock_cls.return_value.connect.assert_called_with(("10.0.0.9", 8087))
+        snap = c.health_snapshot()
+        assert snap["peer_address"] == "10.0.0.9"
+        assert (snap["dns_misses"], snap["dns_hits"]) == (1, 1)
+        assert snap["connect_attempts"] == 2 and snap["connect_failures"] == 0
+        assert snap["connect_ms_last"] >= 0
+
+
+SUPPORT = (b"<event type='t-x-takp-v'><detail><TakControl><TakProtocolSupport version='0'/>"
+           b"<TakProtocolSupport version='1'/></TakControl></detail></event>")
+SUPPORT_V0 = b"<event type='t-x-takp-v'><detail><TakControl><TakProtocolSupport version='0'/></TakControl></detail></event>"
+RESPONSE = b"<event type='t-x-takp-r'><detail><TakControl><TakResponse status='%s'/></TakControl></detail></event>"
+
+
+def _negotiating(recv_chunks):
+    """Connect a protocol-1 client over a mocked socket that serves ``recv_chunks``."""
+    c = TAKClient("tcp://10.0.0.5:8087", protocol=1)
+    with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+        sock = sock_cls.return_value
+        sock.recv.side_effect = recv_chunks
+        assert c.connect() is True
+    return c, sock
+
+
+class TestNegotiation:
+    def test_protocol_zero_skips_handshake(self, client):
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            client.connect()
+            sock_cls.return_value.recv.assert_not_called()
+        assert client.protocol_version == 0
+
+    def test_accepted_switches_to_v1(self):
+        c, sock = _negotiating([SUPPORT, RESPONSE % b"true"])
+        assert c.protocol_version == 1
+        assert c.wire_format == (1, False)
+        request = sock.sendall.call_args[0][0]
+        assert b"t-x-takp-q" in request and b'version="1"' in request
+        sock.settimeout.assert_called_with(10)
+
+    def test_handles_split_reads_and_other_traffic(self):
+        c, _ = _negotiating([b"<?xml version='1.0'?>" + SUPPORT[:20], SUPPORT[20:] + b"<event type='a-f'></event>",
+                             RESPONSE % b"true"])
+        assert c.protocol_version == 1
+
+    def test_response_in_same_read_as_support(self):
+        c, _ = _negotiating([SUPPORT + RESPONSE % b"true"])
+        assert c.protocol_version == 1
+
+    def test_v1_not_offered(self):
+        c, sock = _negotiating([SUPPORT_V0])
+        assert c.protocol_version == 0
+        sock.sendall.assert_not_called()
+
+    def test_declined(self):
+        c, _ = _negotiating([SUPPORT, RESPONSE % b"false"])
+        assert c.protocol_version == 0
+
+    def test_eof_keeps_xml(self):
+        c, _ = _negotiating([b""])
+        assert c.protocol_version == 0
+
+    def test_recv_timeout_keeps_xml(self):
+        c, _ = _negotiating(socket.timeout("slow"))
+        assert c.protocol_version == 0
+
+    def test_deadline_passed_keeps_xml(self):
+        c = TAKClient("tcp://10.0.0.5:8087", protocol=1)
+        c.negotiation_timeout = 0
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            c.connect()
+            sock_cls.return_value.recv.assert_not_called()
+        assert c.protocol_version == 0
+
+    def test_socket_error_keeps_xml(self):
+        c = TAKClient("tcp://10.0.0.5:8087", protocol=1)
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            sock = sock_cls.return_value
+            sock.recv.return_value = SUPPORT
+            sock.sendall.side_effect = socket.error("reset")
+            assert c.connect() is True
+        assert c.protocol_version == 0
+
+    def test_reconnect_after_v1_session_negotiates_afresh(self):
+        c, _ = _negotiating([SUPPORT, RESPONSE % b"true"])
+        during_handshake = []
+
+        def recv(_):
+            during_handshake.append((c.connected, c.protocol_version))
+            return SUPPORT_V0
+
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            sock_cls.return_value.recv.side_effect = recv
+            assert c.connect() is True
+        # the writer holds the queue, and nothing is framed as v1, until the server agrees
+        assert during_handshake == [(False, 0)]
+        assert c.connected is True and c.protocol_version == 0
+
+    def test_writes_protobuf_after_upgrade(self):
+        c, sock = _negotiating([SUPPORT, RESPONSE % b"true"])
+        sock.sendall.reset_mock()
+        msg = CotMessage({"UID": "TESLA-1", "latitude": 1.0, "longitude": 2.0})
+        assert c._write(msg) is True
+        assert sock.sendall.call_args[0][0] == msg.encode(1)
 
 
 class TestDisconnect:
@@ -75,10 +248,29 @@ class TestDisconnect:
 
 
 class TestSendCot:
+    def test_queues_and_returns_without_touching_socket(self, client):
+        client.socket = MagicMock()
+        with patch.object(client, "start_writer") as start:
+            assert client.send_cot(b"<event/>", uid="A") is True
+            start.assert_called_once()
+        client.socket.sendall.assert_not_called()
+        assert client.outbound.get(timeout=0) == ("A", b"<event/>")
+
+    def test_same_uid_coalesces_latest_wins(self, client):
+        with patch.object(client, "start_writer"):
+            client.send_cot(b"old", uid="A")
+            client.send_cot(b"other", uid="B")
+            client.send_cot(b"new", uid="A")
+        assert client.outbound.get(timeout=0) == ("A", b"new")
+        assert client.outbound.get(timeout=0) == ("B", b"other")
+        assert client.outbound.coalesced == 1
+
+
+class TestWrite:
     def test_send_when_connected(self, client):
         client.connected = True
         client.socket = MagicMock()
-        assert client.send_cot(b"<event/>") is True
+        assert client._write(b"<event/>") is True
         client.socket.sendall.assert_called_once_with(b"<event/>")
         assert client.last_send_ok is not None
         assert client.last_send_attempt is not None
@@ -87,30 +279,246 @@ class TestSendCot:
         client.connected = False
         with patch.object(client, "connect", side_effect=lambda: setattr(client, "connected", True) or True) as conn:
             client.socket = MagicMock()
-            assert client.send_cot(b"x") is True
+            assert client._write(b"x") is True
             conn.assert_called_once()
 
-    def test_connect_failure_drops_update_and_reconnects_in_background(self, client):
-        # Fail fast: a dead server must not block the caller. Return False and
+    def test_connect_failure_fails_fast_and_reconnects_in_background(self, client):
+        # Fail fast: a dead server must not wedge the writer. Return False and
         # hand recovery to the background reconnect thread.
         client.connected = False
         with patch.object(client, "connect", return_value=False), \
              patch.object(client, "start_background_reconnect") as bg:
-            assert client.send_cot(b"x") is False
+            assert client._write(b"x") is False
             bg.assert_called_once()
+        assert client.last_error == "TAK server unreachable"
 
-    def test_send_error_drops_update_and_reconnects_in_background(self, client):
+    def test_send_error_fails_fast_and_reconnects_in_background(self, client):
         client.connected = True
         sock = MagicMock()
         sock.sendall.side_effect = socket.error("broken pipe")
         client.socket = sock
         with patch.object(client, "start_background_reconnect") as bg:
-            assert client.send_cot(b"x") is False
+            assert client._write(b"x") is False
             bg.assert_called_once()
         assert client.connected is False
         assert client.last_error == "broken pipe"
         assert client.last_error_time is not None
 
+    def test_socket_closed_under_writer_is_a_send_error(self, client):
+        client.connected = True
+        client.socket = None  # disconnect() raced the writer
+        with patch.object(client, "start_background_reconnect"):
+            assert client._write(b"x") is False
+        assert client.connected is False
+
+
+class _ChunkySocket:
+    """Socket stand-in whose sendmsg accepts at most ``chunk`` bytes per call."""
+
+    def __init__(self, chunk):
+        self.chunk = chunk
+        self.wire = bytearray()
+        self.calls = 0
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        data = b"".join(bytes(b) for b in buffers)[:self.chunk]
+        self.wire += data
+        return len(data)
+
+
+class TestBatchWrite:
+    def test_multiple_messages_use_one_sendmsg(self, client):
+        client.connected = True
+        client.socket = _ChunkySocket(chunk=10_000)
+        assert client._write(b"<a/>", b"<b/>", b"<c/>") is True
+        assert bytes(client.socket.wire) == b"<a/><b/><c/>"
+        assert client.socket.calls == 1
+        assert client.write_calls == 1
+        assert client.events_sent == 3
+        assert client.bytes_sent == 12
+
+    def test_partial_sends_resume_mid_buffer(self, client):
+        client.connected = True
+        client.socket = _ChunkySocket(chunk=3)
+        assert client._write(b"<aa/>", b"<b/>", b"<cccc/>") is True
+        assert bytes(client.socket.wire) == b"<aa/><b/><cccc/>"
+        assert client.write_calls == client.socket.calls == 6
+
+    def test_falls_back_to_sendall_without_sendmsg(self, client):
+        client.connected = True
+        client.socket = MagicMock(spec=["sendall", "close"])
+        assert client._write(b"<a/>", b"<b/>") is True
+        client.socket.sendall.assert_called_once_with(b"<a/><b/>")
+
+    def test_send_batch_queues_with_keys(self, client):
+        with patch.object(client, "start_writer") as start:
+            assert client.send_batch([b"a", b"b"], uids=["A", "B"]) is True
+            start.assert_called_once()
+        assert client.outbound.get_many(5) == [("A", b"a"), ("B", b"b")]
+
+    def test_send_batch_without_keys(self, client):
+        with patch.object(client, "start_writer"):
+            client.send_batch(iter([b"a", b"a"]))
+        assert len(client.outbound) == 2
+
+
+class TestWriter:
+    def test_drain_writes_next_message(self, client):
+        client.outbound.put(b"m", "A")
+        with patch.object(client, "_write", return_value=True) as write:
+            client._drain_once()
+            write.assert_called_once_with(b"m")
+        assert len(client.outbound) == 0
+
+    def test_failed_write_is_requeued(self, client):
+        client.outbound.put(b"m", "A")
+        with patch.object(client, "_write", return_value=False):
+            client._drain_once()
+        assert client.outbound.get(timeout=0) == ("A", b"m")
+
+    def test_drain_batches_everything_pending(self, client):
+        for key in "ABC":
+            client.outbound.put(key.encode(), key)
+        with patch.object(client, "_write", return_value=True) as write:
+            client._drain_once()
+            write.assert_called_once_with(b"A", b"B", b"C")
+
+    def test_batch_respects_max_batch(self, client):
+        client.max_batch = 2
+        for key in "ABC":
+            client.outbound.put(key.encode(), key)
+        with patch.object(client, "_write", return_value=True) as write:
+            client._drain_once()
+            write.assert_called_once_with(b"A", b"B")
+        assert len(client.outbound) == 1
+
+    def test_failed_batch_requeued_in_order(self, client):
+        for key in "AB":
+            client.outbound.put(key.encode(), key)
+        with patch.object(client, "_write", return_value=False):
+            client._drain_once()
+        assert client.outbound.get_many(5) == [("A", b"A"), ("B", b"B")]
+
+    def test_flush_window_lingers_before_writing(self, client):
+        client.flush_window = 0.005
+        client.stop_writer = MagicMock()
+        client.outbound.put(b"m", "A")
+        with patch.object(client, "_write", return_value=True):
+            client._drain_once()
+        client.stop_writer.wait.assert_called_once_with(0.005)
+
+    def test_full_batch_skips_flush_window(self, client):
+        client.flush_window = 0.005
+        client.max_batch = 2
+        client.stop_writer = MagicMock()
+        for key in "AB":
+            client.outbound.put(key.encode(), key)
+        with patch.object(client, "_write", return_value=True):
+            client._drain_once()
+        client.stop_writer.wait.assert_not_called()
+
+    def test_empty_queue_is_a_noop(self, client):
+        client.writer_poll_interval = 0
+        with patch.object(client, "_write") as write:
+            client._drain_once()
+            write.assert_not_called()
+
+    def test_holds_queue_while_reconnecting(self, client):
+        client.connected = False
+        client.reconnect_thread = MagicMock()
+        client.reconnect_thread.is_alive.return_value = True
+        client.stop_writer = MagicMock()
+        client.outbound.put(b"m", "A")
+        with patch.object(client, "_write") as write:
+            client._drain_once()
+            write.assert_not_called()
+        client.stop_writer.wait.assert_called_once_with(client.writer_poll_interval)
+        assert len(client.outbound) == 1
+
+    def test_writer_loop_runs_until_stopped(self, client):
+        client.stop_writer = MagicMock()
+        client.stop_writer.is_set.side_effect = [False, False, True]
+        with patch.object(client, "_drain_once") as drain:
+            client._writer_loop()
+        assert drain.call_count == 2
+
+    def test_start_writer_is_idempotent(self, client):
+        with patch("teslaontarget.tak_client.threading.Thread") as Thread:
+            client.start_writer()
+            Thread.return_value.is_alive.return_value = True
+            client.start_writer()
+            Thread.assert_called_once()
+            Thread.return_value.start.assert_called_once()
+
+    def test_end_to_end_single_writer(self, client):
+        near, far = socket.socketpair()
+        client.socket = near
+        client.connected = True
+        expected = b"".join(f"<m{i}/>".encode() for i in range(5))
+        for i in range(5):
+            client.send_cot(f"<m{i}/>".encode(), uid=f"U{i}")
+        far.settimeout(2)
+        received = b""
+        while len(received) < len(expected):
+            received += far.recv(4096)
+        client.close()
+        far.close()
+        assert received == expected
+        assert client.events_sent == 5
+        assert not client.writer_thread.is_alive()
+
+    def test_close_without_writer(self, client):
+        client.close()  # must not raise
+        assert client.stop_writer.is_set()
+
+
+class TestRecentWrites:
+    def test_kept_for_the_resend_window(self, client):
+        client.resend_window = 1
+        client.outbound.put(b"a", "A")
+        client.outbound.put(b"b", "B")
+        with patch.object(client, "_write", return_value=True), \
+                patch("teslaontarget.tak_client.time.monotonic", side_effect=[10.0, 12.0, 12.5]):
+            client._write_live(client.outbound.get())
+            client.outbound.put(b"c", "C")
+            client._write_live(client.outbound.get())  # "a" and "b" fall out of the window
+            assert client.recent_writes() == [("C", b"c")]
+        assert client.recent_writes() == []
+
+    def test_control_messages_are_not_kept(self, client):
+        client.resend_window = 1
+        with patch.object(client, "_write", return_value=True) as w:
+            client._write_live((None, takproto.ControlMessage(takproto.PING, "p")))  # nothing to keep
+            assert client.recent_writes() == []
+            client.outbound.put(takproto.ControlMessage(takproto.PONG, client.uid))
+            client.outbound.put(b"a", "A")
+            client._write_live(client.outbound.get())
+            assert isinstance(w.call_args[0][0], takproto.ControlMessage)
+        assert client.recent_writes() == [("A", b"a")]
+
+    def test_not_kept_by_default(self, client):
+        with patch.object(client, "_write", return_value=True):
+            client._write_live(("A", b"a"))
+        assert client.recent_writes() == []
+
+    def test_taken_while_being_written(self, client):
+        client.resend_window = 60
+        taken = []
+        taker = threading.Thread(target=lambda: taken.extend(client.recent_writes()))
+
+        class _SlowDeque(deque):
+            def extend(self, items):  # the supervisor takes the writes mid-append
+                taker.start()
+                taker.join(0.1)
+                super().extend(items)
+
+        client._recent = _SlowDeque()
+        with patch.object(client, "_write", return_value=True):
+            client._write_live(("A", b"a"))
+        taker.join()
+        assert taken + client.recent_writes() == [("A", b"a")]  # neither lost nor reported twice
+
 
 class TestEnsureConnected:
     def test_connects_when_not_connected(self, client):
@@ -181,6 +589,409 @@ class TestBackgroundReconnect:
             conn.assert_not_called()
             client.stop_reconnect.wait.assert_called_once_with(client.reconnect_interval)
 
+    def test_reconnect_thread_survives_replacing_a_dead_socket(self, client):
+        # connect() from the reconnect thread closes the old socket via disconnect(),
+        # which must neither join the current thread nor stop the retry loop.
+        client.socket = MagicMock()
+        client.reconnect_interval = 0.01
+        with patch("teslaontarget.tak_client.socket.socket") as sock_cls:
+            sock_cls.return_value.connect.side_effect = [socket.error("refused"), None]
+            client.start_background_reconnect()
+            client.reconnect_thread.join(timeout=2)
+        assert client.connected is True
+        assert sock_cls.return_value.connect.call_count == 2
+
+
+def _fix(uid, seconds_ago=0):
+    now = datetime.now(timezone.utc) - timedelta(seconds=seconds_ago)
+    return CotMessage({"UID": uid, "latitude": 30.0 + seconds_ago / 1000, "longitude": -87.0}, now)
+
+
+class TestSpool:
+    def test_displaced_events_spooled_only_while_disconnected(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        with patch.object(c, "start_writer"):
+            c.send_cot(_fix("A", 20), uid="A")
+            c.send_cot(_fix("A", 10), uid="A")  # displaces the first -> spooled
+            c.send_batch([b"<raw/>", b"<raw2/>"], ["R", "R"])  # raw displaced -> spooled
+            c._handle_inbound(takproto.PING)
+            c._handle_inbound(takproto.PING)  # a displaced pong is never spooled
+            c.connected = True
+            c.send_cot(_fix("A"), uid="A")  # coalesced while connected -> not spooled
+        records = c.spool.peek(10)
+        assert [kind for kind, _ in records] == [EVENT, RAW]
+        assert CotMessage.loads(records[0][1]).event["lat"] == 30.02
+        assert records[1][1] == b"<raw/>"
+
+    def test_without_spool_nothing_is_kept(self):
+        c = TAKClient("tcp://h:1")
+        with patch.object(c, "start_writer"):
+            c.send_cot(b"a", uid="A")
+            c.send_cot(b"b", uid="A")
+        assert c.spool is None
+
+    def test_failed_write_spools_superseded_events(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        c.outbound.put(b"old", "A")
+
+        def fail(*msgs):
+            c.outbound.put(b"new", "A")  # a newer fix arrives mid-write
+            return False
+        with patch.object(c, "_write", side_effect=fail), patch.object(c, "_reconnecting", return_value=False):
+            c._drain_once()
+        assert c.spool.peek(10) == [(RAW, b"old")]
+
+    def test_replay_respects_rate_cap_and_commits(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)), replay_rate=4)
+        for age in (50, 40, 30, 20, 10):
+            c.spool.append(time.time() - age, time.time() + 300, RAW, b"e%d" % age)
+        c.connected = True
+        c._replay_refilled -= 10  # long idle: the bucket holds at most one second's worth
+        with patch.object(c, "_write", return_value=True) as w:
+            c._replay_spool()
+            assert w.call_args[0] == (b"e50", b"e40", b"e30", b"e20")
+            c._replay_spool()  # bucket empty
+            assert w.call_count == 1
+        assert c.spool.pending == 1
+
+    def test_replay_failure_keeps_records(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        c.spool.append(time.time(), time.time() + 300, EVENT, _fix("A").dumps())
+        c.connected = True
+        c._replay_refilled -= 1
+        with patch.object(c, "_write", return_value=False) as w:
+            c._replay_spool()
+        assert isinstance(w.call_args[0][0], CotMessage)
+        assert c.spool.pending == 1
+
+    def test_replay_skips_events_superseded_by_a_live_write(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        for fix in (_fix("A", 30), _fix("B", 30), _fix("A", 20)):
+            c.spool.append(time.time(), time.time() + 300, EVENT, fix.dumps())
+        c.spool.append(time.time(), time.time() + 300, RAW, b"<raw/>")
+        c.connected = True
+        with patch.object(c, "_write", return_value=True) as w:
+            c._write_live(("A", _fix("A", 25)))  # A reports again: its fix from 30 s ago is moot
+            c._write_live(("R", b"<live/>"))
+            c._replay_refilled -= 1
+            c._replay_spool()
+        b_fix, a_fix, raw = w.call_args[0]
+        assert (b_fix.uid, a_fix.uid, raw) == ("B", "A", b"<raw/>")
+        assert a_fix.event["lat"] == 30.02  # newer than the live fix, so still sent
+        assert c.spool.pending == 0
+        assert c.health_snapshot()["spool_superseded"] == 1
+        assert c.spool.replayed == 4
+
+    def test_replay_of_only_superseded_events_writes_nothing(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        c.spool.append(time.time(), time.time() + 300, EVENT, _fix("A", 30).dumps())
+        c.connected = True
+        with patch.object(c, "_write", return_value=True) as w:
+            c._write_live(("A", _fix("A")))
+            c._replay_refilled -= 1
+            c._replay_spool()
+        assert w.call_count == 1  # the live write only
+        assert c.spool.pending == 0 and c.spool_superseded == 1
+
+    def test_no_replay_while_disconnected_or_empty(self, tmp_path):
+        c = TAKClient("tcp://h:1", spool=Spool(str(tmp_path)))
+        c._replay_refilled -= 1
+        with patch.object(c, "_write") as w:
+            c.spool.append(time.time(), time.time() + 300, RAW, b"x")
+            c._replay_spool()  # disconnected
+            c.connected = True
+            c.spool.commit(c.spool.peek(1))
+            c._replay_refilled -= 1
+            c._replay_spool()  # nothing left
+        w.assert_not_called()
+
+    def test_outage_is_backfilled_after_reconnect(self, tmp_path):
+        probe = socket.create_server(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+        probe.close()  # nothing listening: connects are refused
+        # One queue slot: A's first fix is coalesced away and its second evicted by B's
+        c = TAKClient(f"tcp://127.0.0.1:{port}", max_queue=1, spool=Spool(str(tmp_path)), replay_rate=100)
+        c.reconnect_interval = 0.05
+        fixes = [_fix("A", 30), _fix("A", 20), _fix("B", 10)]
+        try:
+            for fix in fixes:
+                c.send_cot(fix, uid=fix.uid)
+            deadline = time.monotonic() + 2
+            while c.spool.pending < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            server = socket.create_server(("127.0.0.1", port))
+            conn, _ = server.accept()
+            conn.settimeout(2)
+            expected = b"".join(f.encode() for f in fixes)
+            received = b""
+            while len(received) < len(expected):
+                received += conn.recv(65536)
+            # The newest fix goes first (live), then the outage is backfilled.
+            decl = fixes[0].encode()[:20]
+            assert received.startswith(fixes[2].encode())
+            assert sorted(received.split(decl)[2:]) == sorted(f.encode()[20:] for f in fixes[:2])
+            while c.spool.replayed < 2 and time.monotonic() < deadline + 2:
+                time.sleep(0.01)  # commit follows the write the server just read
+            assert c.health_snapshot()["spool_replayed"] == 2
+            conn.close()
+            server.close()
+        finally:
+            c.close()
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def _recv_event(sock, version=0):
+    """Read from ``sock`` until one whole event arrives; return its ``(type, uid)``."""
+    parser = takproto.StreamParser(version)
+    sock.settimeout(2)
+    while True:
+        events = parser.feed(sock.recv(4096))
+        if events:
+            return events[0]
+
+
+class TestInboundReader:
+    @pytest.fixture(autouse=True)
+    def _no_inbound_reader(self):
+        yield  # these tests run the real reader
+
+    @pytest.fixture
+    def link(self):
+        """A connected client reading one end of a socketpair; yields ``(client, server_end)``."""
+        c = TAKClient("tcp://h:1", ping_interval=0)
+        near, far = socket.socketpair()
+        c.socket, c.connected = near, True
+        yield c, far
+        c.close()
+        far.close()
+
+    def _start(self, c, version=0):
+        c.protocol_version = version
+        c._start_reader()
+
+    def test_server_close_is_detected_without_a_send(self, link):
+        c, far = link
+        with patch.object(c, "start_background_reconnect") as reconnect:
+            self._start(c)
+            started = time.monotonic()
+            far.close()
+            assert _wait_for(lambda: not c.connected)
+            assert time.monotonic() - started < 0.5
+            reconnect.assert_called_once()
+        assert c.last_error == "TAK server closed the connection"
+        assert _wait_for(lambda: not c.reader_thread.is_alive())
+
+    def test_answers_server_ping(self, link):
+        c, far = link
+        self._start(c)
+        far.sendall(takproto.control_event(takproto.PING, "takserver"))
+        assert _recv_event(far) == (takproto.PONG, c.uid)
+        assert c.pings_answered == 1 and c.inbound_events == 1
+
+    def test_answers_ping_in_protobuf_after_upgrade(self, link):
+        c, far = link
+        self._start(c, version=1)
+        far.sendall(takproto.control_event(takproto.PING, "takserver", version=1))
+        assert _recv_event(far, version=1) == (takproto.PONG, c.uid)
+
+    def test_ping_round_trip_is_timed(self, link):
+        c, far = link
+        self._start(c)
+        assert c.send_ping() is True
+        assert _recv_event(far) == (takproto.PING, c.uid)
+        far.sendall(takproto.control_event(takproto.PONG, "takPong"))
+        assert _wait_for(lambda: c.pongs_received == 1)
+        snap = c.health_snapshot()
+        assert snap["pings_sent"] == 1
+        assert snap["rtt_last_ms"] > 0
+        assert snap["rtt_smoothed_ms"] == snap["rtt_last_ms"]
+
+    def test_other_traffic_and_garbage_are_counted(self, link):
+        c, far = link
+        self._start(c)
+        sa = b"<event version='2.0' uid='ANDROID-1' type='a-f-G-U-C'><point/></event>"
+        far.sendall(sa[:30])
+        far.sendall(sa[30:] + b"<event></event>")
+        assert _wait_for(lambda: c.inbound_errors == 1)
+        assert c.inbound_events == 1
+        assert c.inbound_bytes == len(sa) + len(b"<event></event>")
+        assert c.last_inbound is not None
+        assert c.pings_answered == 0
+
+    def test_reader_exits_after_disconnect(self, link):
+        c, far = link
+        self._start(c)
+        c.disconnect()
+        assert _wait_for(lambda: not c.reader_thread.is_alive())
+        assert c.last_error is None  # our own close is not a lost connection
+
+    def test_reset_marks_disconnected(self, link):
+        c, far = link
+        near = c.socket
+
+        class _Resetting:
+            fileno = near.fileno
+            recv = MagicMock(side_effect=[BlockingIOError(), ConnectionResetError("reset by peer")])
+        sock = _Resetting()
+        c.socket = sock
+        far.sendall(b"x")
+        with patch.object(c, "start_background_reconnect"):
+            c._reader_loop(sock, 0)
+        assert c.connected is False
+        assert c.last_error == "receive failed: reset by peer"
+        c.socket = near
+
+    def test_closed_socket_is_not_read(self, client):
+        sock = socket.socket()
+        sock.close()
+        client._reader_loop(sock, 0)  # returns at once
+        assert client.inbound_bytes == 0
+
+    def test_loss_of_a_replaced_socket_is_ignored(self, client):
+        client.connected = True
+        client._connection_lost(MagicMock(), "old connection")
+        assert client.connected is True
+
+    def test_connect_starts_reader_and_forgets_old_ping(self, link):
+        c, far = link
+        c._ping_sent_at = 1.0
+        self._start(c)
+        assert c._ping_sent_at is None
+        assert c.reader_thread.name == "TAKReader"
+
+
+class TestKeepalivePing:
+    @pytest.fixture(autouse=True)
+    def _no_inbound_reader(self):
+        yield  # these tests run the real reader
+
+    @pytest.fixture
+    def link(self):
+        c = TAKClient("tcp://h:1", ping_interval=0.05)
+        c.ping_timeout = 0.2
+        near, far = socket.socketpair()
+        c.socket, c.connected = near, True
+        yield c, far
+        c.close()
+        far.close()
+
+    def test_pings_periodically(self, link):
+        c, far = link
+        c._start_reader()
+        assert _recv_event(far) == (takproto.PING, c.uid)
+        far.sendall(takproto.control_event(takproto.PONG, "takPong"))
+        assert _recv_event(far) == (takproto.PING, c.uid)  # the next one, on schedule
+        assert c.rtt_last is not None
+
+    def test_silence_after_answering_is_a_dead_peer(self, link):
+        c, far = link
+        with patch.object(c, "start_background_reconnect") as reconnect:
+            c._start_reader()
+            assert _recv_event(far) == (takproto.PING, c.uid)
+            far.sendall(takproto.control_event(takproto.PONG, "takPong"))
+            assert _recv_event(far) == (takproto.PING, c.uid)  # never answered
+            assert _wait_for(lambda: not c.connected)
+            reconnect.assert_called_once()
+        assert c.last_error == "no ping reply in 0.2s"
+        assert c.pings_lost == 1
+
+    def test_server_that_never_answers_is_not_dropped(self, client):
+        client.ping_interval, client.ping_timeout = 1, 0
+        client.connected = True
+        with patch.object(client, "start_writer"):
+            assert client._keepalive_tick(client.socket) is True
+            client._next_ping = 0
+            assert client._keepalive_tick(client.socket) is True
+        assert client.connected is True
+        assert client.pings_sent == 2 and client.pings_lost == 1
+
+    def test_ping_interval_zero_never_pings(self, client):
+        client.ping_interval = 0
+        assert client._keepalive_tick(client.socket) is True
+        assert client.pings_sent == 0
+
+
+class TestPing:
+    def test_one_ping_in_flight(self, client):
+        with patch.object(client, "start_writer"):
+            assert client.send_ping() is True
+            assert client.send_ping() is False
+        assert len(client.outbound) == 1
+        assert client.pings_sent == 1
+
+    def test_unanswered_ping_is_lost_after_timeout(self, client):
+        client.ping_timeout = 0
+        with patch.object(client, "start_writer"):
+            client.send_ping()
+            assert client.send_ping() is True
+        assert client.pings_lost == 1 and client.pings_sent == 2
+
+    def test_rtt_is_smoothed(self, client):
+        with patch("teslaontarget.tak_client.time.monotonic", side_effect=[0.0, 0.1, 1.0, 1.9]), \
+                patch.object(client, "start_writer"):
+            client.send_ping()
+            client._handle_inbound(takproto.PONG)
+            client.send_ping()
+            client._handle_inbound(takproto.PONG)
+        assert client.rtt_last == pytest.approx(0.9)
+        assert client.rtt_smoothed == pytest.approx(0.875 * 0.1 + 0.125 * 0.9)
+
+    def test_unsolicited_pong_is_ignored(self, client):
+        client._handle_inbound(takproto.PONG)
+        assert client.pongs_received == 0 and client.rtt_last is None
+        assert client.health_snapshot()["rtt_last_ms"] is None
+
+
+class TestUnixSocket:
+    @pytest.fixture(autouse=True)
+    def _no_inbound_reader(self):
+        yield  # these tests run the real reader
+
+    @pytest.fixture
+    def server(self, tmp_path):
+        path = str(tmp_path / "tak.sock")
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(path)
+        srv.listen()
+        srv.settimeout(2)
+        yield srv, path
+        srv.close()
+
+    def test_parses_path(self):
+        c = TAKClient("unix:///run/tak/cot.sock")
+        assert c.path == "/run/tak/cot.sock"
+        assert c.endpoint == "unix:/run/tak/cot.sock"
+        assert TAKClient("tcp://10.0.0.5:8087").path is None
+
+    def test_delivers_and_detects_server_close(self, server):
+        srv, path = server
+        c = TAKClient(f"unix://{path}", ping_interval=0)
+        try:
+            assert c.connect() is True
+            conn, _ = srv.accept()
+            c.send_cot(b"<event uid='U1' type='a-f-G'><point/></event>", uid="U1")
+            assert _recv_event(conn) == ("a-f-G", "U1")
+            snap = c.health_snapshot()
+            assert snap["path"] == path and snap["peer_address"] == path
+            assert snap["host"] is None and snap["dns_misses"] == 0
+            with patch.object(c, "start_background_reconnect") as reconnect:
+                conn.close()
+                assert _wait_for(lambda: not c.connected)
+            reconnect.assert_called_once()
+        finally:
+            c.close()
+
+    def test_missing_socket_fails_cleanly(self, tmp_path):
+        c = TAKClient(f"unix://{tmp_path}/absent.sock")
+        assert c.connect() is False
+        assert c.connected is False and c.connect_failures == 1
+
 
 class TestHealthSnapshot:
     def test_snapshot_fields(self, client):
@@ -191,3 +1002,12 @@ class TestHealthSnapshot:
         assert snap["port"] == 8087
         assert snap["connected"] is True
         assert snap["last_send_ok"] == 123.0
+
+    def test_snapshot_includes_queue_counters(self, client):
+        client.outbound.put(b"a", "A")
+        client.outbound.put(b"b", "A")
+        snap = client.health_snapshot()
+        assert snap["queue_depth"] == 1
+        assert snap["queue_coalesced"] == 1
+        assert snap["queue_dropped"] == 0
+        assert snap["write_calls"] == 0 and snap["events_sent"] == 0
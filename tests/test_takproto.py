@@ -0,0 +1,229 @@
+"""Tests for teslaontarget.takproto (TAK Protocol v1 encoding + negotiation)."""
+import struct
+from datetime import datetime, timezone
+
+import pytest
+
+from teslaontarget import takproto
+from teslaontarget.cot import build_cot_event, format_cot_for_tak, generate_cot_packet
+
+NOW = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+
+
+def _varint(buf, i):
+    shift = value = 0
+    while True:
+        b = buf[i]
+        i += 1
+        value |= (b & 0x7F) << shift
+        shift += 7
+        if not b & 0x80:
+            return value, i
+
+
+def decode(buf):
+    """Minimal protobuf decoder: {field: [values]} (bytes for length-delimited)."""
+    fields, i = {}, 0
+    while i < len(buf):
+        key, i = _varint(buf, i)
+        field, wire = key >> 3, key & 7
+        if wire == 0:
+            value, i = _varint(buf, i)
+        elif wire == 1:
+            value, i = struct.unpack("<d", buf[i:i + 8])[0], i + 8
+        else:
+            n, i = _varint(buf, i)
+            value, i = bytes(buf[i:i + n]), i + n
+        fields.setdefault(field, []).append(value)
+    return fields
+
+
+def _event(**data):
+    base = {"UID": "TESLA-1", "display_name": "Tron", "vehicle_model": "Model Y",
+            "latitude": 30.5, "longitude": -87.25, "speed": 50, "heading": 90,
+            "battery_level": 80, "shift_state": "D"}
+    base.update(data)
+    return build_cot_event(base, NOW)
+
+
+class TestVarint:
+    @pytest.mark.parametrize("n,expected", [(0, b"\x00"), (1, b"\x01"), (127, b"\x7f"),
+                                            (128, b"\x80\x01"), (300, b"\xac\x02")])
+    def test_known_encodings(self, n, expected):
+        assert takproto.encode_varint(n) == expected
+
+
+class TestEncodeEvent:
+    def test_cot_event_fields(self):
+        event = _event()
+        cot = decode(decode(takproto.encode_event(event))[2][0])
+        assert cot[1] == [b"a-f-G-E-V-C"]
+        assert cot[2] == [b"Undefined"]
+        assert cot[5] == [b"TESLA-1"]
+        ms = int(NOW.timestamp() * 1000)
+        assert cot[6] == cot[7] == [ms]
+        assert cot[8] == [ms + 300_000]
+        assert cot[9] == [b"m-g"]
+        assert cot[10] == [30.5] and cot[11] == [-87.25]
+        assert cot[13] == [5.0] and cot[14] == [9999999.0]
+
+    def test_detail_sub_messages(self):
+        detail = decode(decode(decode(takproto.encode_event(_event()))[2][0])[15][0])
+        assert decode(detail[2][0]) == {1: [b"*:-1:stcp"], 2: [b"Tron"]}
+        assert decode(detail[3][0]) == {1: [b"Cyan"], 2: [b"Team Member"]}
+        assert decode(detail[4][0]) == {1: [b"GPS"], 2: [b"GPS"]}
+        assert decode(detail[5][0]) == {1: [80]}
+        assert decode(detail[6][0])[1] == [b"TESLA Model Y"]
+        track = decode(detail[7][0])
+        assert track[1][0] == pytest.approx(50 * 0.44704)
+        assert track[2] == [90.0]
+        xml = detail[1][0].decode()
+        assert xml.startswith('<uid Droid="Tron"/><remarks>Tesla Model Y | Gear: D')
+
+    def test_xml_detail_is_escaped(self):
+        detail = decode(decode(decode(takproto.encode_event(
+            _event(display_name='A&B "x"')))[2][0])[15][0])
+        assert b'Droid=\'A&amp;B "x"\'' in detail[1][0]
+
+    def test_zero_battery_and_missing_coordinates(self):
+        cot = decode(decode(takproto.encode_event(_event(battery_level=0, latitude=None)))[2][0])
+        assert cot[10] == [0.0]
+        assert 5 not in decode(cot[15][0])  # empty status message is omitted
+
+    def test_empty_strings_are_omitted(self):
+        event = _event()
+        event["platform"] = ""
+        detail = decode(decode(decode(takproto.encode_event(event))[2][0])[15][0])
+        assert 2 not in decode(detail[6][0])
+
+    def test_fields_trimmed_by_a_profile_are_omitted(self):
+        event = _event()
+        for key in ("os", "version", "device", "platform", "endpoint", "callsign", "altsrc", "geopointsrc",
+                    "group_role", "group_name", "battery", "remarks"):
+            del event[key]
+        detail = decode(decode(decode(takproto.encode_event(event))[2][0])[15][0])
+        assert list(detail) == [7]  # track only
+
+    def test_much_smaller_than_xml(self):
+        data = {"UID": "TESLA-1", "display_name": "Tron", "vehicle_model": "2024 Model Y Performance",
+                "latitude": 30.123456, "longitude": -87.654321, "speed": 50, "heading": 90,
+                "battery_level": 80, "shift_state": "D", "battery_range": 200}
+        v0 = format_cot_for_tak(generate_cot_packet(data))
+        v1 = takproto.frame_stream(takproto.encode_event(build_cot_event(data, NOW)))
+        assert len(v1) * 2 < len(v0)
+
+
+class TestFraming:
+    def test_stream_frame_has_magic_and_length(self):
+        framed = takproto.frame_stream(b"x" * 200)
+        assert framed[0] == 0xBF
+        assert _varint(framed, 1) == (200, 3)
+        assert framed[3:] == b"x" * 200
+
+    def test_mesh_frame_header(self):
+        assert takproto.frame_mesh(b"p") == b"\xbf\x01\xbfp"
+
+
+class TestControl:
+    def test_request_parses_and_names_version(self):
+        body = takproto.protocol_request("me", 1, NOW).split(b"?>", 1)[1]
+        assert takproto.parse_control(body) == (takproto.TAKP_REQUEST, None)
+        assert b'<TakRequest version="1"/>' in body
+        assert b'time="2026-01-02T03:04:05.678Z"' in body
+
+    def test_request_defaults_to_current_time(self):
+        assert b"t-x-takp-q" in takproto.protocol_request("me", 1)
+
+    def test_support_lists_versions(self):
+        xml = (b"<event type='t-x-takp-v'><detail><TakControl>"
+               b"<TakProtocolSupport version='0'/><TakProtocolSupport version='1'/>"
+               b"</TakControl></detail></event>")
+        assert takproto.parse_control(xml) == ("t-x-takp-v", {0, 1})
+
+    @pytest.mark.parametrize("status,accepted", [("true", True), ("false", False)])
+    def test_response_status(self, status, accepted):
+        xml = (f"<event type='t-x-takp-r'><detail><TakControl><TakResponse status='{status}'/>"
+               f"</TakControl></detail></event>").encode()
+        assert takproto.parse_control(xml) == ("t-x-takp-r", accepted)
+
+    def test_response_without_body_is_refusal(self):
+        assert takproto.parse_control(b"<event type='t-x-takp-r'/>") == ("t-x-takp-r", False)
+
+    def test_request_body_unchanged(self):
+        assert takproto.protocol_request("me", 1, NOW) == (
+            b"<?xml version='1.0' encoding='UTF-8' standalone='yes'?>"
+            b'<event version="2.0" uid="me" type="t-x-takp-q" how="m-g" time="2026-01-02T03:04:05.678Z" '
+            b'start="2026-01-02T03:04:05.678Z" stale="2026-01-02T03:05:05.678Z">'
+            b'<point lat="0.0" lon="0.0" hae="0.0" ce="999999" le="999999"/>'
+            b'<detail><TakControl><TakRequest version="1"/></TakControl></detail></event>')
+
+    def test_garbage_does_not_parse(self):
+        assert takproto.parse_control(b"<event") == (None, None)
+
+
+class TestPingPong:
+    def test_xml_ping(self):
+        xml = takproto.control_event(takproto.PING, "me", now=NOW)
+        assert b'type="t-x-c-t"' in xml
+        assert b'stale="2026-01-02T03:04:25.678Z"' in xml
+
+    def test_protobuf_ping(self):
+        framed = takproto.control_event(takproto.PONG, "me", version=1, now=NOW)
+        length, start = _varint(framed, 1)
+        assert framed[0] == 0xBF and len(framed) == start + length
+        cot = decode(decode(framed[start:])[2][0])
+        assert cot[1] == [b"t-x-c-t-r"] and cot[5] == [b"me"]
+        assert cot[8][0] - cot[6][0] == 20_000
+
+    def test_protobuf_defaults_to_current_time(self):
+        assert takproto.event_header(takproto.control_event(takproto.PING, "me", version=1)[2:]) == (
+            "t-x-c-t", "me")
+
+    def test_control_message_encodes_per_version(self):
+        msg = takproto.ControlMessage(takproto.PING, "me")
+        assert msg.encode(0).startswith(b"<?xml")
+        assert msg.encode(1)[0] == 0xBF
+
+
+class TestStreamParser:
+    def test_xml_events_split_across_reads(self):
+        parser = takproto.StreamParser()
+        ping = takproto.control_event(takproto.PING, "srv", now=NOW)
+        sa = b"<event uid='A-1' type='a-f-G'><detail/></event>"
+        assert parser.feed(ping[:50]) == []
+        assert parser.feed(ping[50:] + sa[:10]) == [("t-x-c-t", "srv")]
+        assert parser.feed(sa[10:]) == [("a-f-G", "A-1")]
+
+    def test_xml_without_type_is_an_error(self):
+        parser = takproto.StreamParser()
+        assert parser.feed(b"<event version='2.0'></event><event type='x'></event>") == [("x", None)]
+        assert parser.errors == 1
+
+    def test_protobuf_frames_split_across_reads(self):
+        parser = takproto.StreamParser(version=1)
+        frames = (takproto.control_event(takproto.PING, "a", version=1)
+                  + takproto.frame_stream(takproto.encode_event(_event())))
+        assert parser.feed(frames[:1]) == []
+        assert parser.feed(frames[1:5]) == []
+        assert parser.feed(frames[5:]) == [("t-x-c-t", "a"), ("a-f-G-E-V-C", "TESLA-1")]
+
+    def test_protobuf_resynchronizes_after_garbage(self):
+        parser = takproto.StreamParser(version=1)
+        ping = takproto.control_event(takproto.PING, "a", version=1)
+        assert parser.feed(b"junk" + ping) == [("t-x-c-t", "a")]
+        assert parser.feed(b"zz") == []
+        assert parser.errors == 2
+
+    def test_undecodable_protobuf_payload_is_an_error(self):
+        parser = takproto.StreamParser(version=1)
+        assert parser.feed(takproto.frame_stream(b"\x0b") + takproto.frame_stream(b"\x12\x05ab")) == []
+        assert parser.errors == 2
+
+    def test_payload_without_event(self):
+        assert takproto.event_header(b"\x08\x01") == (None, None)
+
+    def test_runaway_buffer_is_discarded(self):
+        parser = takproto.StreamParser()
+        parser.feed(b"<event " + b"x" * takproto.MAX_INBOUND_EVENT)
+        assert parser.errors == 1
+        assert parser.feed(b"<event type='t'></event>") == [("t", None)]
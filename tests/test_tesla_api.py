@@ -5,13 +5,28 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
-from teslaontarget.tesla_api import TeslaCoT
+from teslaontarget import dead_reckoning
+from teslaontarget.constants import MPH_TO_MS
+from teslaontarget.cot import PRIORITY_CACHED, PRIORITY_FIX
+from teslaontarget.tesla_api import (
+    ASLEEP_STALE_SECONDS,
+    PARKED_STALE_SECONDS,
+    STALE_MAX_SECONDS,
+    STALE_MIN_SECONDS,
+    STALE_MISSED_UPDATES,
+    TeslaCoT,
+)
+from teslaontarget.utils import calculate_distance
 
 
 @pytest.fixture
 def cot(tmp_path, monkeypatch, make_config):
     monkeypatch.chdir(tmp_path)  # isolate all file writes to a temp cwd
-    return TeslaCoT(make_config(), vehicle_id="VIN123", tak_client=MagicMock())
+    tesla_cot = TeslaCoT(make_config(), vehicle_id="VIN123", tak_client=MagicMock())
+    # Ticks are run by hand below, never on the shared scheduler thread
+    tesla_cot.dead_reckoning_scheduler = MagicMock()
+    tesla_cot.dead_reckoning_scheduler.scheduled.return_value = False
+    return tesla_cot
 
 
 class TestInit:
@@ -29,6 +44,12 @@ class TestInit:
             TeslaCoT(make_config(cot_url="tcp://1.2.3.4:9"))
             TC.assert_called_once_with("tcp://1.2.3.4:9")
 
+    def test_fallback_client_uses_the_failover_primary(self, tmp_path, monkeypatch, make_config):
+        monkeypatch.chdir(tmp_path)
+        with patch("teslaontarget.tesla_api.TAKClient") as TC:
+            TeslaCoT(make_config(cot_url=(("tcp://p:9", "tcp://s:9"),)))
+            TC.assert_called_once_with("tcp://p:9")
+
     def test_debug_mode_makes_capture_dir(self, tmp_path, monkeypatch, make_config):
         monkeypatch.chdir(tmp_path)
         TeslaCoT(make_config(debug_mode=True), vehicle_id="v", tak_client=MagicMock())
@@ -91,74 +112,270 @@ class TestDebugCapture:
 class TestSendToCot:
     def test_success_path(self, cot):
         cot.tak_client.send_cot.return_value = True
-        cot.send_to_cot({"display_name": "Tron", "latitude": 1, "longitude": 2})
+        assert cot.send_to_cot({"display_name": "Tron", "latitude": 1, "longitude": 2, "UID": "TESLA-x"}) is True
         cot.tak_client.send_cot.assert_called_once()
+        assert cot.tak_client.send_cot.call_args.kwargs["uid"] == "TESLA-x"  # coalescing key
+        assert cot.tak_client.send_cot.call_args.args[0].priority == PRIORITY_FIX
+
+    def test_priority_is_passed_to_the_event(self, cot):
+        cot.send_to_cot({"latitude": 1, "longitude": 2}, priority=PRIORITY_CACHED)
+        assert cot.tak_client.send_cot.call_args.args[0].priority == PRIORITY_CACHED
+
+    def test_profile_trims_repeat_events(self, tmp_path, monkeypatch, make_config):
+        monkeypatch.chdir(tmp_path)
+        lean = TeslaCoT(make_config(cot_profile="lean"), vehicle_id="VIN123", tak_client=MagicMock())
+        for lat in (1, 1.5):
+            lean.send_to_cot({"display_name": "Tron", "latitude": lat, "longitude": 2, "UID": "TESLA-x"})
+        first, second = (call.args[0].event for call in lean.tak_client.send_cot.call_args_list)
+        assert first["callsign"] == "Tron" and "callsign" not in second
 
     def test_failed_send_warns_no_raise(self, cot):
         cot.tak_client.send_cot.return_value = False
-        cot.send_to_cot({"latitude": 1, "longitude": 2})
+        assert cot.send_to_cot({"latitude": 1, "longitude": 2}) is False
 
     def test_generation_error_is_caught(self, cot):
-        with patch("teslaontarget.tesla_api.generate_cot_packet", side_effect=ValueError("boom")):
-            cot.send_to_cot({"latitude": 1})  # must not raise
+        with patch("teslaontarget.tesla_api.CotMessage", side_effect=ValueError("boom")):
+            assert cot.send_to_cot({"latitude": 1}) is False  # must not raise
 
 
-class TestDeadReckoning:
-    def _drive(self, cot, initial_data, times, max_iters=2):
-        """Run dead_reckoning_update with a controlled clock + bounded loop."""
+class TestStaleTime:
+    def _stale(self, cot):
+        return cot.tak_client.send_cot.call_args.args[0].event["stale"] - \
+            cot.tak_client.send_cot.call_args.args[0].event["time"]
+
+    def test_dead_reckoned_vehicle_gets_a_short_stale_time(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True)
+        cot.send_to_cot({"latitude": 1, "longitude": 2, "speed": 40, "shift_state": "D"})
+        assert self._stale(cot).total_seconds() == STALE_MIN_SECONDS
+        assert cot.stale_seconds == STALE_MIN_SECONDS
+
+    def test_moving_without_dead_reckoning_spans_missed_polls(self, cot):
+        cot.config = dataclasses.replace(cot.config, api_loop_delay=20, dead_reckoning_enabled=False)
+        cot.send_to_cot({"latitude": 1, "longitude": 2, "speed": 40, "shift_state": "D"})
+        assert self._stale(cot).total_seconds() == 20 * STALE_MISSED_UPDATES
+
+    def test_adaptive_dead_reckoning_spans_the_longest_interval(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True, dead_reckoning_adaptive=True,
+                                         dead_reckoning_max_delay=20, api_loop_delay=30)
+        assert cot._stale_seconds_for({"speed": 40, "shift_state": "D"}) == 20 * STALE_MISSED_UPDATES
+        # stopped in drive: only the polls update it
+        assert cot._stale_seconds_for({"speed": 0, "shift_state": "D"}) == 30 * STALE_MISSED_UPDATES
+
+    def test_backoff_stretches_the_stale_time(self, cot):
+        cot.rate_limit_backoff = 16
+        data = {"latitude": 1, "longitude": 2, "speed": 40, "shift_state": "D"}
+        assert cot._stale_seconds_for(data, PRIORITY_CACHED) == cot.config.api_loop_delay * 16 * STALE_MISSED_UPDATES
+        cot.rate_limit_backoff = 1000
+        assert cot._stale_seconds_for(data, PRIORITY_CACHED) == STALE_MAX_SECONDS
+
+    def test_parked_and_asleep_get_long_stale_times(self, cot):
+        parked = {"latitude": 1, "longitude": 2, "speed": 0, "shift_state": None}
+        assert cot._stale_seconds_for(parked) == PARKED_STALE_SECONDS
+        assert cot._stale_seconds_for(dict(parked, shift_state="N")) == STALE_MIN_SECONDS
+        cot.vehicle_asleep = True
+        assert cot._stale_seconds_for(parked, PRIORITY_CACHED) == ASLEEP_STALE_SECONDS
+
+    def test_asleep_flag_follows_the_api(self, cot):
         cot.send_to_cot = MagicMock()
-        cot.stop_dead_reckoning = MagicMock()
-        cot.stop_dead_reckoning.is_set.side_effect = [False] * (max_iters - 1) + [True]
+        cot._handle_api_error(Exception("vehicle unavailable"))
+        assert cot.vehicle_asleep is True
+        vehicle = MagicMock()
+        vehicle.get_vehicle_data.return_value = {}
+        with patch("teslaontarget.tesla_api.map_vehicle_data", return_value={}), \
+                patch("teslaontarget.tesla_api.time.sleep"):
+            cot._poll_once(vehicle)
+        assert cot.vehicle_asleep is False
+
+
+class TestDuplicateSuppression:
+    PARKED = {"UID": "TESLA-x", "latitude": 1, "longitude": 2, "speed": 0, "battery_level": 80}
+
+    def test_unchanged_event_waits_for_the_heartbeat(self, cot):
+        with patch("teslaontarget.cot.time.monotonic", return_value=1000.0):
+            assert cot.send_to_cot(self.PARKED)
+            assert cot.send_to_cot(dict(self.PARKED, dead_reckoned=True, timestamp=5)) is False  # same content
+        assert cot.tak_client.send_cot.call_count == 1
+        heartbeat = 1000.0 + PARKED_STALE_SECONDS * cot.config.cot_heartbeat_fraction
+        with patch("teslaontarget.cot.time.monotonic", return_value=heartbeat):
+            cot.send_to_cot(self.PARKED, priority=PRIORITY_CACHED)
+        assert cot.tak_client.send_cot.call_count == 2
+        assert (cot.duplicates.suppressed, cot.duplicates.heartbeats) == (1, 1)
+
+    def test_changed_status_or_remarks_is_sent(self, cot):
+        cot.send_to_cot(self.PARKED)
+        cot.send_to_cot(dict(self.PARKED, battery_level=79))
+        cot.send_to_cot(dict(self.PARKED, battery_level=79, locked=False))
+        assert cot.tak_client.send_cot.call_count == 3
+
+    def test_cached_resends_of_an_asleep_car_are_held_back(self, cot):
+        cot.last_known_valid_data = dict(self.PARKED)
+        for _ in range(5):
+            cot._handle_api_error(Exception("vehicle unavailable"))
+        assert cot.tak_client.send_cot.call_count == 1
+        assert cot.stale_seconds == ASLEEP_STALE_SECONDS
+
+    def test_failed_send_does_not_suppress_the_retry(self, cot):
+        cot.tak_client.send_cot.return_value = False
+        cot.send_to_cot(self.PARKED)
+        cot.send_to_cot(self.PARKED)
+        assert cot.tak_client.send_cot.call_count == 2
+        assert cot.stale_seconds is None
+
+    def test_zero_fraction_sends_every_event(self, tmp_path, monkeypatch, make_config):
+        monkeypatch.chdir(tmp_path)
+        c = TeslaCoT(make_config(cot_heartbeat_fraction=0), vehicle_id="VIN123", tak_client=MagicMock())
+        c.send_to_cot(self.PARKED)
+        c.send_to_cot(self.PARKED)
+        assert c.tak_client.send_cot.call_count == 2
+
+
+class TestDeadReckoning:
+    def _drive(self, cot, initial_data, nows, queued=None, sent=True):
+        """Start dead reckoning at monotonic 1000, then run its tick at each of ``nows``.
+
+        ``queued`` is the ``send_to_cot`` results, in order (default: all queued);
+        ``sent`` whether the fix itself was.
+        """
+        cot.send_to_cot = MagicMock(side_effect=queued)
         with patch("teslaontarget.tesla_api.time") as t:
-            t.time.side_effect = times
-            t.sleep = MagicMock()
-            cot.dead_reckoning_update(initial_data)
-        return cot
+            t.monotonic.return_value = 1000
+            t.time.return_value = 1_700_000_000
+            cot._schedule_dead_reckoning(initial_data, sent)
+            call = cot.dead_reckoning_scheduler.schedule.call_args
+            key, tick, self.first_delay = call.args
+            assert key is cot
+            track = call.kwargs["track"]
+            results = []
+            for now in nows:  # as the scheduler runs a tick: advance its track, then call it
+                track.advance_to(now)
+                results.append(tick(now))
+            return results
 
     def test_stationary_resends_same_position(self, cot):
         data = {"latitude": 30.0, "longitude": -87.0, "speed": 0}
-        # start=1000, timestamp=1001, break-check=1100 (>=9 -> break)
-        self._drive(cot, data, times=[1000, 1001, 1100])
+        # 1100 - 1000 >= 9 (api_loop_delay - 1) -> done
+        assert self._drive(cot, data, nows=[1100]) == [None]
         cot.send_to_cot.assert_called_once()
         sent = cot.send_to_cot.call_args[0][0]
         assert sent["latitude"] == 30.0 and sent["dead_reckoned"] is True
+        assert sent["timestamp"] == 1_700_000_000  # wall clock, for the event
 
     def test_speed_none_treated_as_stationary(self, cot):
         data = {"latitude": 30.0, "longitude": -87.0, "speed": None}
-        self._drive(cot, data, times=[1000, 1001, 1100])
-        cot.send_to_cot.assert_called_once()
+        self._drive(cot, data, nows=[1001])
+        assert cot.send_to_cot.call_args[0][0]["longitude"] == -87.0
 
     def test_moving_advances_position(self, cot):
         data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
-        self._drive(cot, data, times=[1000, 1001, 1100])
+        self._drive(cot, data, nows=[1001])
         sent = cot.send_to_cot.call_args[0][0]
         # heading 90 (east) -> longitude moves, latitude ~unchanged
         assert sent["dead_reckoned"] is True
         assert sent["longitude"] != -87.0
 
-    def test_continues_until_stop_when_under_max_duration(self, cot):
+    def test_position_follows_actual_elapsed_time(self, cot):
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
+        self._drive(cot, data, nows=[1001, 1003.5])  # the second tick ran 1.5 s late
+        lat, lon = cot.send_to_cot.call_args[0][0]["latitude"], cot.send_to_cot.call_args[0][0]["longitude"]
+        assert calculate_distance(30.0, -87.0, lat, lon) == pytest.approx(60 * MPH_TO_MS * 3.5, rel=1e-3)
+
+    def test_continues_while_under_max_duration(self, cot):
         data = {"latitude": 30.0, "longitude": -87.0, "speed": 0}
-        # break-check 1002-1000=2 < 9 -> no break -> next is_set True -> exit
-        self._drive(cot, data, times=[1000, 1001, 1002], max_iters=2)
+        # 1002 - 1000 = 2 < 9 -> tick asks to run again after the delay
+        assert self._drive(cot, data, nows=[1002]) == [cot.config.dead_reckoning_delay]
         cot.send_to_cot.assert_called_once()
 
-    def test_moving_with_none_heading_and_no_break(self, cot):
-        # heading None -> 0; time under max_duration so it loops to the stop event
+    def test_moving_with_none_heading(self, cot):
+        # heading None -> 0 (north): latitude moves
         data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": None}
-        self._drive(cot, data, times=[1000, 1001, 1002], max_iters=2)
-        cot.send_to_cot.assert_called_once()
+        self._drive(cot, data, nows=[1001])
+        assert cot.send_to_cot.call_args[0][0]["latitude"] > 30.0
 
     def test_zero_coordinate_is_valid(self, cot):
         # Regression: latitude 0.0 (equator) is a valid coordinate, not "missing".
         data = {"latitude": 0.0, "longitude": 0.0, "speed": 0}
-        self._drive(cot, data, times=[1000, 1001, 1100], max_iters=2)
+        self._drive(cot, data, nows=[1100])
         cot.send_to_cot.assert_called_once()
 
-    def test_none_coordinate_breaks(self, cot):
-        # Only genuinely-missing coordinates (None) stop dead reckoning.
-        data = {"latitude": None, "longitude": None, "speed": 0}
-        self._drive(cot, data, times=[1000, 1001], max_iters=2)
+    def test_deadband_skips_updates_clients_extrapolate(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_deadband_meters=5,
+                                         dead_reckoning_max_interval=3)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
+        self._drive(cot, data, nows=range(1001, 1007))
+        # on-track updates only go out at the max interval: 1003 and 1006
+        assert cot.send_to_cot.call_count == 2
+        assert cot.dead_reckoning_suppressed == 4
+
+    def test_unsent_fix_is_not_what_clients_extrapolate(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_deadband_meters=5,
+                                         dead_reckoning_max_interval=3)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
+        # the fix was held back or shed, so the first tick goes out
+        self._drive(cot, data, nows=range(1001, 1004), sent=False)
+        assert cot.send_to_cot.call_count == 1
+        assert cot.dead_reckoning_suppressed == 2
+
+    def test_shed_update_is_retried_on_the_next_tick(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_deadband_meters=5,
+                                         dead_reckoning_max_interval=3)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
+        # the 1003 update is shed by the rate limiter, so it is due again at 1004
+        self._drive(cot, data, nows=range(1001, 1006), queued=[False, True])
+        assert cot.send_to_cot.call_count == 2
+        assert cot.dead_reckoning_suppressed == 3
+
+    def test_turning_track_sends_its_current_course_and_speed(self, cot):
+        for i, heading in enumerate((80, 100)):  # 2 deg/s to the right
+            cot.motion.update(heading, 60 * MPH_TO_MS, 100 + 10 * i)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 100}
+        self._drive(cot, data, nows=[1001])
+        sent = cot.send_to_cot.call_args[0][0]
+        assert 100 < sent["heading"] < 103 and sent["speed"] == pytest.approx(60)
+
+    def test_deadband_suppresses_stationary_repeats(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_deadband_meters=5)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 0}
+        self._drive(cot, data, nows=[1001, 1002])
         cot.send_to_cot.assert_not_called()
+        assert cot.dead_reckoning_suppressed == 2
+
+    def test_fixed_rate_by_default(self, cot):
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 60, "heading": 90}
+        assert self._drive(cot, data, nows=[1001]) == [cot.config.dead_reckoning_delay]
+        assert self.first_delay == cot.config.dead_reckoning_delay
+
+    def test_adaptive_interval_is_sub_second_in_a_highway_curve(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_adaptive=True)
+        for i, heading in enumerate((60, 90)):  # 3 deg/s
+            cot.motion.update(heading, 65 * MPH_TO_MS, 100 + 10 * i)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 65, "heading": 90}
+        [delay] = self._drive(cot, data, nows=[1001])
+        assert cot.config.dead_reckoning_min_delay <= self.first_delay < 1
+        assert self.first_delay < delay  # the turn fades, so updates space out
+
+    def test_adaptive_interval_is_the_maximum_in_slow_traffic(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_adaptive=True)
+        data = {"latitude": 30.0, "longitude": -87.0, "speed": 8, "heading": 90}
+        assert self._drive(cot, data, nows=[1005]) == [cot.config.dead_reckoning_max_delay]
+        assert self.first_delay == cot.config.dead_reckoning_max_delay
+
+    def test_adaptive_sends_nothing_while_stopped(self, cot):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_adaptive=True)
+        cot._schedule_dead_reckoning({"latitude": 30.0, "longitude": -87.0, "speed": 0, "shift_state": "D"})
+        cot.dead_reckoning_scheduler.schedule.assert_not_called()
+        cot.dead_reckoning_scheduler.cancel.assert_called_once_with(cot)
+
+    def test_none_coordinate_cancels(self, cot):
+        # Only genuinely-missing coordinates (None) stop dead reckoning.
+        cot._schedule_dead_reckoning({"latitude": None, "longitude": None, "speed": 0})
+        cot.dead_reckoning_scheduler.schedule.assert_not_called()
+        cot.dead_reckoning_scheduler.cancel.assert_called_once_with(cot)
+
+    def test_uses_the_shared_scheduler(self, tmp_path, monkeypatch, make_config):
+        monkeypatch.chdir(tmp_path)
+        a = TeslaCoT(make_config(), vehicle_id="A", tak_client=MagicMock())
+        b = TeslaCoT(make_config(), vehicle_id="B", tak_client=MagicMock())
+        assert a.dead_reckoning_scheduler is b.dead_reckoning_scheduler is dead_reckoning.scheduler
 
 
 def _fake_vehicle(state="online", **extra):
@@ -191,14 +408,14 @@ class TestHandleApiError:
         delay = cot._handle_api_error(Exception("429 rate limit"))
         assert cot.rate_limit_backoff == 2
         assert delay == cot.config.api_loop_delay * 2
-        cot.send_to_cot.assert_called_once()
+        cot.send_to_cot.assert_called_once_with({"latitude": 1}, priority=PRIORITY_CACHED)
 
     def test_unavailable_uses_cache(self, cot):
         cot.send_to_cot = MagicMock()
         cot.last_known_valid_data = {"latitude": 1}
         delay = cot._handle_api_error(Exception("vehicle unavailable"))
         assert delay == cot.config.api_loop_delay
-        cot.send_to_cot.assert_called_once()
+        cot.send_to_cot.assert_called_once_with({"latitude": 1}, priority=PRIORITY_CACHED)
 
     def test_unavailable_without_cache_warns(self, cot):
         cot.send_to_cot = MagicMock()
@@ -261,7 +478,7 @@ class TestSeedAndWake:
         cot.send_to_cot = MagicMock()
         with patch.object(cot, "_fetch_initial_data", return_value=None):
             assert cot._seed_initial_position(v) is True
-        cot.send_to_cot.assert_called_once()
+        cot.send_to_cot.assert_called_once_with({"latitude": 1}, priority=PRIORITY_CACHED)
 
     def test_seed_with_gps_saves_position(self, cot):
         v = _fake_vehicle()
@@ -273,25 +490,20 @@ class TestSeedAndWake:
 
 class TestDeadReckoningManagement:
     def test_start_when_moving(self, cot):
-        cot.dead_reckoning_thread = None
-        with patch("teslaontarget.tesla_api.threading.Thread") as T:
-            cot._start_dead_reckoning({"speed": 30, "shift_state": "D"})
-            T.assert_called_once()
-            T.return_value.start.assert_called_once()
-
-    def test_skip_when_parked(self, cot):
-        cot.dead_reckoning_thread = None
-        with patch("teslaontarget.tesla_api.threading.Thread") as T:
-            cot._start_dead_reckoning({"speed": 0, "shift_state": "P"})
-            T.assert_not_called()
-
-    def test_restarts_existing_thread(self, cot):
-        old = MagicMock()
-        old.is_alive.return_value = True
-        cot.dead_reckoning_thread = old
-        with patch("teslaontarget.tesla_api.threading.Thread"):
-            cot._start_dead_reckoning({"speed": 10, "shift_state": "D"})
-        old.join.assert_called_once()
+        cot._start_dead_reckoning({"latitude": 1, "longitude": 2, "speed": 30, "shift_state": "D"})
+        cot.dead_reckoning_scheduler.schedule.assert_called_once()
+
+    def test_skip_and_cancel_when_parked(self, cot):
+        cot._start_dead_reckoning({"latitude": 1, "longitude": 2, "speed": 0, "shift_state": "P"})
+        cot.dead_reckoning_scheduler.schedule.assert_not_called()
+        cot.dead_reckoning_scheduler.cancel.assert_called_once_with(cot)
+
+    def test_new_fix_replaces_the_track(self, cot):
+        cot._start_dead_reckoning({"latitude": 1, "longitude": 2, "speed": 10, "shift_state": "D"})
+        cot._start_dead_reckoning({"latitude": 3, "longitude": 4, "speed": 10, "shift_state": "D"})
+        first, second = (c.args for c in cot.dead_reckoning_scheduler.schedule.call_args_list)
+        assert first[0] is second[0] is cot  # same key: the scheduler swaps the tick in place
+        assert second[1].args[0].lat == 3
 
 
 class TestPollOnce:
@@ -350,30 +562,44 @@ class TestPollOnce:
 class TestHandleGps:
     def test_valid_gps_saves_sends_and_dr(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True)
-        cot.send_to_cot = MagicMock()
+        cot.send_to_cot = MagicMock(return_value=False)
         cot._start_dead_reckoning = MagicMock()
         cot._handle_valid_gps({"latitude": 1, "longitude": 2, "speed": 9})
         assert cot.consecutive_no_gps_count == 0
         cot.send_to_cot.assert_called_once()
-        cot._start_dead_reckoning.assert_called_once()
+        # whether the fix was queued decides what dead reckoning assumes clients have
+        cot._start_dead_reckoning.assert_called_once_with({"latitude": 1, "longitude": 2, "speed": 9}, False)
+
+    @pytest.mark.parametrize("model, fed", [("ctrv", True), ("constant", False)])
+    def test_valid_gps_feeds_the_motion_estimator(self, cot, model, fed):
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True, dead_reckoning_model=model)
+        cot.send_to_cot = MagicMock()
+        cot._start_dead_reckoning = MagicMock()
+        cot.motion = MagicMock()
+        cot._handle_valid_gps({"latitude": 1, "longitude": 2, "speed": 10, "heading": 90, "timestamp": 500})
+        cot._handle_valid_gps({"latitude": 1, "longitude": 2, "speed": None, "heading": None})
+        if fed:
+            assert cot.motion.update.call_args_list[0].args == (90, 10 * MPH_TO_MS, 500)
+            assert cot.motion.update.call_args_list[1].args[:2] == (0, 0)
+        else:
+            cot.motion.update.assert_not_called()
 
     def test_missing_gps_resends_cache(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=False)
-        cot.dead_reckoning_thread = None
         cot.send_to_cot = MagicMock()
         cot.last_known_valid_data = {"latitude": 1}
         cot._handle_missing_gps()
         assert cot.consecutive_no_gps_count == 1
-        cot.send_to_cot.assert_called_once()
+        cot.send_to_cot.assert_called_once_with({"latitude": 1}, priority=PRIORITY_CACHED)
 
     def test_missing_gps_starts_dr_from_cache(self, cot, monkeypatch):
-        cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True)
-        cot.dead_reckoning_thread = None
+        cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True, dead_reckoning_deadband_meters=5)
         cot.send_to_cot = MagicMock()
-        cot.last_known_valid_data = {"latitude": 1, "speed": 20}
-        with patch("teslaontarget.tesla_api.threading.Thread") as T:
-            cot._handle_missing_gps()
-            T.return_value.start.assert_called_once()
+        cot.last_known_valid_data = {"latitude": 1, "longitude": 2, "speed": 20}
+        cot._handle_missing_gps()
+        cot.dead_reckoning_scheduler.schedule.assert_called_once()
+        track = cot.dead_reckoning_scheduler.schedule.call_args.kwargs["track"]
+        assert track.deadband.due(track.lat, track.lon, track.at)  # clients only have an older event
 
     def test_valid_gps_with_dr_disabled(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=False)
@@ -384,28 +610,22 @@ class TestHandleGps:
 
     def test_missing_gps_thread_alive_skips_start(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True)
-        alive = MagicMock()
-        alive.is_alive.return_value = True
-        cot.dead_reckoning_thread = alive
+        cot.dead_reckoning_scheduler.scheduled.return_value = True
         cot.send_to_cot = MagicMock()
-        cot.last_known_valid_data = {"latitude": 1}
-        with patch("teslaontarget.tesla_api.threading.Thread") as T:
-            cot._handle_missing_gps()
-            T.assert_not_called()  # existing thread alive -> no new one
+        cot.last_known_valid_data = {"latitude": 1, "longitude": 2, "speed": 20}
+        cot._handle_missing_gps()
+        cot.dead_reckoning_scheduler.schedule.assert_not_called()  # still ticking -> left alone
         cot.send_to_cot.assert_called_once()
 
     def test_missing_gps_dr_enabled_but_no_speed(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=True)
-        cot.dead_reckoning_thread = None
         cot.send_to_cot = MagicMock()
         cot.last_known_valid_data = {"latitude": 1, "speed": 0}  # not moving
-        with patch("teslaontarget.tesla_api.threading.Thread") as T:
-            cot._handle_missing_gps()
-            T.assert_not_called()
+        cot._handle_missing_gps()
+        cot.dead_reckoning_scheduler.schedule.assert_not_called()
 
     def test_missing_gps_no_cache_no_send(self, cot, monkeypatch):
         cot.config = dataclasses.replace(cot.config, dead_reckoning_enabled=False)
-        cot.dead_reckoning_thread = None
         cot.send_to_cot = MagicMock()
         cot.last_known_valid_data = None
         cot._handle_missing_gps()
@@ -0,0 +1,123 @@
+"""Tests for teslaontarget.udp_tak_client.UDPTAKClient (real loopback datagrams)."""
+import socket
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from teslaontarget.cot import CotMessage
+from teslaontarget.udp_tak_client import MAX_DATAGRAM, UDPTAKClient
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(2)
+    yield sock
+    sock.close()
+
+
+def _client(receiver, **kwargs):
+    return UDPTAKClient(f"udp://127.0.0.1:{receiver.getsockname()[1]}", **kwargs)
+
+
+class TestInit:
+    def test_parses_url(self):
+        c = UDPTAKClient("mcast://239.2.3.1:6969?iface=192.168.1.5")
+        assert (c.scheme, c.host, c.port, c.interface) == ("mcast", "239.2.3.1", 6969, "192.168.1.5")
+        assert c.connected is False
+        assert c.max_datagram == MAX_DATAGRAM
+
+    @pytest.mark.parametrize("protocol,version", [(0, 0), (1, 1), (2, 1)])
+    def test_protocol_version(self, protocol, version):
+        assert UDPTAKClient("udp://h:1", protocol=protocol).protocol_version == version
+
+
+class TestSend:
+    def test_one_event_per_datagram(self, receiver):
+        c = _client(receiver)
+        assert c.send_batch([b"<a/>", b"<bb/>"]) is True
+        assert receiver.recv(2048) == b"<a/>"
+        assert receiver.recv(2048) == b"<bb/>"
+        assert c.connected is True
+        assert (c.datagrams_sent, c.bytes_sent, c.datagram_bytes_last, c.datagram_bytes_max) == (2, 9, 5, 5)
+        assert c.last_send_ok is not None
+
+    def test_cot_message_uses_mesh_framing(self, receiver):
+        msg = CotMessage({"UID": "TESLA-1", "latitude": 1.0, "longitude": 2.0})
+        _client(receiver, protocol=1).send_cot(msg, uid=msg.uid)
+        assert receiver.recv(2048) == msg.encode(1, mesh=True)
+
+    def test_cot_message_xml_by_default(self, receiver):
+        msg = CotMessage({"UID": "TESLA-1"})
+        _client(receiver).send_cot(msg)
+        assert receiver.recv(2048) == msg.encode(0)
+
+    def test_oversize_is_dropped(self, receiver):
+        c = _client(receiver, max_datagram=8)
+        assert c.send_batch([b"x" * 9, b"ok"]) is False
+        assert receiver.recv(2048) == b"ok"
+        assert (c.datagrams_oversize, c.datagrams_dropped, c.datagrams_sent) == (1, 1, 1)
+        assert "exceeds" in c.last_error
+
+    def test_send_error_is_dropped_not_raised(self, receiver):
+        c = _client(receiver)
+        c.connect()
+        c.socket = MagicMock()
+        c.socket.sendto.side_effect = BlockingIOError("buffer full")
+        assert c.send_cot(b"x") is False
+        assert c.datagrams_dropped == 1
+        assert c.last_error == "buffer full"
+
+    def test_socket_setup_failure_is_dropped(self):
+        c = UDPTAKClient("udp://nowhere.invalid:1")
+        with patch("teslaontarget.udp_tak_client.socket.gethostbyname", side_effect=socket.gaierror("no such host")):
+            assert c.send_cot(b"x") is False
+        assert c.connected is False
+        assert c.datagrams_dropped == 1
+        assert "socket setup failed" in c.last_error
+
+
+class TestSocketOptions:
+    def test_unicast_allows_broadcast_and_never_blocks(self):
+        with patch("teslaontarget.udp_tak_client.socket.socket") as sock_cls:
+            assert UDPTAKClient("udp://127.0.0.1:6969").connect() is True
+            sock = sock_cls.return_value
+            sock.setsockopt.assert_called_once_with(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+            sock.setblocking.assert_called_once_with(False)
+
+    def test_multicast_ttl_loop_and_interface(self):
+        with patch("teslaontarget.udp_tak_client.socket.socket") as sock_cls:
+            c = UDPTAKClient("mcast://239.2.3.1:6969?iface=127.0.0.1", multicast_ttl=4)
+            assert c.connect() is True
+            sock = sock_cls.return_value
+            sock.setsockopt.assert_any_call(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 4)
+            sock.setsockopt.assert_any_call(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            sock.setsockopt.assert_any_call(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton("127.0.0.1"))
+            assert c.address == ("239.2.3.1", 6969)
+
+    def test_multicast_default_interface(self):
+        with patch("teslaontarget.udp_tak_client.socket.socket") as sock_cls:
+            UDPTAKClient("mcast://239.2.3.1:6969").connect()
+            assert sock_cls.return_value.setsockopt.call_count == 2
+
+
+class TestLifecycle:
+    def test_disconnect_and_reopen(self, receiver):
+        c = _client(receiver)
+        c.start_background_reconnect()
+        assert c.connected is True
+        c.close()
+        assert c.connected is False and c.socket is None
+        c.start_background_reconnect()
+        assert c.ensure_connected() is True
+
+
+def test_health_snapshot(receiver):
+    c = _client(receiver)
+    assert c.health_snapshot()["datagram_bytes_avg"] == 0
+    c.send_batch([b"ab", b"abcd"])
+    snap = c.health_snapshot()
+    assert snap["transport"] == "udp"
+    assert snap["datagrams_sent"] == 2 and snap["datagrams_dropped"] == 0
+    assert snap["datagram_bytes_avg"] == 3 and snap["datagram_bytes_max"] == 4
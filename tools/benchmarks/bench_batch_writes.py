@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-event writes against scatter-gather batch writes in TAKClient.
+
+Two scenarios against a local TCP sink:
+
+* fleet  -- V vehicle threads each emit a real CoT event at --hz with random
+            phase (like independent dead-reckoning timers); reports write
+            syscalls per event for each flush window.
+* burst  -- N events queued at once; reports events/sec and syscalls.
+
+Usage:  python tools/benchmarks/bench_batch_writes.py [--vehicles V] [--hz H] [--seconds S] [--burst N]
+"""
+
+import argparse
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.cot import format_cot_for_tak, generate_cot_packet  # noqa: E402
+from teslaontarget.tak_client import TAKClient  # noqa: E402
+
+# (label, TAKClient kwargs)
+MODES = [
+    ("per-event", {"max_batch": 1}),
+    ("batch", {}),
+    ("batch+5ms", {"flush_window": 0.005}),
+]
+
+
+class Sink:
+    """TCP sink that counts received bytes."""
+
+    def __init__(self):
+        self.bytes = 0
+        self._srv = socket.create_server(("127.0.0.1", 0))
+        self.port = self._srv.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self._srv.accept()
+            threading.Thread(target=self._drain, args=(conn,), daemon=True).start()
+
+    def _drain(self, conn):
+        while data := conn.recv(1 << 16):
+            self.bytes += len(data)
+
+
+def _event(uid):
+    return format_cot_for_tak(generate_cot_packet({
+        "UID": uid, "display_name": uid, "latitude": 30.0, "longitude": -87.0,
+        "speed": 60, "heading": 90, "battery_level": 80, "shift_state": "D",
+    }))
+
+
+def _wait_sent(client, total, timeout=10):
+    deadline = time.time() + timeout
+    while client.events_sent < total and time.time() < deadline:
+        time.sleep(0.001)
+
+
+def fleet(url, vehicles, hz, seconds):
+    payloads = [_event(f"TESLA-{i:04d}") for i in range(vehicles)]
+    ticks = int(hz * seconds)
+    for label, kwargs in MODES:
+        client = TAKClient(url, max_queue=vehicles * 2, **kwargs)
+        client.connect()
+        start = time.perf_counter() + 0.05
+
+        def vehicle(i):
+            phase = random.random() / hz
+            for tick in range(ticks):
+                due = start + phase + tick / hz
+                time.sleep(max(0.0, due - time.perf_counter()))
+                client.send_cot(payloads[i], uid=f"TESLA-{i:04d}")
+
+        threads = [threading.Thread(target=vehicle, args=(i,)) for i in range(vehicles)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        _wait_sent(client, vehicles * ticks - client.outbound.coalesced)
+        print(f"fleet {label:>10}: {client.events_sent:>6} events  {client.write_calls:>6} writes  "
+              f"{client.events_sent / max(1, client.write_calls):6.1f} events/write")
+        client.close()
+
+
+def burst(url, events):
+    payload = _event("TESLA-burst")
+    for label, kwargs in MODES:
+        client = TAKClient(url, max_queue=events, **kwargs)
+        client.connect()
+        start = time.perf_counter()
+        client.send_batch([payload] * events)
+        _wait_sent(client, events)
+        elapsed = time.perf_counter() - start
+        print(f"burst {label:>10}: {events / elapsed:>10.0f} events/s  {client.write_calls:>6} writes  "
+              f"{client.bytes_sent / elapsed / 1e6:7.1f} MB/s")
+        client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=50)
+    parser.add_argument("--hz", type=float, default=5.0, help="per-vehicle event rate (real DR is 1 Hz)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--burst", type=int, default=20000)
+    args = parser.parse_args()
+
+    sink = Sink()
+    url = f"tcp://127.0.0.1:{sink.port}"
+    fleet(url, args.vehicles, args.hz, args.seconds)
+    burst(url, args.burst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Measure bytes per CoT event under each COT_PROFILE (full / lean / minimal).
+
+Replays a simulated drive at 1 Hz, as dead reckoning sends it: the vehicle
+pulls out of a parking spot, drives with varying speed and heading, and
+parks again, while battery range ticks down and the remarks change with
+gear and autopilot state. Each profile sees the same events (with its own
+per-vehicle state), and the wire bytes are totalled for TAK Protocol v0
+(XML) and v1 (protobuf stream framing).
+
+Usage:  python tools/benchmarks/bench_cot_profiles.py [--seconds S] [--vehicles V]
+"""
+
+import argparse
+import math
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.cot import COT_PROFILES, CotMessage, CotProfile  # noqa: E402
+
+
+def _drive(vehicle, seconds):
+    """Yield ``(vehicle data, time offset)`` once a second for one simulated drive."""
+    lat, lon, heading = 30.412345 + vehicle * 0.01, -87.212345, 90.0
+    for t in range(seconds):
+        phase = t / seconds
+        driving = 0.05 < phase < 0.95
+        speed = 35 + 25 * math.sin(t / 40) if driving else 0  # mph
+        heading = (heading + (3 * math.sin(t / 15) if driving else 0)) % 360
+        step = speed * 0.44704 / 111_320  # degrees per second
+        lat += step * math.cos(math.radians(heading))
+        lon += step * math.sin(math.radians(heading)) / math.cos(math.radians(lat))
+        yield {
+            "UID": f"TESLA-{vehicle:04d}", "display_name": f"Car {vehicle}",
+            "vehicle_model": "2024 Model Y Performance",
+            "latitude": lat, "longitude": lon, "elevation": 12.3 + 4 * math.sin(t / 90),
+            "heading": heading, "speed": speed, "battery_level": 80 - t // 300,
+            "battery_range": 240.0 - t / 60, "shift_state": "D" if driving else "P",
+            "autopilot_state": 2 if 0.3 < phase < 0.6 else 1, "locked": not driving,
+        }, t
+
+
+def measure(profile_name, seconds, vehicles):
+    """Return (v0 bytes/event, v1 bytes/event) for one profile."""
+    start = datetime(2025, 7, 27, tzinfo=timezone.utc)
+    profile = CotProfile(profile_name)
+    v0 = v1 = events = 0
+    for vehicle in range(vehicles):
+        for data, offset in _drive(vehicle, seconds):
+            message = CotMessage(data, now=start + timedelta(seconds=offset), profile=profile)
+            v0 += len(message.encode(0))
+            v1 += len(message.encode(1))
+            events += 1
+    return v0 / events, v1 / events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=int, default=1800, help="length of each drive")
+    parser.add_argument("--vehicles", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = None
+    for name in COT_PROFILES:
+        v0, v1 = measure(name, args.seconds, args.vehicles)
+        baseline = baseline or (v0, v1)
+        print(f"{name:>8}: v0 {v0:6.1f} B/event ({v0 / baseline[0]:4.0%})   "
+              f"v1 {v1:6.1f} B/event ({v1 / baseline[1]:4.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark the template CoT serializer against the ElementTree one it replaced.
+
+Renders the same events both ways (checking they are byte-identical first)
+for a small fleet, as ``dead_reckoning_update`` does at 1 Hz per vehicle:
+
+* render -- ``event dict -> XML`` only.
+* packet -- ``vehicle data -> XML`` (``generate_cot_packet``: build + render).
+
+Usage:  python tools/benchmarks/bench_cot_serializer.py [--vehicles V] [--events N]
+"""
+
+import argparse
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget import cot  # noqa: E402
+
+
+def etree_xml(event):
+    """The previous ElementTree serializer, kept here as the baseline."""
+    def cot_time(dt):
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.%fZ")[:-4] + "Z"
+
+    root = ET.Element("event")
+    root.set("version", "2.0")
+    for key in ("uid", "type", "how", "access"):
+        root.set(key, event[key])
+    time_str = cot_time(event["time"])
+    root.set("time", time_str)
+    root.set("start", time_str)
+    root.set("stale", cot_time(event["stale"]))
+    point = ET.SubElement(root, "point")
+    point.set("lat", str(event["lat"]))
+    point.set("lon", str(event["lon"]))
+    point.set("hae", f"{event['hae']:.3f}")
+    point.set("ce", event["ce"])
+    point.set("le", event["le"])
+    detail = ET.SubElement(root, "detail")
+    takv = ET.SubElement(detail, "takv")
+    for key in ("os", "version", "device", "platform"):
+        takv.set(key, event[key])
+    contact = ET.SubElement(detail, "contact")
+    contact.set("endpoint", event["endpoint"])
+    contact.set("callsign", event["callsign"])
+    ET.SubElement(detail, "uid").set("Droid", event["callsign"])
+    precisionlocation = ET.SubElement(detail, "precisionlocation")
+    precisionlocation.set("altsrc", event["altsrc"])
+    precisionlocation.set("geopointsrc", event["geopointsrc"])
+    group = ET.SubElement(detail, "__group")
+    group.set("role", event["group_role"])
+    group.set("name", event["group_name"])
+    ET.SubElement(detail, "status").set("battery", str(int(event["battery"])))
+    track = ET.SubElement(detail, "track")
+    track.set("course", f"{event['course']:.8f}")
+    track.set("speed", f"{event['speed']:.8f}")
+    ET.SubElement(detail, "remarks").text = event["remarks"]
+    return ET.tostring(root, encoding="unicode")
+
+
+def _fleet(vehicles):
+    return [{
+        "UID": f"TESLA-{i:04d}", "display_name": f"Car {i}", "vehicle_model": "2024 Model Y Performance",
+        "latitude": 30.0 + i * 1e-3, "longitude": -87.0, "speed": 45, "heading": 90, "elevation": 12.5,
+        "battery_level": 80, "battery_range": 240.0, "shift_state": "D", "autopilot_state": 2,
+    } for i in range(vehicles)]
+
+
+def _rate(fn, items, events):
+    start = time.perf_counter()
+    for i in range(events):
+        fn(items[i % len(items)])
+    return events / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", type=int, default=20)
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+
+    fleet = _fleet(args.vehicles)
+    events = [cot.build_cot_event(data) for data in fleet]
+    assert all(cot._render_xml(e) == etree_xml(e) for e in events), "template output differs from ElementTree"
+
+    for label, items, old, new in [
+        ("render", events, etree_xml, cot._render_xml),
+        ("packet", fleet, lambda d: etree_xml(cot.build_cot_event(d)), cot.generate_cot_packet),
+    ]:
+        before, after = _rate(old, items, args.events), _rate(new, items, args.events)
+        print(f"{label}: ElementTree {before:>9.0f} events/s  template {after:>9.0f} events/s  "
+              f"({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
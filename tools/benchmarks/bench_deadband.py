@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Replay a drive through dead-band dead reckoning: traffic saved vs position error.
+
+A synthetic 1 Hz "truth" track (straight stretches, curves, speed changes and
+stops) is polled every ``--poll`` seconds like the Tesla API, which reports
+whole degrees and whole mph. Each fix goes through a ``MotionEstimator``
+(``DEAD_RECKONING_MODEL=ctrv``, the default, or ``constant``) and starts a
+``Track``; between polls the track is advanced once a second and each
+position goes through a ``DeadBand``, as ``TeslaCoT.dead_reckoning_update``
+does. A client extrapolates in a straight line, so on a curve the track
+drifts away from what it shows and the threshold decides how often the
+course is corrected. For each threshold the report gives:
+
+* events -- fixes plus dead-reckoned updates sent, and the share saved.
+* error  -- distance from the true position to what a TAK client shows at
+            each second: mean / p95 / max, for a client that extrapolates the
+            last event's course and speed (like ATAK), and for one that just
+            shows the last position.
+
+With ``--model constant`` the track follows the same straight line as the
+client, so only ``--max-interval`` sends updates and every threshold gives
+the same row.
+
+Usage:  python tools/benchmarks/bench_deadband.py [--minutes M] [--poll S] [--max-interval S] [--model ctrv|constant]
+"""
+
+import argparse
+import math
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.constants import MPH_TO_MS  # noqa: E402
+from teslaontarget.dead_reckoning import (  # noqa: E402
+    DEAD_RECKONING_MODELS, DeadBand, MotionEstimator, Track, project)
+from teslaontarget.utils import calculate_distance  # noqa: E402
+
+THRESHOLDS = (0, 2, 5, 10, 25)
+
+
+def truth(seconds):
+    """One ``(lat, lon, heading, speed mph)`` per second of a simulated drive."""
+    lat, lon, heading = 30.412345, -87.212345, 45.0
+    track = []
+    for t in range(seconds):
+        segment = (t // 120) % 4  # 2 min each: straight, gentle curve, stop-and-go, sharp turns
+        if segment == 0:
+            speed, turn = 55.0, 0.0
+        elif segment == 1:
+            speed, turn = 45.0, 1.5
+        elif segment == 2:
+            speed, turn = max(0.0, 30 * math.sin(t / 8)), 0.0
+        else:
+            speed, turn = 25.0, 9.0 * math.sin(t / 6)
+        heading = (heading + turn) % 360
+        lat, lon = project(lat, lon, heading, speed * MPH_TO_MS, 1)
+        track.append((lat, lon, heading, speed))
+    return track
+
+
+def replay(track, poll, threshold, max_interval, model="ctrv"):
+    """Return (events sent, extrapolating-client errors, static-client errors)."""
+    deadband = DeadBand(threshold, max_interval)
+    motion = MotionEstimator()
+    sent = 0
+    client = None  # (lat, lon, heading, speed m/s, time) of the last event received
+    dr = None  # the Track dead reckoning follows, until the next poll
+    extrapolated, static = [], []
+    for t, (lat, lon, heading, speed) in enumerate(track):
+        if t % poll == 0:  # API fix: always sent, and dead reckoning restarts from it
+            fix = {"latitude": lat, "longitude": lon, "heading": round(heading) % 360, "speed": round(speed)}
+            if model == "ctrv":
+                motion.update(fix["heading"], fix["speed"] * MPH_TO_MS, t)
+            # a stopped vehicle isn't dead-reckoned until a poll sees it move
+            dr = Track(fix, deadband, t, poll - 1, motion.yaw_rate, motion.acceleration) if fix["speed"] else None
+            client = (lat, lon, fix["heading"], fix["speed"] * MPH_TO_MS, t)
+            deadband.mark_sent(*client)
+            sent += 1
+        elif dr is not None:
+            dr.advance_to(t)
+            if deadband.due(dr.lat, dr.lon, t):
+                client = (dr.lat, dr.lon, dr.heading, dr.speed_ms, t)
+                deadband.mark_sent(*client)
+                sent += 1
+            if dr.expired(t):  # the next API poll is imminent
+                dr = None
+        shown = project(*client[:4], t - client[4])
+        extrapolated.append(calculate_distance(lat, lon, *shown))
+        static.append(calculate_distance(lat, lon, client[0], client[1]))
+    return sent, extrapolated, static
+
+
+def _summary(errors):
+    ordered = sorted(errors)
+    return (f"{sum(ordered) / len(ordered):5.1f} / {ordered[int(len(ordered) * 0.95)]:5.1f} / "
+            f"{ordered[-1]:5.1f} m")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=int, default=32)
+    parser.add_argument("--poll", type=int, default=10, help="seconds between API fixes")
+    parser.add_argument("--max-interval", type=float, default=5.0)
+    parser.add_argument("--model", choices=DEAD_RECKONING_MODELS, default="ctrv")
+    args = parser.parse_args()
+
+    track = truth(args.minutes * 60)
+    baseline = None
+    print(f"{'dead-band':>9}  {'events':>6}  {'saved':>5}  {'extrapolating client (mean/p95/max)':>36}  "
+          f"{'static client (mean/p95/max)':>30}")
+    for threshold in THRESHOLDS:
+        sent, extrapolated, static = replay(track, args.poll, threshold, args.max_interval, args.model)
+        baseline = baseline or sent
+        print(f"{threshold:>7} m  {sent:>6}  {1 - sent / baseline:5.0%}  {_summary(extrapolated):>36}  "
+              f"{_summary(static):>30}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark one dead-reckoning tick for a whole fleet: NumPy FleetTable vs pure Python.
+
+Fills a ``FleetTable`` with a mix of parked, straight, turning and braking
+vehicles and times ``advance`` over every row, as the shared scheduler does
+when all vehicles are due on the same quantum:
+
+* python -- list columns, each row moved in turn (the fallback without NumPy,
+            and the arithmetic each ``Track`` did on its own before).
+* numpy  -- array columns, all rows moved in one vectorized step
+            (``pip install teslaontarget[fleet]``).
+
+Both tables start from the same rows and are checked to end up at the same
+positions. Only the motion step is timed; encoding and sending each vehicle's
+CoT event costs far more and is unchanged.
+
+Usage:  python tools/benchmarks/bench_fleet_table.py [--vehicles 10,100,1000,10000] [--ticks N]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.dead_reckoning import FleetTable, numpy  # noqa: E402
+
+
+def _rows(vehicles, seed=1):
+    """Column values for ``vehicles`` rows: a quarter each parked, straight, turning and braking."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(vehicles):
+        kind = i % 4
+        rows.append({
+            "lat": 30 + rng.uniform(-1, 1), "lon": -87 + rng.uniform(-1, 1), "heading": rng.uniform(0, 360),
+            "speed_ms": 0.0 if kind == 0 else rng.uniform(5, 30),
+            "yaw_rate": rng.uniform(-15, 15) if kind == 2 else 0.0,
+            "acceleration": -3.0 if kind == 3 else 0.0,
+            "at": 0.0, "moving": kind != 0,
+        })
+    return rows
+
+
+def _time(table, rows, ticks):
+    """Seconds per ``advance`` of all ``rows``, ticking once a second."""
+    start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        table.advance(rows, float(tick))
+    return (time.perf_counter() - start) / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vehicles", default="10,100,1000,10000", help="comma-separated fleet sizes")
+    parser.add_argument("--ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    if numpy is None:
+        print("NumPy is not installed (pip install teslaontarget[fleet]); timing the pure-Python table only")
+    print(f"{'vehicles':>8}  {'python µs/tick':>14}  {'numpy µs/tick':>13}  {'speedup':>7}  {'µs/vehicle (numpy)':>18}")
+    for vehicles in (int(v) for v in args.vehicles.split(",")):
+        tables = {"python": FleetTable(use_numpy=False, capacity=vehicles)}
+        if numpy is not None:
+            tables["numpy"] = FleetTable(capacity=vehicles)
+        per_tick = {}
+        for name, table in tables.items():
+            rows = [table.add(**values) for values in _rows(vehicles)]
+            per_tick[name] = _time(table, rows, args.ticks)
+        if numpy is None:
+            print(f"{vehicles:>8}  {per_tick['python'] * 1e6:>14.1f}  {'-':>13}  {'-':>7}  {'-':>18}")
+            continue
+        python, vector = tables["python"], tables["numpy"]
+        assert all(abs(python.get(row, name) - vector.get(row, name)) < 1e-9
+                   for row in range(vehicles) for name in ("lat", "lon")), "numpy and python tables differ"
+        print(f"{vehicles:>8}  {per_tick['python'] * 1e6:>14.1f}  {per_tick['numpy'] * 1e6:>13.1f}  "
+              f"{per_tick['python'] / per_tick['numpy']:>6.1f}x  {per_tick['numpy'] * 1e6 / vehicles:>18.3f}")
+
+
+if __name__ == "__main__":
+    main()
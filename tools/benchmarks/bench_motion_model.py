@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Replay a drive through both dead-reckoning models: position error per poll interval.
+
+Fixes are taken every ``--polls`` seconds from a "truth" track, as the Tesla
+API poller would see them, and between fixes each model predicts where the
+vehicle is:
+
+* constant -- the fix's course and speed in a straight line (the old model).
+* ctrv     -- ``MotionEstimator`` yaw rate and acceleration from the fixes so
+              far, followed along a ``Track`` as ``TeslaCoT.dead_reckoning_update``
+              does.
+
+The error is the distance from each truth position between two fixes to the
+prediction for that moment: mean / p95 / max. The truth is a simulated drive
+(straights, highway curves, junction turns, stop-and-go), or captures saved
+with ``DEBUG_MODE=True`` via ``--captures`` (then only the captured fixes can be
+checked, so use ``--polls`` multiples of the capture interval).
+
+Usage:  python tools/benchmarks/bench_motion_model.py [--minutes M] [--polls 10,15,20,30] [--captures DIR]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.constants import MPH_TO_MS  # noqa: E402
+from teslaontarget.dead_reckoning import DeadBand, MotionEstimator, Track, project  # noqa: E402
+from teslaontarget.utils import calculate_distance  # noqa: E402
+
+STEP = 0.1  # seconds per truth integration step
+
+
+def simulated(seconds):
+    """One ``(time, lat, lon, heading, speed mph)`` per second of a simulated drive."""
+    lat, lon, heading, speed = 30.412345, -87.212345, 45.0, 0.0
+    # (seconds, target speed mph, acceleration mph/s, yaw rate deg/s)
+    legs = [(30, 35, 3, 0), (40, 35, 0, 0), (8, 20, -2, 0), (6, 20, 0, 15), (20, 45, 2, 0),
+            (60, 60, 1, 1.5), (45, 65, 1, 0), (60, 65, 0, -1), (10, 30, -4, 0), (6, 30, 0, -15),
+            (25, 30, 0, 0), (9, 0, -4, 0), (15, 0, 0, 0), (12, 25, 3, 0), (8, 25, 0, 11),
+            (30, 40, 1, 0), (40, 40, 0, 2.5), (20, 40, 0, 0)]
+    track, t = [], 0.0
+    while t < seconds:
+        for duration, target, accel, yaw in legs:
+            for i in range(int(duration / STEP)):
+                if speed != target:
+                    speed = min(target, speed + accel * STEP) if accel > 0 else max(target, speed + accel * STEP)
+                if speed:
+                    heading = (heading + yaw * STEP) % 360
+                lat, lon = project(lat, lon, heading, speed * MPH_TO_MS, STEP)
+                t += STEP
+                if i % int(1 / STEP) == int(1 / STEP) - 1:
+                    track.append((round(t), lat, lon, heading, speed))
+    return [sample for sample in track if sample[0] <= seconds]
+
+
+def captured(directory):
+    """``(time, lat, lon, heading, speed mph)`` of each capture in ``directory``, in time order."""
+    track = []
+    for path in sorted(Path(directory).glob("*.json")):
+        capture = json.loads(path.read_text())
+        raw = capture.get("raw_api_response") or {}
+        drive = raw.get("response", raw).get("drive_state") or {}
+        if drive.get("latitude") is None or drive.get("longitude") is None:
+            continue
+        at = drive.get("gps_as_of") or capture.get("capture_metadata", {}).get("timestamp")
+        track.append((at, drive["latitude"], drive["longitude"], drive.get("heading") or 0, drive.get("speed") or 0))
+    track.sort()
+    return [sample for i, sample in enumerate(track) if i == 0 or sample[0] > track[i - 1][0]]
+
+
+def replay(track, poll):
+    """Return the (constant, ctrv) errors in metres at every truth sample between fixes."""
+    errors = {"constant": [], "ctrv": []}
+    estimator = MotionEstimator()
+    tracks = None
+    fix_at = None
+    for at, lat, lon, heading, speed in track:
+        if fix_at is None or at - fix_at >= poll:
+            if tracks is not None:  # the moment just before this fix replaces the prediction
+                for model, predicted in tracks.items():
+                    predicted.advance_to(at)
+                    errors[model].append(calculate_distance(lat, lon, predicted.lat, predicted.lon))
+            fix_at = at
+            estimator.update(heading, speed * MPH_TO_MS, at)
+            data = {"latitude": lat, "longitude": lon, "heading": heading, "speed": speed}
+            tracks = {
+                "constant": Track(data, DeadBand(), at, poll),
+                "ctrv": Track(data, DeadBand(), at, poll, estimator.yaw_rate, estimator.acceleration),
+            }
+            continue
+        for model, predicted in tracks.items():
+            predicted.advance_to(at)
+            errors[model].append(calculate_distance(lat, lon, predicted.lat, predicted.lon))
+    return errors
+
+
+def _summary(errors):
+    if not errors:
+        return f"{'-':>21}"
+    ordered = sorted(errors)
+    return (f"{sum(ordered) / len(ordered):5.1f} / {ordered[int(len(ordered) * 0.95)]:5.1f} / "
+            f"{ordered[-1]:5.1f} m")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=int, default=30, help="length of the simulated drive")
+    parser.add_argument("--polls", default="10,15,20,30", help="comma-separated API poll intervals (s)")
+    parser.add_argument("--captures", help="directory of DEBUG_MODE captures to replay instead")
+    args = parser.parse_args()
+
+    track = captured(args.captures) if args.captures else simulated(args.minutes * 60)
+    print(f"{len(track)} truth positions")
+    print(f"{'poll':>5}  {'constant (mean/p95/max)':>23}  {'ctrv (mean/p95/max)':>23}")
+    for poll in (float(p) for p in args.polls.split(",")):
+        errors = replay(track, poll)
+        print(f"{poll:>4.0f}s  {_summary(errors['constant']):>23}  {_summary(errors['ctrv']):>23}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark the threaded TAKClient against AsyncTAKClient.
+
+A local asyncio TAK stand-in accepts the connection and timestamps every event
+as it comes off the wire. Each event carries its enqueue time, so the stand-in
+can compute enqueue-to-wire latency. Reports events/sec and p50/p99 latency.
+
+Usage:  python tools/benchmarks/bench_tak_transports.py [--events N] [--vehicles V] [--rate R]
+"""
+
+import argparse
+import asyncio
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.async_tak_client import AsyncTAKClient  # noqa: E402
+from teslaontarget.tak_client import TAKClient  # noqa: E402
+
+_EVENT = re.compile(rb'<event uid="[^"]*" t="([0-9.]+)"/>')
+
+
+class StandInServer:
+    """asyncio TAK stand-in running on its own loop in a background thread."""
+
+    def __init__(self):
+        self.latencies = []
+        self.last_arrival = None
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+        self._ready.wait()
+
+    def _serve(self):
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _handle(self, reader, writer):
+        buf = b""
+        while data := await reader.read(65536):
+            now = time.perf_counter()
+            buf += data
+            end = buf.rfind(b"/>") + 2
+            for match in _EVENT.finditer(buf, 0, end):
+                self.latencies.append(now - float(match.group(1)))
+            self.last_arrival = now
+            buf = buf[end:]
+
+    def reset(self):
+        self.latencies = []
+        self.last_arrival = None
+
+
+def _event(seq, vehicles):
+    return b'<event uid="bench-%d" t="%.9f"/>' % (seq % vehicles, time.perf_counter())
+
+
+def _drive(client, events, vehicles, rate):
+    interval = 1.0 / rate if rate else 0
+    start = time.perf_counter()
+    for seq in range(events):
+        if interval:
+            while time.perf_counter() < start + seq * interval:
+                pass
+        client.send_cot(_event(seq, vehicles), uid=f"bench-{seq % vehicles}")
+    return start
+
+
+def _report(name, server, start, events):
+    deadline = time.time() + 10
+    while len(server.latencies) < events and time.time() < deadline:
+        if server.latencies and time.perf_counter() - server.last_arrival > 0.5:
+            break  # coalesced events never arrive; stop once the wire is quiet
+        time.sleep(0.01)
+    lat = sorted(server.latencies)
+    if not lat:
+        print(f"{name:>8}: nothing delivered")
+        return
+    elapsed = server.last_arrival - start
+    p50 = lat[len(lat) // 2] * 1000
+    p99 = lat[min(len(lat) - 1, int(len(lat) * 0.99))] * 1000
+    print(f"{name:>8}: {len(lat):>7} delivered  {len(lat) / elapsed:>10.0f} events/s  "
+          f"p50 {p50:7.3f} ms  p99 {p99:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--vehicles", type=int, default=20000,
+                        help="distinct UIDs (fewer than --events lets the queue coalesce)")
+    parser.add_argument("--rate", type=float, default=0, help="events/sec pacing (0 = burst)")
+    args = parser.parse_args()
+
+    server = StandInServer()
+    url = f"tcp://127.0.0.1:{server.port}"
+
+    threaded = TAKClient(url, max_queue=args.events)
+    threaded.connect()
+    start = _drive(threaded, args.events, args.vehicles, args.rate)
+    _report("thread", server, start, args.events)
+    threaded.close()
+
+    server.reset()
+    aclient = AsyncTAKClient(url, max_queue=args.events).start_in_thread()
+    start = _drive(aclient, args.events, args.vehicles, args.rate)
+    _report("asyncio", server, start, args.events)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compare TAK Protocol v0 (XML) and v1 (protobuf) encodings of the same events.
+
+Builds events for a parked, a driving and a charging vehicle, and reports for
+each protocol the bytes on the wire per event and the encode cost in µs/event.
+
+Usage:  python tools/benchmarks/bench_takproto.py [--iterations N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.cot import CotMessage  # noqa: E402
+
+SCENARIOS = {
+    "parked": {"shift_state": "P", "speed": 0, "locked": True, "sentry_mode": True,
+               "is_climate_on": False, "fd_window": 0, "fp_window": 0, "rd_window": 0, "rp_window": 0},
+    "driving": {"shift_state": "D", "speed": 63, "autopilot_state": "Autosteer", "is_climate_on": True},
+    "charging": {"shift_state": "P", "speed": 0, "charging_state": "Charging", "charger_power": 11,
+                 "charge_rate": 30, "minutes_to_full_charge": 95, "time_to_full_charge": 1.6},
+}
+
+
+def _data(extra):
+    data = {"UID": "TESLA-5YJ3E1EA7KF000000", "display_name": "Tron", "vehicle_model": "2024 Model Y Performance",
+            "latitude": 30.412345, "longitude": -87.212345, "altitude": 12.3, "heading": 271,
+            "battery_level": 78, "battery_range": 231.4, "inside_temp": 21.5, "outside_temp": 27.0}
+    data.update(extra)
+    return data
+
+
+def _encode_cost(data, version, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        CotMessage(data).encode(version)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    for name, extra in SCENARIOS.items():
+        data = _data(extra)
+        msg = CotMessage(data)
+        v0, v1 = len(msg.encode(0)), len(msg.encode(1))
+        print(f"{name:>9}: v0 {v0:5d} B  {_encode_cost(data, 0, args.iterations):6.1f} µs   "
+              f"v1 {v1:5d} B  {_encode_cost(data, 1, args.iterations):6.1f} µs   {v0 / v1:4.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-event CPU cost of TAKClient over a Unix domain socket vs TCP loopback.
+
+A sink thread in this process drains each socket, so the CPU time reported
+(``time.process_time``) covers both ends of the link, as it would for a TAK
+server co-located with the bridge. Two write modes are measured per transport:
+
+* per-event -- one write syscall per event (``max_batch=1``), the worst case.
+* batch     -- the writer's default scatter-gather batching.
+
+Usage:  python tools/benchmarks/bench_unix_socket.py [--events N] [--rounds R]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from teslaontarget.cot import format_cot_for_tak, generate_cot_packet  # noqa: E402
+from teslaontarget.tak_client import TAKClient  # noqa: E402
+
+# (label, TAKClient kwargs)
+MODES = [
+    ("per-event", {"max_batch": 1}),
+    ("batch", {}),
+]
+
+
+class Sink:
+    """Stream sink that counts received bytes, on TCP loopback or a Unix socket path."""
+
+    def __init__(self, path=None):
+        self.bytes = 0
+        if path:
+            self._srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._srv.bind(path)
+            self._srv.listen()
+            self.url = f"unix://{path}"
+        else:
+            self._srv = socket.create_server(("127.0.0.1", 0))
+            self.url = f"tcp://127.0.0.1:{self._srv.getsockname()[1]}"
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            conn, _ = self._srv.accept()
+            threading.Thread(target=self._drain, args=(conn,), daemon=True).start()
+
+    def _drain(self, conn):
+        while data := conn.recv(1 << 16):
+            self.bytes += len(data)
+
+
+def _event(uid):
+    return format_cot_for_tak(generate_cot_packet({
+        "UID": uid, "display_name": uid, "latitude": 30.0, "longitude": -87.0,
+        "speed": 60, "heading": 90, "battery_level": 80, "shift_state": "D",
+    }))
+
+
+def run(sink, events, kwargs):
+    """Send ``events`` distinct events; returns (CPU µs/event, events/sec, writes)."""
+    payloads = [(_event(f"TESLA-{i:05d}"), f"TESLA-{i:05d}") for i in range(events)]
+    client = TAKClient(sink.url, max_queue=events, ping_interval=0, **kwargs)
+    client.connect()
+    expected = sink.bytes + sum(len(p) for p, _ in payloads)
+    cpu, wall = time.process_time(), time.perf_counter()
+    for payload, uid in payloads:
+        client.send_cot(payload, uid=uid)
+    deadline = time.monotonic() + 30
+    while sink.bytes < expected and time.monotonic() < deadline:
+        time.sleep(0.0005)
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    writes = client.write_calls
+    client.close()
+    return cpu / events * 1e6, events / wall, writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=3, help="best of R runs per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sinks = [("tcp", Sink()), ("unix", Sink(os.path.join(tmp, "tak.sock")))]
+        for label, kwargs in MODES:
+            for transport, sink in sinks:
+                cpu_us, rate, writes = min(run(sink, args.events, kwargs) for _ in range(args.rounds))
+                print(f"{label:>9} {transport:>4}: {cpu_us:6.1f} µs CPU/event  {rate:>9.0f} events/s  "
+                      f"{writes:>6} writes")
+
+
+if __name__ == "__main__":
+    main()